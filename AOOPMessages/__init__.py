@@ -10,8 +10,9 @@ Example
 
 Attributes
 ----------
-    db : SQLAlchemy
-        Instance of the SQLAlchemy ORM Flask integration
+    db : RoutingSQLAlchemy
+        Instance of the SQLAlchemy ORM Flask integration, routing read only
+        views to the replicas
     bootstrap : Bootstrap
         Instance of the Bootstrap Flask integration
     login_manager : LoginManager
@@ -20,12 +21,13 @@ Attributes
 
 from flask import Flask
 from .config import config
-from flask_sqlalchemy import SQLAlchemy
 from flask_bootstrap import Bootstrap
 from flask_login import LoginManager
+from .routing import RoutingSQLAlchemy
+from .routing import sync_replicas_command
 
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 bootstrap = Bootstrap()
 login_manager = LoginManager()
 
@@ -48,11 +50,21 @@ def create_app(config_name='development'):
     app = Flask(__name__)
 
     app.config.from_object(config[config_name])
+    app.logger.setLevel(app.config['LOG_LEVEL'])
 
     db.init_app(app)
+    app.cli.add_command(sync_replicas_command)
+    log_database_pool(app)
+
+    from AOOPMessages.slow_queries import slow_query_log
+    slow_query_log.init_app(app)
+
     bootstrap.init_app(app)
     login_manager.init_app(app)
 
+    from AOOPMessages.metrics import metrics
+    metrics.init_app(app)
+
     from AOOPMessages.main.main import main
     app.register_blueprint(main)
 
@@ -62,11 +74,68 @@ def create_app(config_name='development'):
     from AOOPMessages.messages.messages import messages
     app.register_blueprint(messages)
 
+    from AOOPMessages.api.api import api
+    app.register_blueprint(api)
+
     from AOOPMessages.errors.errors_handler import errors
     app.register_blueprint(errors)
 
-    with app.app_context():
-        db.create_all()
-        db.session.commit()
+    from AOOPMessages.assets import assets
+    assets.init_app(app)
+
+    from AOOPMessages.compression import compress
+    compress.init_app(app)
+
+    from AOOPMessages.auth.hashing import password_hasher
+    password_hasher.init_app(app)
+
+    from AOOPMessages.models import user_cache
+    user_cache.init_app(app)
+
+    from AOOPMessages.messages.helpers import valid_user_ids
+    from AOOPMessages.messages.helpers import invalid_user_ids
+    valid_user_ids.init_app(app)
+    invalid_user_ids.init_app(app)
+
+    from AOOPMessages.messages.recipients import recipient_index
+    recipient_index.init_app(app)
+
+    from AOOPMessages.messages.events import message_hub
+    message_hub.init_app(app)
+
+    from AOOPMessages.messages.fragments import fragment_cache
+    fragment_cache.init_app(app)
+
+    if app.config['SCHEMA_CREATE_ON_STARTUP']:
+        with app.app_context():
+            db.create_all()
+
+    from AOOPMessages.messages.ingestion import message_queue
+    message_queue.init_app(app)
 
     return app
+
+
+def log_database_pool(app):
+    """Log Database Pool.
+    Logs a summary of the database engine configuration of the app.
+
+    Parameters
+    ----------
+    app : Flask
+        App to summarize the configuration of.
+    """
+
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    statement_timeout = options.get('connect_args', {}).get('options')
+
+    app.logger.info(
+        'Database pool: size=%s max_overflow=%s recycle=%s pre_ping=%s '
+        'timeout=%s statement_timeout=%s replicas=%s',
+        options.get('pool_size', 'default'),
+        options.get('max_overflow', 'default'),
+        options.get('pool_recycle', 'default'),
+        options.get('pool_pre_ping', False),
+        options.get('pool_timeout', 'default'),
+        statement_timeout.split('=')[-1] if statement_timeout else 'none',
+        len(app.config['SQLALCHEMY_REPLICA_BINDS']))
@@ -0,0 +1,4 @@
+"""AOOPMessages API module.
+
+This module provides the blueprints and logic of the versioned JSON API.
+"""
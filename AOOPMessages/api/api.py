@@ -0,0 +1,485 @@
+"""AOOPMessages API module.
+
+This module contains the implementation of the version 1 of the JSON API
+of the app. Requests are authenticated with the bearer tokens returned by
+the Tokens endpoint instead of the session cookie, and errors are JSON
+objects with an `error` message.
+
+Without a session to remember the writes of a client in, every request of
+the API reads from the primary database, so its views aren't read_only.
+"""
+
+from flask import Blueprint
+from flask import current_app
+from flask import g
+from flask import request
+from AOOPMessages import db
+from AOOPMessages.models import ArchivedMessage, Message, User
+from AOOPMessages.auth.hashing import password_hasher
+from AOOPMessages.auth.hashing import HashingPoolSaturatedError
+from AOOPMessages.api.serialization import api_response
+from AOOPMessages.api.serialization import message_payload
+from AOOPMessages.api.serialization import SENT_MESSAGE_FIELDS
+from AOOPMessages.api.tokens import generate_token
+from AOOPMessages.api.tokens import token_required
+from AOOPMessages.messages import conditional
+from AOOPMessages.messages import counters
+from AOOPMessages.messages import sending
+from AOOPMessages.messages.helpers import get_valid_user_id
+from AOOPMessages.messages.helpers import parse_user_id
+from AOOPMessages.messages.helpers import INVALID_USER_ID_ERROR
+from AOOPMessages.messages.helpers import UserNotExistsError
+from AOOPMessages.messages.messages import export_response
+from AOOPMessages.messages.messages import send_bulk
+from AOOPMessages.messages.messages import send_rows
+from AOOPMessages.messages.pagination import paginate_merged
+from AOOPMessages.messages.pagination import InvalidCursorError
+
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+INVALID_CREDENTIALS_ERROR = 'Invalid email or password'
+
+MESSAGE_COLUMNS = (
+    Message.id,
+    Message.author_id,
+    User.email.label('author_email'),
+    Message.receiver_id,
+    Message.title,
+    Message.body,
+    Message.timestamp,
+    Message.read,
+    Message.thread_id,
+)
+ARCHIVED_MESSAGE_COLUMNS = (
+    ArchivedMessage.id,
+    ArchivedMessage.author_id,
+    User.email.label('author_email'),
+    ArchivedMessage.receiver_id,
+    ArchivedMessage.title,
+    ArchivedMessage.body,
+    ArchivedMessage.timestamp,
+    ArchivedMessage.read,
+    ArchivedMessage.thread_id,
+)
+SENT_MESSAGE_COLUMNS = (
+    Message.id,
+    Message.author_id,
+    Message.receiver_id,
+    User.email.label('receiver_email'),
+    Message.title,
+    Message.body,
+    Message.timestamp,
+    Message.read,
+    Message.thread_id,
+)
+ARCHIVED_SENT_MESSAGE_COLUMNS = (
+    ArchivedMessage.id,
+    ArchivedMessage.author_id,
+    ArchivedMessage.receiver_id,
+    User.email.label('receiver_email'),
+    ArchivedMessage.title,
+    ArchivedMessage.body,
+    ArchivedMessage.timestamp,
+    ArchivedMessage.read,
+    ArchivedMessage.thread_id,
+)
+
+
+@api.route('/tokens', methods=['POST'])
+def create_token():
+    """This is the Tokens endpoint.
+    Call this endpoint with your credentials to get a token for the other
+    endpoints of the API, sent as `Authorization: Bearer <token>`.
+
+    Parameters
+    ----------
+    email : str
+        Email of the user, in the JSON body.
+    password : str
+        Password of the user, in the JSON body.
+
+    Response codes
+    --------
+        - 401:
+            description: Email or password incorrect.
+        - 201:
+            description: Returns a JSON object with the `token` and the
+                seconds it `expires_in`.
+        - 503:
+            description: The password hashing pool is saturated.
+    """
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('email'), str):
+        return api_response({'error': INVALID_CREDENTIALS_ERROR}, 401)
+
+    user = db.session.query(User.id, User.password).filter_by(
+        email=data['email']).first()
+
+    try:
+        valid_password = user is not None and \
+            isinstance(data.get('password'), str) and \
+            password_hasher.check(user.password, data['password'])
+    except HashingPoolSaturatedError:
+        return api_response({'error': 'Try again later'}, 503)
+
+    if not valid_password:
+        return api_response({'error': INVALID_CREDENTIALS_ERROR}, 401)
+
+    return api_response({
+        'token': generate_token(user.id),
+        'expires_in': current_app.config['API_TOKEN_MAX_AGE'],
+    }, 201)
+
+
+@api.route('/messages', methods=['GET'])
+@token_required
+def list_messages():
+    """This is the Messages endpoint.
+    Call this endpoint to list your received messages, newest first.
+    Archived messages are listed after the others.
+
+    Parameters
+    ----------
+    before : str
+        Optional cursor to load the page of messages older than it.
+    after : str
+        Optional cursor to load the page of messages newer than it.
+    limit : int
+        Optional number of messages of the page, up to API_PAGE_MAX_SIZE.
+        Defaults to MESSAGES_PER_PAGE.
+
+    Response codes
+    --------
+        - 401:
+            description: The token is missing, invalid or expired.
+        - 400:
+            description: A cursor is not valid.
+        - 304:
+            description: The page matches the If-None-Match header of the
+                request.
+        - 200:
+            description: Returns a JSON object with the `messages` of the
+                page, and the `next` and `previous` cursors, null at the
+                ends of the Inbox.
+    """
+
+    user_id = g.api_user_id
+
+    inbox_version = counters.get_version(user_id)
+    etag = conditional.inbox_etag(user_id, inbox_version)
+    modified = conditional.last_modified(inbox_version)
+
+    if conditional.is_not_modified(etag, modified):
+        return _vary_on_token(conditional.not_modified(etag, modified))
+
+    query = db.session.query(*MESSAGE_COLUMNS).join(
+        Message.author
+    ).filter(
+        Message.receiver_id == user_id
+    )
+
+    archived_query = db.session.query(*ARCHIVED_MESSAGE_COLUMNS).join(
+        ArchivedMessage.author
+    ).filter(
+        ArchivedMessage.receiver_id == user_id
+    )
+
+    try:
+        page = paginate_merged(
+            [(query, Message.timestamp, Message.id),
+             (archived_query, ArchivedMessage.timestamp, ArchivedMessage.id)],
+            _page_size(),
+            before=request.args.get('before'),
+            after=request.args.get('after'))
+    except InvalidCursorError as e:
+        return api_response({'error': str(e)}, 400)
+
+    response = api_response({
+        'messages': [message_payload(row) for row in page.items],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+    return _vary_on_token(conditional.set_validators(
+        response, etag, modified))
+
+
+@api.route('/messages/sent', methods=['GET'])
+@token_required
+def list_sent_messages():
+    """This is the Sent messages endpoint.
+    Call this endpoint to list the messages you sent, newest first.
+    Archived messages are listed after the others.
+
+    Parameters
+    ----------
+    before : str
+        Optional cursor to load the page of messages older than it.
+    after : str
+        Optional cursor to load the page of messages newer than it.
+    limit : int
+        Optional number of messages of the page, up to API_PAGE_MAX_SIZE.
+        Defaults to MESSAGES_PER_PAGE.
+
+    Response codes
+    --------
+        - 401:
+            description: The token is missing, invalid or expired.
+        - 400:
+            description: A cursor is not valid.
+        - 200:
+            description: Returns a JSON object with the `messages` of the
+                page, each with its `receiver_email`, and the `next` and
+                `previous` cursors, null at the ends of the listing.
+    """
+
+    query = db.session.query(*SENT_MESSAGE_COLUMNS).join(
+        Message.receiver
+    ).filter(
+        Message.author_id == g.api_user_id
+    )
+
+    archived_query = db.session.query(*ARCHIVED_SENT_MESSAGE_COLUMNS).join(
+        ArchivedMessage.receiver
+    ).filter(
+        ArchivedMessage.author_id == g.api_user_id
+    )
+
+    try:
+        page = paginate_merged(
+            [(query, Message.timestamp, Message.id),
+             (archived_query, ArchivedMessage.timestamp, ArchivedMessage.id)],
+            _page_size(),
+            before=request.args.get('before'),
+            after=request.args.get('after'))
+    except InvalidCursorError as e:
+        return api_response({'error': str(e)}, 400)
+
+    return api_response({
+        'messages': [message_payload(row, SENT_MESSAGE_FIELDS)
+                     for row in page.items],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@api.route('/messages/export', methods=['GET'])
+@token_required
+def export_messages():
+    """This is the Export endpoint.
+    Call this endpoint to download your whole Inbox, archived messages
+    included, oldest first, streamed as it is read.
+
+    Parameters
+    ----------
+    format : str
+        Optional format of the export: jsonl (JSON Lines, the default), csv
+        or mbox.
+    gzip : str
+        Optional. Gzip the export if it's set to anything else than 0.
+
+    Response codes
+    --------
+        - 401:
+            description: The token is missing, invalid or expired.
+        - 400:
+            description: The format is not supported.
+        - 200:
+            description: Returns the export as an attachment.
+    """
+
+    return export_response(g.api_user_id)
+
+
+@api.route('/messages/<int:message_id>', methods=['GET'])
+@token_required
+def get_message(message_id):
+    """This is the Message endpoint.
+    Call this endpoint to fetch a message you sent or received, archived
+    or not.
+
+    Parameters
+    ----------
+    message_id : int
+        Id of the message.
+
+    Response codes
+    --------
+        - 401:
+            description: The token is missing, invalid or expired.
+        - 404:
+            description: The message doesn't exist, or wasn't sent or
+                received by the user.
+        - 200:
+            description: Returns the message as a JSON object.
+    """
+
+    user_id = g.api_user_id
+
+    row = db.session.query(*MESSAGE_COLUMNS).join(
+        Message.author
+    ).filter(
+        Message.id == message_id,
+        db.or_(Message.receiver_id == user_id,
+               Message.author_id == user_id)
+    ).first()
+
+    if row is None:
+        # Archived messages keep their id, so it can't be in both tables.
+        row = db.session.query(*ARCHIVED_MESSAGE_COLUMNS).join(
+            ArchivedMessage.author
+        ).filter(
+            ArchivedMessage.id == message_id,
+            db.or_(ArchivedMessage.receiver_id == user_id,
+                   ArchivedMessage.author_id == user_id)
+        ).first()
+
+    if row is None:
+        return api_response({'error': 'Message not found'}, 404)
+
+    return api_response(message_payload(row))
+
+
+@api.route('/messages', methods=['POST'])
+@token_required
+def create_message():
+    """This is the Send message endpoint.
+    Call this endpoint to send a message to another user.
+
+    Parameters
+    ----------
+    to : int
+        Id of the user to send the message to, in the JSON body.
+    title : str
+        Title of the message, in the JSON body.
+    body : str
+        Body of the message, in the JSON body.
+    idempotency_key : str
+        Optional key of the send, in the JSON body or the Idempotency-Key
+        header. Retrying a send with the same key doesn't store the message
+        again.
+
+    Response codes
+    --------
+        - 401:
+            description: The token is missing, invalid or expired.
+        - 400:
+            description: The body isn't a JSON object with string `title`
+                and `body`, `to` isn't an int or a string of digits, or
+                the recipient doesn't exist.
+        - 201:
+            description: Sent the message. Returns a JSON object with the
+                number of `sent` messages.
+        - 202:
+            description: Queued the message, with MESSAGES_WRITE_BEHIND.
+    """
+
+    data, error = _message_data()
+    if error is not None:
+        return error
+
+    try:
+        receiver_id = get_valid_user_id(data.get('to'))
+    except UserNotExistsError as e:
+        return api_response({'error': str(e)}, 400)
+
+    send_rows(sending.build_rows(g.api_user_id, [receiver_id],
+                                 data.get('title'), data.get('body'),
+                                 _idempotency_key(data)))
+
+    return api_response({'sent': 1}, _send_status())
+
+
+@api.route('/messages/bulk', methods=['POST'])
+@token_required
+def create_messages():
+    """This is the Bulk send message endpoint.
+    Call this endpoint to send the same message to many users at once.
+
+    Parameters
+    ----------
+    to : list
+        Ids of the users to send the message to, in the JSON body.
+    title : str
+        Title of the message, in the JSON body.
+    body : str
+        Body of the message, in the JSON body.
+    idempotency_key : str
+        Optional key of the send, in the JSON body or the Idempotency-Key
+        header.
+
+    Response codes
+    --------
+        - 401:
+            description: The token is missing, invalid or expired.
+        - 400:
+            description: The body isn't valid, a recipient id isn't an
+                int or a string of digits, or there are no recipients or
+                more than BULK_SEND_MAX_RECIPIENTS.
+        - 201:
+            description: Returns a JSON object with the number of `sent`
+                messages and a `failed` list with the `to` id and `error`
+                of each recipient the message couldn't be sent to.
+        - 202:
+            description: Queued the messages, with MESSAGES_WRITE_BEHIND.
+    """
+
+    data, error = _message_data()
+    if error is not None:
+        return error
+
+    raw_ids = data.get('to')
+    if not isinstance(raw_ids, list) or not raw_ids:
+        return api_response(
+            {'error': 'At least one recipient is required'}, 400)
+
+    if len(raw_ids) > current_app.config['BULK_SEND_MAX_RECIPIENTS']:
+        return api_response({'error': 'Too many recipients'}, 400)
+
+    try:
+        raw_ids = [str(parse_user_id(raw_id)) for raw_id in raw_ids]
+    except (ValueError, TypeError):
+        return api_response({'error': INVALID_USER_ID_ERROR}, 400)
+
+    sent, failed = send_bulk(g.api_user_id, raw_ids,
+                             data.get('title'), data.get('body'),
+                             _idempotency_key(data))
+
+    return api_response({'sent': sent, 'failed': failed}, _send_status())
+
+
+def _message_data():
+    data = request.get_json(silent=True)
+
+    if not isinstance(data, dict) or \
+            not isinstance(data.get('title', ''), str) or \
+            not isinstance(data.get('body', ''), str):
+        return None, api_response(
+            {'error': 'Expected a JSON object with a string title and '
+                      'body'}, 400)
+
+    return data, None
+
+
+def _page_size():
+    return min(max(request.args.get(
+        'limit', current_app.config['MESSAGES_PER_PAGE'], type=int), 1),
+        current_app.config['API_PAGE_MAX_SIZE'])
+
+
+def _idempotency_key(data):
+    key = request.headers.get('Idempotency-Key') or \
+        data.get('idempotency_key')
+
+    return str(key) if key else None
+
+
+def _send_status():
+    return 202 if current_app.config['MESSAGES_WRITE_BEHIND'] else 201
+
+
+def _vary_on_token(response):
+    response.vary.add('Authorization')
+    return response
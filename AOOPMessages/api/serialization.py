@@ -0,0 +1,61 @@
+"""API serialization module.
+
+This module builds the compact JSON payloads of the API. Messages are
+serialized straight from the row tuples of column queries, without
+loading ORM objects, and responses have no whitespace.
+"""
+
+import json
+from flask import Response
+
+
+MESSAGE_FIELDS = ('id', 'author_id', 'author_email', 'receiver_id',
+                  'title', 'body', 'timestamp', 'read', 'thread_id')
+SENT_MESSAGE_FIELDS = ('id', 'author_id', 'receiver_id', 'receiver_email',
+                       'title', 'body', 'timestamp', 'read', 'thread_id')
+
+
+def message_payload(row, fields=MESSAGE_FIELDS):
+    """Message Payload
+
+    Serializes a message row.
+
+    Parameters
+    ----------
+    row : tuple
+        Values of the fields of the message, in order.
+    fields : tuple
+        Names of the fields of the row. Defaults to MESSAGE_FIELDS.
+
+    Returns
+    -------
+    dict
+        The message, with its timestamp in ISO 8601 format.
+    """
+
+    payload = dict(zip(fields, row))
+    payload['timestamp'] = payload['timestamp'].isoformat()
+
+    return payload
+
+
+def api_response(payload, status=200):
+    """API Response
+
+    Builds a compact JSON response.
+
+    Parameters
+    ----------
+    payload : dict
+        Body of the response.
+    status : int
+        Status code of the response.
+
+    Returns
+    -------
+    Response
+        The response.
+    """
+
+    return Response(json.dumps(payload, separators=(',', ':')),
+                    status=status, mimetype='application/json')
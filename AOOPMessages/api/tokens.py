@@ -0,0 +1,145 @@
+"""API tokens module.
+
+This module provides the bearer tokens of the JSON API, and a decorator
+requiring one. Tokens are signed with the SECRET_KEY and carry the id of
+their user and a fingerprint of their password, checked against the user
+cache, so checking one rarely queries the database. They expire after
+API_TOKEN_MAX_AGE seconds, and are revoked when the password of the user
+changes, once the user expires from the cache of every process.
+
+Example
+-------
+    from AOOPMessages.api.tokens import token_required
+
+    @api.route('/items')
+    @token_required
+    def items():
+        user_id = g.api_user_id
+        ...
+"""
+
+from functools import wraps
+from flask import current_app
+from flask import g
+from flask import request
+from itsdangerous import BadSignature
+from itsdangerous import URLSafeTimedSerializer
+from AOOPMessages.models import load_user
+from AOOPMessages.routing import without_session
+from AOOPMessages.api.serialization import api_response
+
+
+TOKEN_SALT = 'api-token'
+INVALID_TOKEN_ERROR = 'A valid bearer token is required'
+
+
+def generate_token(user_id):
+    """Generate Token
+
+    Builds the API token of a user.
+
+    Parameters
+    ----------
+    user_id : int
+        Id of an existing user.
+
+    Returns
+    -------
+    str
+        The signed token.
+    """
+
+    return _serializer().dumps(
+        [user_id, load_user(user_id).password_fingerprint])
+
+
+def verify_token(token):
+    """Verify Token
+
+    Checks the signature and age of a token, and that the password of its
+    user didn't change since it was built.
+
+    Parameters
+    ----------
+    token : str
+        Token built by generate_token.
+
+    Returns
+    -------
+    int
+        Id of the user of the token.
+
+    Raises
+    ------
+    InvalidTokenError
+        If the token is malformed, forged, expired or revoked.
+    """
+
+    try:
+        user_id, fingerprint = _serializer().loads(
+            token, max_age=current_app.config['API_TOKEN_MAX_AGE'])
+    except (BadSignature, TypeError, ValueError):
+        raise InvalidTokenError(INVALID_TOKEN_ERROR)
+
+    if not isinstance(user_id, int):
+        raise InvalidTokenError(INVALID_TOKEN_ERROR)
+
+    user = load_user(user_id)
+    if user is None or user.password_fingerprint != fingerprint:
+        raise InvalidTokenError(INVALID_TOKEN_ERROR)
+
+    return user_id
+
+
+def token_required(view):
+    """Token Required
+
+    Decorator requiring a valid token in the Authorization header of the
+    request. The id of its user is stored in `g.api_user_id`, and the
+    request reads from the primary database, since it has no session to
+    keep it there after the user writes. Requests without one get a 401
+    JSON response.
+
+    Parameters
+    ----------
+    view : function
+        View to decorate.
+
+    Returns
+    -------
+    function
+        The decorated view.
+    """
+
+    @wraps(view)
+    def decorated_view(*args, **kwargs):
+        scheme, _, token = request.headers.get(
+            'Authorization', '').partition(' ')
+
+        try:
+            if scheme.lower() != 'bearer':
+                raise InvalidTokenError(INVALID_TOKEN_ERROR)
+            g.api_user_id = verify_token(token.strip())
+            without_session()
+        except InvalidTokenError as e:
+            response = api_response({'error': str(e)}, 401)
+            response.headers['WWW-Authenticate'] = 'Bearer'
+            return response
+
+        return view(*args, **kwargs)
+
+    return decorated_view
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'],
+                                  salt=TOKEN_SALT)
+
+
+class InvalidTokenError(Exception):
+    """InvalidTokenError
+
+    This error should be raised when an API token is malformed, forged,
+    expired or revoked.
+    """
+    pass
@@ -0,0 +1,186 @@
+"""AOOPMessages assets module.
+
+This module provides an extension that fingerprints the static files of
+the app and of Flask-Bootstrap. `url_for('static', filename='js/app.js')`
+builds `/static/js/app.<hash>.js`, where the hash is computed from the
+content of the file. Fingerprinted URLs change whenever their file does,
+so they are served with a far-future Cache-Control header and browsers
+never have to revalidate them.
+
+Example
+-------
+    from AOOPMessages.assets import assets
+
+    assets.init_app(app)
+"""
+
+import hashlib
+import os
+import re
+import threading
+from flask import current_app
+
+
+FINGERPRINT_LENGTH = 12
+FINGERPRINTED_NAME = re.compile(
+    r'^(?P<stem>.+)\.(?P<fingerprint>[0-9a-f]{%d})(?P<suffix>\.[^./]+)$'
+    % FINGERPRINT_LENGTH)
+
+
+class Assets:
+    """Assets class.
+
+    Flask extension fingerprinting the URLs of static files.
+
+    Attributes
+    ----------
+        endpoints : tuple
+            Static file endpoints whose URLs are fingerprinted.
+    """
+
+    def __init__(self, endpoints=('static', 'bootstrap.static')):
+        self.endpoints = endpoints
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+
+    def init_app(self, app):
+        """Init App.
+        Fingerprints the URLs built for the static endpoints of the app and
+        wraps their views to serve fingerprinted files. Must be called
+        after the blueprints are registered.
+
+        Parameters
+        ----------
+        app : Flask
+            App to read the STATIC_ASSETS_FINGERPRINT and
+            STATIC_ASSETS_MAX_AGE configurations from.
+        """
+
+        with self._lock:
+            self._fingerprints = {}
+
+        if not app.config['STATIC_ASSETS_FINGERPRINT']:
+            return
+
+        app.url_defaults(self.fingerprint_url)
+
+        for endpoint in self.endpoints:
+            if endpoint in app.view_functions:
+                app.view_functions[endpoint] = self._wrap(
+                    app.view_functions[endpoint], endpoint)
+
+    def fingerprint_url(self, endpoint, values):
+        """Fingerprint URL.
+        Replaces the filename of the URLs of static files with its
+        fingerprinted name. Registered as URL defaults function.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the URL being built.
+        values : dict
+            Values of the URL being built.
+        """
+
+        if endpoint not in self.endpoints or 'filename' not in values:
+            return
+
+        filename = values['filename']
+        fingerprint = self.fingerprint(endpoint, filename)
+
+        if fingerprint is not None:
+            stem, suffix = os.path.splitext(filename)
+            values['filename'] = f'{stem}.{fingerprint}{suffix}'
+
+    def fingerprint(self, endpoint, filename):
+        """Fingerprint.
+        Computes the fingerprint of a static file, once per file in
+        production and whenever it changes in debug mode.
+
+        Parameters
+        ----------
+        endpoint : str
+            Static endpoint serving the file.
+        filename : str
+            Path of the file, relative to the static folder.
+
+        Returns
+        -------
+        str
+            The fingerprint, None if the file doesn't exist.
+        """
+
+        key = (endpoint, filename)
+        with self._lock:
+            cached = self._fingerprints.get(key)
+
+        if cached is not None and not current_app.debug:
+            return cached[1]
+
+        path = self._path(endpoint, filename)
+        if path is None:
+            return None
+
+        try:
+            modified = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+
+        with open(path, 'rb') as file:
+            fingerprint = hashlib.md5(
+                file.read()).hexdigest()[:FINGERPRINT_LENGTH]
+
+        with self._lock:
+            self._fingerprints[key] = (modified, fingerprint)
+
+        return fingerprint
+
+    def _wrap(self, view, endpoint):
+        def fingerprinted_view(filename):
+            match = FINGERPRINTED_NAME.match(filename)
+
+            if match is None:
+                return view(filename=filename)
+
+            original = match.group('stem') + match.group('suffix')
+            fingerprint = self.fingerprint(endpoint, original)
+
+            if fingerprint is None:
+                return view(filename=filename)
+
+            response = view(filename=original)
+            if fingerprint != match.group('fingerprint'):
+                # Stale URL of a page rendered before the file changed.
+                return response
+
+            if response.status_code in (200, 304):
+                max_age = current_app.config['STATIC_ASSETS_MAX_AGE']
+                response.headers['Cache-Control'] = \
+                    f'public, max-age={max_age}, immutable'
+
+            return response
+
+        return fingerprinted_view
+
+    def _path(self, endpoint, filename):
+        if '.' in endpoint:
+            blueprint = current_app.blueprints.get(endpoint.split('.')[0])
+            folder = blueprint.static_folder if blueprint else None
+        else:
+            folder = current_app.static_folder
+
+        if folder is None:
+            return None
+
+        path = os.path.realpath(os.path.join(folder, filename))
+        if not path.startswith(os.path.realpath(folder) + os.sep) or \
+                not os.path.isfile(path):
+            return None
+
+        return path
+
+
+assets = Assets()
@@ -9,12 +9,16 @@ from flask import request
 from flask import render_template
 from flask import Blueprint
 from flask import flash
+from flask import abort
 from flask_login import current_user
 from flask_login import login_user
 from flask_login import logout_user
 from AOOPMessages import db
 from AOOPMessages.models import User
-from werkzeug.security import check_password_hash, generate_password_hash
+from AOOPMessages.routing import stick_to_primary
+from AOOPMessages.messages.recipients import recipient_index
+from AOOPMessages.auth.hashing import password_hasher
+from AOOPMessages.auth.hashing import HashingPoolSaturatedError
 
 
 auth = Blueprint('auth', __name__)
@@ -61,6 +65,8 @@ def login_post():
             redirected to Inbox.
             - Bad login data description: Email or password incorrect,
             redirected to Login.
+        - 503:
+            description: The password hashing pool is saturated.
     """
 
     email = request.form.get('email')
@@ -68,7 +74,13 @@ def login_post():
 
     user = User.query.filter_by(email=email).first()
 
-    if user is not None and check_password_hash(user.password, password):
+    try:
+        valid_password = user is not None and \
+            password_hasher.check(user.password, password)
+    except HashingPoolSaturatedError:
+        abort(503)
+
+    if valid_password:
         login_user(user)
         return redirect(url_for('messages.inbox'))
     else:
@@ -117,6 +129,8 @@ def signup_post():
             a user, redirected to Sign Up.
         - 500:
             description: There was an error creating the user.
+        - 503:
+            description: The password hashing pool is saturated.
     """
 
     email = request.form.get('email')
@@ -136,12 +150,18 @@ def signup_post():
         flash('Email address already exists...')
         return redirect(url_for(AUTH_SIGNUP_BLUEPRINT))
 
-    new_user = User(email=email,
-                    password=generate_password_hash(password))
+    try:
+        new_user = User(email=email,
+                        password=password_hasher.generate(password))
+    except HashingPoolSaturatedError:
+        abort(503)
 
     db.session.add(new_user)
     db.session.commit()
 
+    recipient_index.add(new_user.id, new_user.email)
+    stick_to_primary()
+
     return redirect(url_for(MAIN_HOME_BLUEPRINT))
 
 
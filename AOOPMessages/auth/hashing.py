@@ -0,0 +1,211 @@
+"""AOOPMessages password hashing module.
+
+This module provides a password hasher that runs the hashing work on a
+bounded process pool, so bursts of logins and sign ups don't block the
+workers serving every other request, as well as a custom exception for
+when the pool is saturated.
+
+The request waiting for a hash blocks its thread until the pool returns
+it. gunicorn runs threaded (gthread) workers, as set in the Procfile, so
+only that thread waits and the other threads of the worker keep serving
+requests. With sync workers the whole worker would wait for the hash, and
+the pool would only bound how many hashes run at once.
+
+Example
+-------
+    from AOOPMessages.auth.hashing import password_hasher
+
+    password_hasher.init_app(app)
+
+    pwhash = password_hasher.generate('password')
+    password_hasher.check(pwhash, 'password')
+
+Attributes
+----------
+    password_hasher : PasswordHasher
+        Instance of the password hasher shared by the app.
+"""
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import check_password_hash, generate_password_hash
+from AOOPMessages.metrics import metrics
+
+
+class PasswordHasher:
+    """PasswordHasher class.
+
+    Generates and checks password hashes on a process pool. At most
+    `workers` hashes run at once and at most `queue_size` more wait for a
+    worker; any other request is rejected right away instead of queueing
+    behind them. With 0 workers hashes are computed inline.
+
+    Attributes
+    ----------
+        method : str
+            Werkzeug hash method used for new hashes, including the
+            iteration count for PBKDF2.
+        workers : int
+            Number of processes of the pool.
+        queue_size : int
+            Number of hashes that can wait for a free process.
+        timeout : float
+            Seconds to wait for a hash before giving up.
+    """
+
+    def __init__(self):
+        self.method = 'pbkdf2:sha256'
+        self.workers = 0
+        self.queue_size = 0
+        self.timeout = None
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Init App.
+        Configures the hasher from the app configuration.
+
+        Parameters
+        ----------
+        app : Flask
+            App to read the PASSWORD_HASH_* configurations from.
+        """
+
+        self.shutdown()
+
+        method = app.config['PASSWORD_HASH_METHOD']
+        iterations = app.config['PASSWORD_HASH_ITERATIONS']
+        if method.startswith('pbkdf2:') and iterations:
+            method = f'{method}:{iterations}'
+
+        self.method = method
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.queue_size = app.config['PASSWORD_HASH_QUEUE_SIZE']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        self._slots = threading.BoundedSemaphore(
+            self.workers + self.queue_size)
+
+    def generate(self, password):
+        """Generate.
+        Hashes a password with the configured method.
+
+        Parameters
+        ----------
+        password : str
+            Password to hash.
+
+        Returns
+        -------
+        str
+            The password hash.
+
+        Raises
+        ------
+        HashingPoolSaturatedError
+            If the pool can't take more work.
+        """
+
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, pwhash, password):
+        """Check.
+        Checks a password against a hash.
+
+        Parameters
+        ----------
+        pwhash : str
+            Hash to check against.
+        password : str
+            Password to check.
+
+        Returns
+        -------
+        bool
+            True if the password matches the hash.
+
+        Raises
+        ------
+        HashingPoolSaturatedError
+            If the pool can't take more work.
+        """
+
+        return self._run(check_password_hash, pwhash, password)
+
+    def shutdown(self):
+        """Shutdown.
+        Stops the processes of the pool, if it was started.
+        """
+
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _run(self, function, *args):
+        with metrics.timed('password_hash'):
+            return self._run_in_pool(function, *args)
+
+    def _run_in_pool(self, function, *args):
+        if self.workers == 0:
+            return function(*args)
+
+        # A pool whose process died, killed by the OOM killer for instance,
+        # rejects every later hash. It's replaced and the hash tried again
+        # once.
+        for _ in range(2):
+            executor = self._get_executor()
+            try:
+                return self._submit(executor, function, *args)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+
+        raise HashingPoolSaturatedError(
+            "The password hashing pool is broken")
+
+    def _submit(self, executor, function, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HashingPoolSaturatedError("The password hashing pool is full")
+
+        try:
+            future = executor.submit(function, *args)
+        except Exception:
+            slots.release()
+            raise
+
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashingPoolSaturatedError(
+                "The password hashing pool timed out")
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers)
+            return self._executor
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            # Another request may have replaced it already.
+            if self._executor is executor:
+                executor.shutdown(wait=False)
+                self._executor = None
+
+
+class HashingPoolSaturatedError(Exception):
+    """HashingPoolSaturatedError
+
+    This error should be raised when the password hashing pool can't take
+    more work.
+    """
+    pass
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,250 @@
+"""AOOPMessages cache module.
+
+This module provides a small thread safe in-process cache with least
+recently used eviction and time based expiration, and a variant bounded
+by the memory used by its values.
+
+Example
+-------
+    from AOOPMessages.cache import LRUCache
+
+    cache = LRUCache('USER_CACHE')
+    cache.init_app(app)
+
+    cache.set(1, 'value')
+    cache.get(1)
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """LRUCache class.
+
+    Bounded mapping that evicts the least recently used entries once it's
+    full and expires entries older than its TTL. It keeps hit and miss
+    counters to check it's effective under load.
+
+    Attributes
+    ----------
+        config_prefix : str
+            Prefix of the `<prefix>_SIZE` and `<prefix>_TTL` configurations
+            read by init_app.
+        max_size : int
+            Maximum number of entries.
+        ttl : float
+            Seconds an entry is valid for. None to never expire entries.
+        hits : int
+            Number of lookups that found a valid entry.
+        misses : int
+            Number of lookups that didn't find a valid entry.
+    """
+
+    def __init__(self, config_prefix=None, max_size=1024, ttl=None):
+        self.config_prefix = config_prefix
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Init App.
+        Configures the cache from the app configuration and empties it.
+
+        Parameters
+        ----------
+        app : Flask
+            App to read the configuration from.
+        """
+
+        self.max_size = app.config[f'{self.config_prefix}_SIZE']
+        self.ttl = app.config[f'{self.config_prefix}_TTL']
+        self.clear()
+
+    def get(self, key, default=None):
+        """Get.
+        Retrieves a value from the cache.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the value.
+        default : object
+            Value to return if the key isn't cached.
+
+        Returns
+        -------
+        object
+            The cached value, or the default if it isn't cached or expired.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and self._is_expired(entry):
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        """Set.
+        Stores a value in the cache, evicting the least recently used entry
+        if it's full.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the value.
+        value : object
+            Value to store.
+        """
+
+        with self._lock:
+            self._remove(key)
+            self._store(key, value)
+
+            while self._is_full():
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        """Delete.
+        Removes a value from the cache, if present.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the value.
+        """
+
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """Clear.
+        Removes every value from the cache and resets the counters.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Stats.
+        Summarizes the usage of the cache.
+
+        Returns
+        -------
+        dict
+            The `hits`, `misses` and current `size` of the cache.
+        """
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+
+    def _is_full(self):
+        return len(self._entries) > self.max_size
+
+    def _is_expired(self, entry):
+        return self.ttl is not None and \
+            time.monotonic() - entry[1] > self.ttl
+
+
+class SizedLRUCache(LRUCache):
+    """SizedLRUCache class.
+
+    LRUCache that also evicts the least recently used entries once its
+    values use more than `max_bytes` of memory. Values larger than
+    `max_bytes` aren't stored.
+
+    Attributes
+    ----------
+        max_bytes : int
+            Maximum memory used by the values, in bytes. init_app reads it
+            from the `<prefix>_BYTES` configuration.
+        sizeof : function
+            Function returning the memory used by a value, in bytes.
+            Defaults to sys.getsizeof.
+    """
+
+    def __init__(self, config_prefix=None, max_size=1024, ttl=None,
+                 max_bytes=1 << 24, sizeof=sys.getsizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._bytes = 0
+        super().__init__(config_prefix, max_size, ttl)
+
+    def init_app(self, app):
+        self.max_bytes = app.config[f'{self.config_prefix}_BYTES']
+        super().init_app(app)
+
+    def set(self, key, value):
+        if self.sizeof(value) > self.max_bytes:
+            self.delete(key)
+            return
+
+        super().set(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Stats.
+        Summarizes the usage of the cache.
+
+        Returns
+        -------
+        dict
+            The `hits`, `misses`, current `size` and `bytes` used by the
+            values of the cache.
+        """
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def _store(self, key, value):
+        size = self.sizeof(value)
+        self._entries[key] = (value, time.monotonic(), size)
+        self._bytes += size
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _is_full(self):
+        return super()._is_full() or self._bytes > self.max_bytes
@@ -0,0 +1,185 @@
+"""AOOPMessages compression module.
+
+This module provides an extension that compresses the responses of the
+app with brotli or gzip, whichever the client accepts, when they are
+larger than COMPRESS_MIN_SIZE and their mimetype is in
+COMPRESS_MIMETYPES. Brotli is only used if the optional `brotli` package
+is installed.
+
+Static files are compressed once and kept in an in-process cache keyed by
+their ETag. Streamed responses, such as the message stream, are never
+compressed.
+
+A compressed response is a different representation of the resource, so
+its strong ETag gets the encoding as a suffix, e.g. "abc-gzip". Use
+`etag_variants` to match the ETags sent back by clients.
+
+Example
+-------
+    from AOOPMessages.compression import compress
+
+    compress.init_app(app)
+"""
+
+import gzip
+from flask import current_app
+from flask import request
+from AOOPMessages.cache import SizedLRUCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+ENCODINGS = ('br', 'gzip')
+
+
+def etag_variants(etag):
+    """ETag Variants
+
+    Lists the ETags a resource may have been sent with, uncompressed and
+    with each encoding.
+
+    Parameters
+    ----------
+    etag : str
+        Unquoted ETag of the uncompressed resource.
+
+    Returns
+    -------
+    list
+        The unquoted ETags.
+    """
+
+    return [etag] + [f'{etag}-{encoding}' for encoding in ENCODINGS]
+
+
+class Compress:
+    """Compress class.
+
+    Flask extension compressing the responses of the app.
+
+    Attributes
+    ----------
+        static_cache : SizedLRUCache
+            Compressed static files by ETag and encoding, sized from the
+            COMPRESS_CACHE_SIZE and COMPRESS_CACHE_BYTES configurations.
+    """
+
+    def __init__(self):
+        self.static_cache = SizedLRUCache('COMPRESS_CACHE', sizeof=len)
+
+    def init_app(self, app):
+        """Init App.
+        Registers the compression of the responses of the app.
+
+        Parameters
+        ----------
+        app : Flask
+            App to compress the responses of, and to read the COMPRESS_*
+            configurations from.
+        """
+
+        self.static_cache.init_app(app)
+        app.after_request(self.compress_response)
+
+    def compress_response(self, response):
+        """Compress Response.
+        Compresses a response if it's worth it and the client accepts it.
+
+        Parameters
+        ----------
+        response : Response
+            Response of the app.
+
+        Returns
+        -------
+        Response
+            The response, compressed or not.
+        """
+
+        config = current_app.config
+        response.vary.add('Accept-Encoding')
+
+        if not config['COMPRESS_ENABLED'] or \
+                response.status_code != 200 or \
+                'Content-Encoding' in response.headers or \
+                response.mimetype not in config['COMPRESS_MIMETYPES']:
+            return response
+
+        if response.is_streamed and not response.direct_passthrough:
+            return response
+
+        encoding = self.choose_encoding()
+        if encoding is None:
+            return response
+
+        if response.content_length is not None and \
+                response.content_length < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        etag, weak = response.get_etag()
+        if response.direct_passthrough:
+            compressed = self._compress_static(response, encoding, etag)
+        else:
+            compressed = self._compress(response.get_data(), encoding)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+
+        if etag:
+            etag = f'{etag}-{encoding}'
+            response.set_etag(etag, weak)
+            if request.if_none_match.contains(etag):
+                response.status_code = 304
+                response.set_data(b'')
+                del response.headers['Content-Encoding']
+
+        return response
+
+    def choose_encoding(self):
+        """Choose Encoding.
+        Picks the encoding of the response from the Accept-Encoding header
+        of the request.
+
+        Returns
+        -------
+        str
+            'br' or 'gzip', None if the client accepts neither.
+        """
+
+        accepted = request.accept_encodings
+
+        if brotli is not None and accepted['br'] > 0:
+            return 'br'
+        if accepted['gzip'] > 0:
+            return 'gzip'
+
+        return None
+
+    def _compress_static(self, response, encoding, etag):
+        key = (request.path, etag, encoding)
+        compressed = self.static_cache.get(key) if etag else None
+
+        response.direct_passthrough = False
+
+        if compressed is None:
+            compressed = self._compress(response.get_data(), encoding)
+            if etag:
+                self.static_cache.set(key, compressed)
+        elif hasattr(response.response, 'close'):
+            response.response.close()
+
+        return compressed
+
+    def _compress(self, data, encoding):
+        level = current_app.config['COMPRESS_LEVEL']
+
+        if encoding == 'br':
+            return brotli.compress(data, quality=min(level, 11))
+
+        return gzip.compress(data, compresslevel=min(level, 9))
+
+
+compress = Compress()
@@ -8,6 +8,103 @@ import os
 from tempfile import gettempdir
 
 
+def env_flag(name, default):
+    """Env Flag
+
+    Reads a boolean from an environment variable.
+
+    Parameters
+    ----------
+    name : str
+        Name of the environment variable.
+    default : bool
+        Value to use if the environment variable isn't set.
+
+    Returns
+    -------
+    bool
+        False if the variable is set to '0', 'false', 'no' or 'off',
+        True if it's set to anything else.
+    """
+
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def replica_binds(database_uris):
+    """Replica Binds
+
+    Builds the SQLAlchemy binds of the read replicas of a database.
+
+    Parameters
+    ----------
+    database_uris : str
+        Comma separated URIs of the replicas, or None.
+
+    Returns
+    -------
+    dict
+        Bind key to URI of each replica, named 'replica_1', 'replica_2'...
+    """
+
+    uris = [uri.strip() for uri in (database_uris or '').split(',')
+            if uri.strip()]
+    return {f'replica_{index}': uri for index, uri in enumerate(uris, 1)}
+
+
+def engine_options(database_uri, pool_size, max_overflow, pool_recycle,
+                   pool_pre_ping, pool_timeout, statement_timeout):
+    """Engine Options
+
+    Builds the SQLAlchemy engine options for a database. Pool sizing only
+    applies to server databases, and the statement timeout is only
+    supported on PostgreSQL.
+
+    Parameters
+    ----------
+    database_uri : str
+        URI of the database.
+    pool_size : int
+        Connections kept open in the pool.
+    max_overflow : int
+        Connections that can be opened beyond the pool size.
+    pool_recycle : int
+        Seconds after which a connection is replaced.
+    pool_pre_ping : bool
+        Test connections before using them.
+    pool_timeout : int
+        Seconds to wait for a free connection.
+    statement_timeout : int
+        Milliseconds after which a statement is cancelled, 0 to disable.
+
+    Returns
+    -------
+    dict
+        Options for SQLALCHEMY_ENGINE_OPTIONS.
+    """
+
+    options = {'pool_pre_ping': pool_pre_ping}
+
+    if database_uri is None or database_uri.startswith('sqlite'):
+        return options
+
+    options.update({
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': pool_recycle,
+        'pool_timeout': pool_timeout,
+    })
+
+    if statement_timeout and database_uri.startswith('postgres'):
+        options['connect_args'] = {
+            'options': f'-c statement_timeout={statement_timeout}'
+        }
+
+    return options
+
+
 class Config:
     """Config base class.
 
@@ -18,9 +115,340 @@ class Config:
         SECRET_KEY : str
             Secret key to use. Retrieves value from the SECRET_KEY
             environment variable. Defaults to 'AOOPMessages'
+        MESSAGES_PER_PAGE : int
+            Number of messages in each page of the Inbox. Retrieves value
+            from the MESSAGES_PER_PAGE environment variable. Defaults to 20.
+        RECIPIENT_INDEX_MAX_SIZE : int
+            Maximum number of users held by the in-process recipient index.
+            Retrieves value from the RECIPIENT_INDEX_MAX_SIZE environment
+            variable. Defaults to 50000.
+        RECIPIENT_INDEX_TTL : float
+            Seconds before the recipient index is reloaded from the database.
+            Retrieves value from the RECIPIENT_INDEX_TTL environment
+            variable. Defaults to 300.
+        RECIPIENT_SEARCH_LIMIT : int
+            Maximum number of users returned by a recipient search.
+            Defaults to 10.
+        USER_CACHE_SIZE : int
+            Maximum number of logged in users cached across requests.
+            Retrieves value from the USER_CACHE_SIZE environment variable.
+            Defaults to 1024.
+        USER_CACHE_TTL : float
+            Seconds a logged in user is cached for. Retrieves value from the
+            USER_CACHE_TTL environment variable. Defaults to 60.
+        PASSWORD_HASH_METHOD : str
+            Werkzeug method used to hash new passwords. Retrieves value from
+            the PASSWORD_HASH_METHOD environment variable. Defaults to
+            'pbkdf2:sha256'.
+        PASSWORD_HASH_ITERATIONS : int
+            Iterations of PBKDF2 hash methods. Retrieves value from the
+            PASSWORD_HASH_ITERATIONS environment variable. Defaults to 150000.
+        PASSWORD_HASH_WORKERS : int
+            Processes of the password hashing pool, 0 to hash inline.
+            Retrieves value from the PASSWORD_HASH_WORKERS environment
+            variable. Defaults to 2.
+        PASSWORD_HASH_QUEUE_SIZE : int
+            Hashes that can wait for a free process before new ones are
+            rejected with a 503. Retrieves value from the
+            PASSWORD_HASH_QUEUE_SIZE environment variable. Defaults to 8.
+        PASSWORD_HASH_TIMEOUT : float
+            Seconds to wait for a hash before rejecting the request with a
+            503. Defaults to 10.
+        BULK_SEND_MAX_RECIPIENTS : int
+            Maximum number of recipients of a bulk send. Retrieves value
+            from the BULK_SEND_MAX_RECIPIENTS environment variable.
+            Defaults to 10000.
+        BULK_SEND_CHUNK_SIZE : int
+            Number of messages inserted per transaction by a bulk send.
+            Retrieves value from the BULK_SEND_CHUNK_SIZE environment
+            variable. Defaults to 500.
+        VALID_USER_ID_CACHE_SIZE : int
+            Maximum number of ids of existing users cached by the recipient
+            validation. Defaults to 10000.
+        VALID_USER_ID_CACHE_TTL : float
+            Seconds an id of an existing user is cached for. Defaults to 300.
+        INVALID_USER_ID_CACHE_SIZE : int
+            Maximum number of ids that don't belong to any user cached by the
+            recipient validation. Defaults to 1000.
+        INVALID_USER_ID_CACHE_TTL : float
+            Seconds an id that doesn't belong to any user is cached for.
+            Defaults to 5.
+        SQLALCHEMY_TRACK_MODIFICATIONS : bool
+            Enable the Flask-SQLAlchemy modification signals. Defaults to
+            False, as nothing uses them.
+        LOG_LEVEL : str
+            Level of the app logger. Retrieves value from the LOG_LEVEL
+            environment variable. Defaults to 'INFO'.
+        SQLALCHEMY_REPLICA_BINDS : list
+            Keys of the binds read only views are routed to. Defaults to
+            none.
+        DATABASE_REPLICA_STICKY_SECONDS : float
+            Seconds the reads of a user stay on the primary database after
+            the user writes. Retrieves value from the
+            DATABASE_REPLICA_STICKY_SECONDS environment variable.
+            Defaults to 5.
+        SCHEMA_CREATE_ON_STARTUP : bool
+            Create the missing tables when the app starts. The schema is
+            otherwise managed with the Alembic migrations, see
+            `alembic upgrade head`. Retrieves value from the
+            SCHEMA_CREATE_ON_STARTUP environment variable. Defaults to False.
+        MESSAGE_HUB_BACKEND : str
+            Import path of the HubBackend class pushing new messages to the
+            message streams. Retrieves value from the MESSAGE_HUB_BACKEND
+            environment variable. Defaults to the in-process
+            'AOOPMessages.messages.events.InMemoryBackend'.
+        MESSAGE_HUB_QUEUE_SIZE : int
+            Maximum number of pending events of each stream. Defaults to 100.
+        MESSAGE_STREAM_HEARTBEAT : float
+            Seconds between the keep alive comments of the message streams.
+            Defaults to 15.
+        MESSAGE_STREAM_MAX_DURATION : float
+            Seconds a message stream stays open before the client has to
+            reconnect. Defaults to 300.
+        WEB_THREADS : int
+            Number of threads of each gunicorn worker process, passed to
+            --threads by the Procfile. Retrieves value from the WEB_THREADS
+            environment variable. Defaults to 8.
+        MESSAGE_STREAM_MAX_CONNECTIONS : int
+            Maximum number of message streams open in each worker process.
+            Each stream holds a thread of the worker until it closes, so it
+            must stay below WEB_THREADS. Streams beyond it are refused with
+            a 503 and clients poll the counts instead. Retrieves value from
+            the MESSAGE_STREAM_MAX_CONNECTIONS environment variable.
+            Defaults to half of WEB_THREADS.
+        MESSAGE_STREAM_MAX_PER_USER : int
+            Maximum number of message streams of a user open in each
+            worker process. Defaults to 1.
+        SEARCH_RESULTS_PER_PAGE : int
+            Number of messages in each page of the search results. Defaults
+            to 20.
+        SEARCH_MAX_PAGE : int
+            Last page of search results that can be requested, so deep
+            pages can't make the database rank every match. Defaults to 50.
+        MESSAGES_WRITE_BEHIND : bool
+            Acknowledge sends once they are appended to the message queue
+            journal, and store them in the database from a background
+            worker. Retrieves value from the MESSAGES_WRITE_BEHIND
+            environment variable. Defaults to False.
+        MESSAGE_QUEUE_PATH : str
+            Path of the message queue journal. Must be on a persistent local
+            disk. Retrieves value from the MESSAGE_QUEUE_PATH environment
+            variable. Defaults to 'aoop-message-queue.db' in the OS temp
+            directory.
+        MESSAGE_QUEUE_BATCH_SIZE : int
+            Maximum number of queued messages stored per transaction.
+            Retrieves value from the MESSAGE_QUEUE_BATCH_SIZE environment
+            variable. Defaults to 500.
+        MESSAGE_QUEUE_POLL_INTERVAL : float
+            Seconds the queue worker waits when the journal is empty.
+            Defaults to 0.5.
+        MESSAGE_QUEUE_LEASE : float
+            Seconds before messages claimed by a worker that didn't store
+            them are claimed again. Defaults to 30.
+        MESSAGE_QUEUE_MAX_ATTEMPTS : int
+            Attempts of a batch of queued messages before they're stored one
+            by one, and the ones that still fail are moved to the dead
+            letters of the journal. Defaults to 5.
+        MESSAGE_QUEUE_DRAIN_TIMEOUT : float
+            Seconds the queue keeps storing messages when the process
+            exits. Defaults to 30.
+        RELEASE_VERSION : str
+            Identifier of the deployed release. It's part of the ETag of
+            the Inbox, so pages cached by browsers are rendered again after
+            a deploy. Retrieves value from the RELEASE_VERSION or
+            HEROKU_SLUG_COMMIT environment variables. Defaults to ''.
+        FRAGMENT_CACHE_ENABLED : bool
+            Cache the rendered message cards of the Inbox. Retrieves value
+            from the FRAGMENT_CACHE_ENABLED environment variable. Defaults
+            to True.
+        FRAGMENT_CACHE_SIZE : int
+            Maximum number of message cards cached by each process.
+            Retrieves value from the FRAGMENT_CACHE_SIZE environment
+            variable. Defaults to 10000.
+        FRAGMENT_CACHE_BYTES : int
+            Maximum memory used by the message cards cached by each
+            process, in bytes. Retrieves value from the FRAGMENT_CACHE_BYTES
+            environment variable. Defaults to 16 MiB.
+        FRAGMENT_CACHE_TTL : float
+            Seconds a message card is cached for. Defaults to None, as
+            cards never change.
+        FRAGMENT_CACHE_BACKEND : str
+            Import path of a FragmentBackend class sharing the message
+            cards between processes. Retrieves value from the
+            FRAGMENT_CACHE_BACKEND environment variable. Defaults to None,
+            to only cache them in process.
+        BOOTSTRAP_SERVE_LOCAL : bool
+            Serve the Bootstrap, jQuery and Popper assets from the app
+            instead of their CDNs. Defaults to True.
+        BOOTSTRAP_QUERYSTRING_REVVING : bool
+            Add the Bootstrap version to the URLs of its assets. Defaults
+            to False, as the URLs are fingerprinted.
+        STATIC_ASSETS_FINGERPRINT : bool
+            Add the hash of their content to the URLs of static files.
+            Defaults to True.
+        STATIC_ASSETS_MAX_AGE : int
+            Seconds browsers cache fingerprinted static files for. Defaults
+            to one year.
+        COMPRESS_ENABLED : bool
+            Compress the responses with brotli or gzip. Retrieves value from
+            the COMPRESS_ENABLED environment variable. Defaults to True.
+        COMPRESS_MIMETYPES : list
+            Mimetypes of the compressed responses. Defaults to HTML, JSON,
+            CSS, JavaScript and SVG.
+        COMPRESS_MIN_SIZE : int
+            Minimum size of the compressed responses, in bytes. Retrieves
+            value from the COMPRESS_MIN_SIZE environment variable. Defaults
+            to 500.
+        COMPRESS_LEVEL : int
+            Compression level, capped to 9 for gzip and 11 for brotli.
+            Defaults to 6.
+        COMPRESS_CACHE_SIZE : int
+            Maximum number of compressed static files cached by each
+            process. Defaults to 256.
+        COMPRESS_CACHE_TTL : float
+            Seconds a compressed static file is cached for. Defaults to
+            None, as they are keyed by ETag.
+        COMPRESS_CACHE_BYTES : int
+            Maximum memory used by the compressed static files cached by
+            each process, in bytes. Defaults to 8 MiB.
+        METRICS_ENABLED : bool
+            Record the latency, SQL statements and render time of the
+            requests, exposed on /metrics. Retrieves value from the
+            METRICS_ENABLED environment variable. Defaults to False.
+        METRICS_LATENCY_BUCKETS : list
+            Upper bounds of the buckets of the latency histograms, in
+            seconds. Defaults to 5 ms to 10 s.
+        PROFILE_SAMPLE_RATE : float
+            Fraction of the requests profiled with cProfile. Retrieves value
+            from the PROFILE_SAMPLE_RATE environment variable. Defaults to
+            0, to profile none.
+        PROFILE_DIR : str
+            Directory the profiles are dumped to. Retrieves value from the
+            PROFILE_DIR environment variable. Defaults to 'aoop-profiles' in
+            the OS temp directory.
+        SLOW_QUERY_THRESHOLD : float
+            Seconds a SQL statement has to take to be logged as slow, 0 to
+            log none. Retrieves value from the SLOW_QUERY_THRESHOLD
+            environment variable. Defaults to 0.5.
+        SLOW_QUERY_EXPLAIN : bool
+            Log the plan of slow SELECT statements. It runs them again, with
+            EXPLAIN ANALYZE on PostgreSQL. Retrieves value from the
+            SLOW_QUERY_EXPLAIN environment variable. Defaults to False.
+        SLOW_QUERY_EXPLAIN_CACHE_SIZE : int
+            Maximum number of statements remembered as recently explained.
+            Defaults to 256.
+        SLOW_QUERY_EXPLAIN_CACHE_TTL : float
+            Seconds before a slow statement is explained again. Defaults to
+            300.
+        API_TOKEN_MAX_AGE : int
+            Seconds an API token is valid for. Retrieves value from the
+            API_TOKEN_MAX_AGE environment variable. Defaults to one day.
+        API_PAGE_MAX_SIZE : int
+            Maximum number of messages in each page of the API. Defaults to
+            100.
+        RETENTION_DAYS : int
+            Age in days of the messages moved out of the messages table by
+            `flask messages archive`. Retrieves value from the
+            RETENTION_DAYS environment variable. Defaults to 365.
+        RETENTION_BATCH_SIZE : int
+            Number of messages archived per transaction. Retrieves value
+            from the RETENTION_BATCH_SIZE environment variable. Defaults to
+            1000.
+        RETENTION_BATCH_PAUSE : float
+            Seconds to wait between archived batches. Defaults to 0.1.
+        EXPORT_BATCH_SIZE : int
+            Number of messages fetched from the database at a time by the
+            Inbox exports. Defaults to 1000.
     """
 
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'AOOPMessages'
+    MESSAGES_PER_PAGE = int(os.environ.get('MESSAGES_PER_PAGE') or 20)
+    RECIPIENT_INDEX_MAX_SIZE = int(
+        os.environ.get('RECIPIENT_INDEX_MAX_SIZE') or 50000)
+    RECIPIENT_INDEX_TTL = float(os.environ.get('RECIPIENT_INDEX_TTL') or 300)
+    RECIPIENT_SEARCH_LIMIT = 10
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL') or 60)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or \
+        'pbkdf2:sha256'
+    PASSWORD_HASH_ITERATIONS = int(
+        os.environ.get('PASSWORD_HASH_ITERATIONS') or 150000)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+    PASSWORD_HASH_QUEUE_SIZE = int(
+        os.environ.get('PASSWORD_HASH_QUEUE_SIZE') or 8)
+    PASSWORD_HASH_TIMEOUT = 10
+    BULK_SEND_MAX_RECIPIENTS = int(
+        os.environ.get('BULK_SEND_MAX_RECIPIENTS') or 10000)
+    BULK_SEND_CHUNK_SIZE = int(os.environ.get('BULK_SEND_CHUNK_SIZE') or 500)
+    VALID_USER_ID_CACHE_SIZE = 10000
+    VALID_USER_ID_CACHE_TTL = 300
+    INVALID_USER_ID_CACHE_SIZE = 1000
+    INVALID_USER_ID_CACHE_TTL = 5
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
+    SQLALCHEMY_REPLICA_BINDS = []
+    DATABASE_REPLICA_STICKY_SECONDS = float(
+        os.environ.get('DATABASE_REPLICA_STICKY_SECONDS') or 5)
+    SCHEMA_CREATE_ON_STARTUP = env_flag('SCHEMA_CREATE_ON_STARTUP', False)
+    MESSAGE_HUB_BACKEND = os.environ.get('MESSAGE_HUB_BACKEND') or \
+        'AOOPMessages.messages.events.InMemoryBackend'
+    MESSAGE_HUB_QUEUE_SIZE = 100
+    MESSAGE_STREAM_HEARTBEAT = 15
+    MESSAGE_STREAM_MAX_DURATION = 300
+    WEB_THREADS = int(os.environ.get('WEB_THREADS') or 8)
+    MESSAGE_STREAM_MAX_CONNECTIONS = int(
+        os.environ.get('MESSAGE_STREAM_MAX_CONNECTIONS') or
+        max(WEB_THREADS // 2, 1))
+    MESSAGE_STREAM_MAX_PER_USER = 1
+    SEARCH_RESULTS_PER_PAGE = 20
+    SEARCH_MAX_PAGE = 50
+    MESSAGES_WRITE_BEHIND = env_flag('MESSAGES_WRITE_BEHIND', False)
+    MESSAGE_QUEUE_PATH = os.environ.get('MESSAGE_QUEUE_PATH') or \
+        os.path.join(gettempdir(), 'aoop-message-queue.db')
+    MESSAGE_QUEUE_BATCH_SIZE = int(
+        os.environ.get('MESSAGE_QUEUE_BATCH_SIZE') or 500)
+    MESSAGE_QUEUE_POLL_INTERVAL = 0.5
+    MESSAGE_QUEUE_LEASE = 30
+    MESSAGE_QUEUE_MAX_ATTEMPTS = 5
+    MESSAGE_QUEUE_DRAIN_TIMEOUT = 30
+    RELEASE_VERSION = os.environ.get('RELEASE_VERSION') or \
+        os.environ.get('HEROKU_SLUG_COMMIT') or ''
+    FRAGMENT_CACHE_ENABLED = env_flag('FRAGMENT_CACHE_ENABLED', True)
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE') or 10000)
+    FRAGMENT_CACHE_BYTES = int(
+        os.environ.get('FRAGMENT_CACHE_BYTES') or 16 * 1024 * 1024)
+    FRAGMENT_CACHE_TTL = None
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND')
+    BOOTSTRAP_SERVE_LOCAL = True
+    BOOTSTRAP_QUERYSTRING_REVVING = False
+    STATIC_ASSETS_FINGERPRINT = True
+    STATIC_ASSETS_MAX_AGE = 365 * 24 * 60 * 60
+    COMPRESS_ENABLED = env_flag('COMPRESS_ENABLED', True)
+    COMPRESS_MIMETYPES = ['text/html', 'application/json', 'text/css',
+                          'application/javascript', 'text/javascript',
+                          'image/svg+xml']
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 500)
+    COMPRESS_LEVEL = 6
+    COMPRESS_CACHE_SIZE = 256
+    COMPRESS_CACHE_TTL = None
+    COMPRESS_CACHE_BYTES = 8 * 1024 * 1024
+    METRICS_ENABLED = env_flag('METRICS_ENABLED', False)
+    METRICS_LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                               1, 2.5, 5, 10]
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE') or 0)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or \
+        os.path.join(gettempdir(), 'aoop-profiles')
+    SLOW_QUERY_THRESHOLD = float(
+        os.environ.get('SLOW_QUERY_THRESHOLD') or 0.5)
+    SLOW_QUERY_EXPLAIN = env_flag('SLOW_QUERY_EXPLAIN', False)
+    SLOW_QUERY_EXPLAIN_CACHE_SIZE = 256
+    SLOW_QUERY_EXPLAIN_CACHE_TTL = 300
+    API_TOKEN_MAX_AGE = int(os.environ.get('API_TOKEN_MAX_AGE') or 86400)
+    API_PAGE_MAX_SIZE = 100
+    RETENTION_DAYS = int(os.environ.get('RETENTION_DAYS') or 365)
+    RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE') or 1000)
+    RETENTION_BATCH_PAUSE = 0.1
+    EXPORT_BATCH_SIZE = 1000
     # MAIL_SERVER = os.environ.get('MAIL_SERVER')
     # MAIL_PORT = os.
 
@@ -37,10 +465,19 @@ class DevelopmentConfig(Config):
         SQLALCHEMY_DATABASE_URI : str
             Database URI to use. Retrieves value from the DEV_DATABASE_URI
             environment variable.
+        SQLALCHEMY_BINDS : dict
+            Read replicas of the database, for instance a second SQLite file
+            kept up to date with `flask sync-replicas`. Retrieves the comma
+            separated URIs from the DEV_REPLICA_DATABASE_URI environment
+            variable.
+        SQLALCHEMY_REPLICA_BINDS : list
+            Keys of the replica binds.
     """
 
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URI')
+    SQLALCHEMY_BINDS = replica_binds(os.environ.get('DEV_REPLICA_DATABASE_URI'))
+    SQLALCHEMY_REPLICA_BINDS = list(SQLALCHEMY_BINDS)
 
 
 class TestingConfig(Config):
@@ -57,6 +494,19 @@ class TestingConfig(Config):
         SQLALCHEMY_DATABASE_URI : str
             Database URI to use. Defaults to 'test.db' SQLite file in
             OS temp directory.
+        PASSWORD_HASH_ITERATIONS : int
+            Iterations of PBKDF2 hash methods. Defaults to 1000 to keep the
+            tests fast.
+        PASSWORD_HASH_WORKERS : int
+            Processes of the password hashing pool. Defaults to 0 to hash
+            inline.
+        SCHEMA_CREATE_ON_STARTUP : bool
+            Create the missing tables when the app starts. Defaults to True.
+        MESSAGES_WRITE_BEHIND : bool
+            Acknowledge sends once they are queued. Defaults to False.
+        MESSAGE_QUEUE_PATH : str
+            Path of the message queue journal. Defaults to
+            'test-message-queue.db' in the OS temp directory.
     """
 
     TESTING = True
@@ -64,6 +514,11 @@ class TestingConfig(Config):
     LOGIN_DISABLED = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + \
         os.path.join(gettempdir(), 'test.db')
+    PASSWORD_HASH_ITERATIONS = 1000
+    PASSWORD_HASH_WORKERS = 0
+    SCHEMA_CREATE_ON_STARTUP = True
+    MESSAGES_WRITE_BEHIND = False
+    MESSAGE_QUEUE_PATH = os.path.join(gettempdir(), 'test-message-queue.db')
 
 
 class ProductionConfig(Config):
@@ -76,9 +531,59 @@ class ProductionConfig(Config):
         SQLALCHEMY_DATABASE_URI : str
             Database URI to use. Retrieves value from the
             PRODUCTION_DATABASE_URI environment variable.
+        DATABASE_POOL_SIZE : int
+            Connections kept open in the pool of each worker. Retrieves
+            value from the DATABASE_POOL_SIZE environment variable.
+            Defaults to 5.
+        DATABASE_MAX_OVERFLOW : int
+            Connections that can be opened beyond the pool size. Retrieves
+            value from the DATABASE_MAX_OVERFLOW environment variable.
+            Defaults to 10.
+        DATABASE_POOL_RECYCLE : int
+            Seconds after which a connection is replaced, so idle
+            connections dropped by the server aren't reused. Retrieves
+            value from the DATABASE_POOL_RECYCLE environment variable.
+            Defaults to 1800.
+        DATABASE_POOL_PRE_PING : bool
+            Test connections before using them. Retrieves value from the
+            DATABASE_POOL_PRE_PING environment variable. Defaults to True.
+        DATABASE_POOL_TIMEOUT : int
+            Seconds to wait for a free connection. Retrieves value from the
+            DATABASE_POOL_TIMEOUT environment variable. Defaults to 30.
+        DATABASE_STATEMENT_TIMEOUT : int
+            Milliseconds after which a PostgreSQL statement is cancelled, 0
+            to disable. Retrieves value from the DATABASE_STATEMENT_TIMEOUT
+            environment variable. Defaults to 30000.
+        SQLALCHEMY_ENGINE_OPTIONS : dict
+            Engine options built from the DATABASE_* configurations.
+        SQLALCHEMY_BINDS : dict
+            Optional read replicas of the database. Retrieves the comma
+            separated URIs from the PRODUCTION_REPLICA_DATABASE_URI
+            environment variable.
+        SQLALCHEMY_REPLICA_BINDS : list
+            Keys of the replica binds.
     """
 
     SQLALCHEMY_DATABASE_URI = os.environ.get('PRODUCTION_DATABASE_URI')
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE') or 5)
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW') or 10)
+    DATABASE_POOL_RECYCLE = int(
+        os.environ.get('DATABASE_POOL_RECYCLE') or 1800)
+    DATABASE_POOL_PRE_PING = env_flag('DATABASE_POOL_PRE_PING', True)
+    DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT') or 30)
+    DATABASE_STATEMENT_TIMEOUT = int(
+        os.environ.get('DATABASE_STATEMENT_TIMEOUT') or 30000)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI,
+        DATABASE_POOL_SIZE,
+        DATABASE_MAX_OVERFLOW,
+        DATABASE_POOL_RECYCLE,
+        DATABASE_POOL_PRE_PING,
+        DATABASE_POOL_TIMEOUT,
+        DATABASE_STATEMENT_TIMEOUT)
+    SQLALCHEMY_BINDS = replica_binds(
+        os.environ.get('PRODUCTION_REPLICA_DATABASE_URI'))
+    SQLALCHEMY_REPLICA_BINDS = list(SQLALCHEMY_BINDS)
 
 
 config = {
@@ -48,3 +48,24 @@ def internal_server_error(e):
     """
 
     return render_template('500.html'), 500
+
+
+@errors.app_errorhandler(503)
+def service_unavailable(e):
+    """Service unavailable endpoint.
+
+    Returns a custom 503 error page.
+
+    Parameters
+    ----------
+    e : Error
+        The error that triggered the 503.
+
+    Response codes
+    -------
+        - 503:
+            description: Returns a custom service unavailable error page,
+            asking the client to retry after a second.
+    """
+
+    return render_template('503.html'), 503, {'Retry-After': '1'}
@@ -0,0 +1,174 @@
+"""Messages conditional requests module.
+
+This module provides the HTTP cache validators of the Inbox. A page of the
+Inbox only changes when the inbox of the user changes, which bumps its
+version (see the counters module), so its ETag is computed from that
+version and the query string without querying the messages. Requests
+that send a matching If-None-Match or If-Modified-Since header get a 304
+response before the page is rendered. ETags of compressed pages match
+too, see the compression module.
+"""
+
+import hashlib
+from flask import current_app
+from flask import request
+from flask import Response
+from AOOPMessages.compression import etag_variants
+
+
+def inbox_etag(user_id, inbox_version):
+    """Inbox ETag
+
+    Computes the strong ETag of the requested page of the Inbox of a user.
+
+    Parameters
+    ----------
+    user_id : int
+        Id of the user.
+    inbox_version : InboxVersion
+        Version of the inbox of the user.
+
+    Returns
+    -------
+    str
+        The unquoted ETag.
+    """
+
+    modified_at = inbox_version.modified_at.isoformat() \
+        if inbox_version.modified_at else ''
+
+    return hashlib.sha1(':'.join((
+        str(user_id),
+        str(inbox_version.version),
+        modified_at,
+        request.query_string.decode('latin-1'),
+        current_app.config['RELEASE_VERSION'],
+    )).encode()).hexdigest()
+
+
+def last_modified(inbox_version):
+    """Last Modified
+
+    Returns the Last-Modified date of the Inbox, truncated to seconds as
+    sent in HTTP headers.
+
+    Parameters
+    ----------
+    inbox_version : InboxVersion
+        Version of the inbox of the user.
+
+    Returns
+    -------
+    datetime
+        The date, None if the inbox never changed.
+    """
+
+    if inbox_version.modified_at is None:
+        return None
+
+    return inbox_version.modified_at.replace(microsecond=0)
+
+
+def is_not_modified(etag, modified):
+    """Is Not Modified
+
+    Checks the conditional headers of the request. If-None-Match takes
+    precedence over If-Modified-Since.
+
+    Parameters
+    ----------
+    etag : str
+        Current ETag of the page.
+    modified : datetime
+        Current Last-Modified date of the page, or None.
+
+    Returns
+    -------
+    bool
+        True if the client's copy of the page is up to date.
+    """
+
+    if request.if_none_match:
+        return matching_etag(etag) is not None
+
+    if_modified_since = request.if_modified_since
+    if if_modified_since is None or modified is None:
+        return False
+
+    return modified <= if_modified_since.replace(tzinfo=None)
+
+
+def matching_etag(etag):
+    """Matching ETag
+
+    Finds the representation of the page, uncompressed or compressed,
+    whose ETag is in the If-None-Match header of the request.
+
+    Parameters
+    ----------
+    etag : str
+        Current ETag of the uncompressed page.
+
+    Returns
+    -------
+    str
+        The matching ETag, None if there's none.
+    """
+
+    return next((variant for variant in etag_variants(etag)
+                 if request.if_none_match.contains(variant)), None)
+
+
+def set_validators(response, etag, modified):
+    """Set Validators
+
+    Adds the cache validators to a response of the Inbox. Responses may
+    only be stored by the browser of the user, which has to revalidate
+    them before using them.
+
+    Parameters
+    ----------
+    response : Response
+        Response to add the headers to.
+    etag : str
+        ETag of the page.
+    modified : datetime
+        Last-Modified date of the page, or None.
+
+    Returns
+    -------
+    Response
+        The same response.
+    """
+
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+
+    return response
+
+
+def not_modified(etag, modified):
+    """Not Modified
+
+    Builds the empty 304 response of an up to date Inbox, with the ETag of
+    the representation the client holds.
+
+    Parameters
+    ----------
+    etag : str
+        ETag of the page.
+    modified : datetime
+        Last-Modified date of the page, or None.
+
+    Returns
+    -------
+    Response
+        The 304 response.
+    """
+
+    return set_validators(Response(status=304),
+                          matching_etag(etag) or etag, modified)
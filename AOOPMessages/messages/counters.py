@@ -0,0 +1,226 @@
+"""Messages counters module.
+
+This module provides the methods that keep the denormalized inbox
+counters of each user up to date, so the total and unread number of
+messages can be read with a single primary key lookup.
+
+The counters are updated by the send path (see the sending module) and
+when messages are marked as read. Messages stored any other way are only
+counted after running `flask messages reconcile-counters`.
+
+Every update also bumps the version and modification time of the inbox,
+which the Inbox uses as its HTTP cache validators.
+"""
+
+from collections import Counter
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import bindparam
+from sqlalchemy import case
+from sqlalchemy import false
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import select
+from sqlalchemy import union_all
+from AOOPMessages import db
+from AOOPMessages.models import ArchivedMessage, InboxCounter, Message
+from AOOPMessages.models import User
+from AOOPMessages.messages import threads
+
+
+InboxVersion = namedtuple('InboxVersion', ['version', 'modified_at'])
+InboxVersion.__doc__ = """Version of the inbox of a user.
+
+Attributes
+----------
+    version : int
+        Number of changes to the inbox.
+    modified_at : datetime
+        Date and time of the last change, None if it never changed.
+"""
+
+
+def count_delivered(rows):
+    """Count Delivered
+
+    Adds newly stored messages to the counters of their receivers, as part
+    of the transaction storing them. Callers commit the transaction.
+
+    Parameters
+    ----------
+    rows : list
+        Dicts of column values of the stored messages.
+    """
+
+    received = Counter(row['receiver_id'] for row in rows)
+    if not received:
+        return
+
+    counters = InboxCounter.__table__
+    db.session.execute(
+        counters.update().where(
+            counters.c.user_id == bindparam('receiver_id')
+        ).values(
+            total=counters.c.total + bindparam('received'),
+            unread=counters.c.unread + bindparam('received'),
+            version=counters.c.version + 1,
+            modified_at=datetime.utcnow()
+        ),
+        [{'receiver_id': receiver_id, 'received': received[receiver_id]}
+         for receiver_id in sorted(received)])
+
+
+def get_counts(user_id):
+    """Get Counts
+
+    Reads the counters of the inbox of a user.
+
+    Parameters
+    ----------
+    user_id : int
+        Id of the user.
+
+    Returns
+    -------
+    dict
+        The `total` and `unread` number of messages of the user.
+    """
+
+    row = db.session.query(
+        InboxCounter.total,
+        InboxCounter.unread
+    ).filter(
+        InboxCounter.user_id == user_id
+    ).first()
+
+    if row is None:
+        return {'total': 0, 'unread': 0}
+
+    return {'total': row.total, 'unread': row.unread}
+
+
+def get_version(user_id):
+    """Get Version
+
+    Reads the version of the inbox of a user.
+
+    Parameters
+    ----------
+    user_id : int
+        Id of the user.
+
+    Returns
+    -------
+    InboxVersion
+        The version and modification time of the inbox.
+    """
+
+    row = db.session.query(
+        InboxCounter.version,
+        InboxCounter.modified_at
+    ).filter(
+        InboxCounter.user_id == user_id
+    ).first()
+
+    if row is None:
+        return InboxVersion(version=0, modified_at=None)
+
+    return InboxVersion(version=row.version, modified_at=row.modified_at)
+
+
+def mark_read(user_id, message_id=None):
+    """Mark Read
+
+    Marks received messages as read and updates the unread counter, and the
+    unread messages of their threads, in the same transaction. Archived
+    messages are marked too, since the Inbox keeps listing them.
+
+    Parameters
+    ----------
+    user_id : int
+        Id of the user that received the messages.
+    message_id : int
+        Id of the message to mark as read. All the unread messages of the
+        user are marked if it's None.
+
+    Returns
+    -------
+    int
+        Number of messages that were unread.
+    """
+
+    marked = 0
+
+    for table in (Message.__table__, ArchivedMessage.__table__):
+        # Archived messages keep their id, so a message is only looked up
+        # in the archive if it's not in the messages table.
+        if message_id is not None and marked:
+            break
+
+        query = table.update().where(
+            table.c.receiver_id == user_id
+        ).where(
+            table.c.read == false()
+        )
+
+        if message_id is not None:
+            query = query.where(table.c.id == message_id)
+
+        marked += db.session.execute(query.values(read=True)).rowcount
+
+    if marked:
+        counters = InboxCounter.__table__
+        db.session.execute(
+            counters.update().where(
+                counters.c.user_id == user_id
+            ).values(
+                unread=counters.c.unread - marked,
+                version=counters.c.version + 1,
+                modified_at=datetime.utcnow()
+            ))
+        threads.count_read(user_id, message_id)
+
+    db.session.commit()
+
+    return marked
+
+
+def reconcile():
+    """Reconcile
+
+    Rebuilds the counters of every user from the messages and archived
+    messages tables in one transaction. The inboxes are marked as modified,
+    so cached copies of them are revalidated.
+
+    Returns
+    -------
+    int
+        Number of users whose counters were rebuilt.
+    """
+
+    counters = InboxCounter.__table__
+    messages = Message.__table__
+    archived = ArchivedMessage.__table__
+    users = User.__table__
+
+    received = union_all(
+        select([messages.c.receiver_id, messages.c.read]),
+        select([archived.c.receiver_id, archived.c.read])
+    ).alias('received')
+
+    totals = select([
+        users.c.id,
+        func.count(received.c.receiver_id),
+        func.coalesce(func.sum(case([(received.c.read == false(), 1)],
+                                    else_=0)), 0),
+        literal(datetime.utcnow())
+    ]).select_from(
+        users.outerjoin(received, received.c.receiver_id == users.c.id)
+    ).group_by(users.c.id)
+
+    db.session.execute(counters.delete())
+    result = db.session.execute(counters.insert().from_select(
+        ['user_id', 'total', 'unread', 'modified_at'], totals))
+    db.session.commit()
+
+    return result.rowcount
@@ -0,0 +1,371 @@
+"""Messages events module.
+
+This module provides a publish/subscribe hub used to push new messages to
+the users connected to the message stream, keyed by the id of the
+receiver.
+
+The hub delegates the fan-out to a pluggable backend, configured with the
+import path in MESSAGE_HUB_BACKEND. The default InMemoryBackend only
+reaches subscribers in the same process; deployments running several
+worker processes plug in a backend implementing HubBackend on top of a
+broker shared by the workers.
+
+Every open stream holds a thread of its worker, so the hub caps the
+streams open in the process and per user. Subscriptions beyond the caps
+are refused with a StreamLimitError, and clients poll the inbox counters
+instead.
+
+Example
+-------
+    from AOOPMessages.messages.events import message_hub
+
+    message_hub.init_app(app)
+
+    subscription = message_hub.subscribe(user_id)
+    message_hub.publish(user_id, {'title': 'Hello'})
+    subscription.get(timeout=1)
+
+Attributes
+----------
+    message_hub : MessageHub
+        Instance of the message hub shared by the app.
+"""
+
+import queue
+import threading
+from werkzeug.utils import import_string
+
+
+class HubBackend:
+    """Hub backend class.
+
+    Interface of the backends of the MessageHub.
+    """
+
+    def publish(self, channel, event):
+        """Publish.
+        Delivers an event to the current subscribers of a channel.
+
+        Parameters
+        ----------
+        channel : str
+            Channel to publish to.
+        event : dict
+            JSON serializable event.
+        """
+
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Subscribe.
+        Starts receiving the events published to a channel.
+
+        Parameters
+        ----------
+        channel : str
+            Channel to subscribe to.
+
+        Returns
+        -------
+        Subscription
+            The new subscription.
+        """
+
+        raise NotImplementedError
+
+
+class Subscription:
+    """Subscription class.
+
+    Interface of the subscriptions returned by the hub backends.
+    """
+
+    def get(self, timeout):
+        """Get.
+        Waits for the next event of the subscription.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to wait for an event.
+
+        Returns
+        -------
+        dict
+            The event, None if no event arrived in time.
+        """
+
+        raise NotImplementedError
+
+    def close(self):
+        """Close.
+        Stops receiving events.
+        """
+
+        raise NotImplementedError
+
+
+class InMemoryBackend(HubBackend):
+    """In memory backend class.
+
+    Hub backend delivering events to the subscribers of the same process
+    through bounded queues. Events published to a subscriber whose queue
+    is full are dropped, so a slow client can't make the publisher wait.
+
+    Attributes
+    ----------
+        queue_size : int
+            Maximum number of pending events of each subscriber.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                pass
+
+    def subscribe(self, channel):
+        subscriber = queue.Queue(maxsize=self.queue_size)
+
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+
+        return InMemorySubscription(self, channel, subscriber)
+
+    def unsubscribe(self, channel, subscriber):
+        """Unsubscribe.
+        Removes the queue of a subscriber from a channel.
+
+        Parameters
+        ----------
+        channel : str
+            Channel the subscriber is subscribed to.
+        subscriber : Queue
+            Queue of the subscriber.
+        """
+
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def subscriber_count(self, channel):
+        """Subscriber Count.
+        Counts the current subscribers of a channel.
+
+        Parameters
+        ----------
+        channel : str
+            Channel to count the subscribers of.
+
+        Returns
+        -------
+        int
+            Number of subscribers.
+        """
+
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+class InMemorySubscription(Subscription):
+    """In memory subscription class.
+
+    Subscription of the InMemoryBackend.
+    """
+
+    def __init__(self, backend, channel, subscriber):
+        self._backend = backend
+        self._channel = channel
+        self._subscriber = subscriber
+
+    def get(self, timeout):
+        try:
+            return self._subscriber.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._backend.unsubscribe(self._channel, self._subscriber)
+
+
+class LimitedSubscription(Subscription):
+    """Limited subscription class.
+
+    Subscription of the MessageHub, giving back its stream slot when it's
+    closed.
+    """
+
+    def __init__(self, hub, receiver_id, subscription):
+        self._hub = hub
+        self._receiver_id = receiver_id
+        self._subscription = subscription
+        self._closed = False
+
+    def get(self, timeout):
+        return self._subscription.get(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+
+        self._closed = True
+        self._subscription.close()
+        self._hub.release(self._receiver_id)
+
+
+class MessageHub:
+    """Message hub class.
+
+    Fans out the events of new messages to the subscribers of their
+    receivers.
+
+    Attributes
+    ----------
+        backend : HubBackend
+            Backend delivering the events.
+        max_streams : int
+            Maximum number of subscriptions open in the process, None for
+            no limit.
+        max_streams_per_user : int
+            Maximum number of subscriptions open per user, None for no
+            limit.
+    """
+
+    def __init__(self):
+        self.backend = InMemoryBackend()
+        self.max_streams = None
+        self.max_streams_per_user = None
+        self._lock = threading.Lock()
+        self._streams = {}
+
+    def init_app(self, app):
+        """Init App.
+        Creates the backend configured for the app.
+
+        Parameters
+        ----------
+        app : Flask
+            App to read the MESSAGE_HUB_BACKEND, MESSAGE_HUB_QUEUE_SIZE,
+            MESSAGE_STREAM_MAX_CONNECTIONS and MESSAGE_STREAM_MAX_PER_USER
+            configurations from.
+        """
+
+        backend_class = import_string(app.config['MESSAGE_HUB_BACKEND'])
+        self.backend = backend_class(
+            queue_size=app.config['MESSAGE_HUB_QUEUE_SIZE'])
+        self.max_streams = app.config['MESSAGE_STREAM_MAX_CONNECTIONS']
+        self.max_streams_per_user = app.config['MESSAGE_STREAM_MAX_PER_USER']
+
+        with self._lock:
+            self._streams = {}
+
+    def publish(self, receiver_id, event):
+        """Publish.
+        Publishes the event of a new message to its receiver.
+
+        Parameters
+        ----------
+        receiver_id : int
+            Id of the user that received the message.
+        event : dict
+            JSON serializable event.
+        """
+
+        self.backend.publish(self._channel(receiver_id), event)
+
+    def subscribe(self, receiver_id):
+        """Subscribe.
+        Subscribes to the new messages of a user.
+
+        Parameters
+        ----------
+        receiver_id : int
+            Id of the user.
+
+        Returns
+        -------
+        Subscription
+            The new subscription. It must be closed to free its slot.
+
+        Raises
+        ------
+        StreamLimitError
+            If the process or the user already has the maximum number of
+            open subscriptions.
+        """
+
+        with self._lock:
+            user_streams = self._streams.get(receiver_id, 0)
+            if self.max_streams is not None and \
+                    sum(self._streams.values()) >= self.max_streams:
+                raise StreamLimitError("Too many message streams are open")
+            if self.max_streams_per_user is not None and \
+                    user_streams >= self.max_streams_per_user:
+                raise StreamLimitError(
+                    "Too many message streams are open for the user")
+            self._streams[receiver_id] = user_streams + 1
+
+        try:
+            subscription = self.backend.subscribe(self._channel(receiver_id))
+        except Exception:
+            self.release(receiver_id)
+            raise
+
+        return LimitedSubscription(self, receiver_id, subscription)
+
+    def release(self, receiver_id):
+        """Release.
+        Frees the slot of a closed subscription.
+
+        Parameters
+        ----------
+        receiver_id : int
+            Id of the user the subscription belonged to.
+        """
+
+        with self._lock:
+            user_streams = self._streams.get(receiver_id, 0) - 1
+            if user_streams > 0:
+                self._streams[receiver_id] = user_streams
+            else:
+                self._streams.pop(receiver_id, None)
+
+    def stream_count(self):
+        """Stream Count.
+        Counts the subscriptions open in the process.
+
+        Returns
+        -------
+        int
+            Number of open subscriptions.
+        """
+
+        with self._lock:
+            return sum(self._streams.values())
+
+    def _channel(self, receiver_id):
+        return f'inbox:{receiver_id}'
+
+
+class StreamLimitError(Exception):
+    """StreamLimitError
+
+    This error should be raised when a message stream can't be opened
+    because too many are open already.
+    """
+    pass
+
+
+message_hub = MessageHub()
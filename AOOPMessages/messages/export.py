@@ -0,0 +1,257 @@
+"""Messages export module.
+
+This module exports the whole Inbox of a user, archived messages
+included, as JSON Lines, CSV or mbox. Rows are read in batches with a
+server side cursor where the database supports it, and formatted and
+optionally gzipped as they are read. Memory stays constant whatever the
+size of the Inbox, so the export can be streamed in a response or
+written to a file.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from datetime import timezone
+from email.header import Header
+from email.utils import format_datetime
+from sqlalchemy import select
+from sqlalchemy import union_all
+from AOOPMessages import db
+from AOOPMessages.models import ArchivedMessage, Message, User
+
+
+FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'mbox': 'application/mbox',
+}
+FIELDS = ('id', 'author_email', 'title', 'body', 'timestamp', 'read',
+          'thread_id')
+
+# Output is flushed in chunks of about this size, so a response isn't
+# written one message at a time.
+CHUNK_SIZE = 64 * 1024
+
+
+def export_rows(user_id, batch_size):
+    """Export Rows
+
+    Reads the messages received by a user, archived messages included,
+    oldest first. Both tables are read by a single statement, so the
+    export is a consistent snapshot even if an archive batch moves
+    messages while it's read.
+
+    Parameters
+    ----------
+    user_id : int
+        Id of the user that received the messages.
+    batch_size : int
+        Number of rows fetched from the database at a time.
+
+    Yields
+    ------
+    Row
+        The FIELDS of each message.
+    """
+
+    users = User.__table__
+    received = union_all(*[
+        select([
+            table.c.id.label('id'),
+            users.c.email.label('author_email'),
+            table.c.title,
+            table.c.body,
+            table.c.timestamp.label('timestamp'),
+            table.c.read,
+            table.c.thread_id
+        ]).select_from(
+            table.join(users, users.c.id == table.c.author_id)
+        ).where(
+            table.c.receiver_id == user_id
+        ) for table in (ArchivedMessage.__table__, Message.__table__)
+    ])
+
+    result = db.session.execute(received.order_by(
+        received.c.timestamp, received.c.id
+    ).execution_options(stream_results=True))
+
+    try:
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        result.close()
+
+
+def format_jsonl(rows):
+    """Format JSONL
+
+    Formats messages as JSON Lines.
+
+    Parameters
+    ----------
+    rows : iterable
+        Rows returned by export_rows.
+
+    Yields
+    ------
+    str
+        One JSON object per message, with its timestamp in ISO 8601 format.
+    """
+
+    for row in rows:
+        record = dict(zip(FIELDS, row))
+        record['timestamp'] = record['timestamp'].isoformat()
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def format_csv(rows):
+    """Format CSV
+
+    Formats messages as CSV, with a header row.
+
+    Parameters
+    ----------
+    rows : iterable
+        Rows returned by export_rows.
+
+    Yields
+    ------
+    str
+        The header, then one line per message.
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(FIELDS)
+    for row in rows:
+        writer.writerow([row.id, row.author_email, row.title, row.body,
+                         row.timestamp.isoformat(), int(row.read),
+                         row.thread_id])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def format_mbox(rows):
+    """Format Mbox
+
+    Formats messages as an mbox mailbox, escaping the body lines that
+    start with "From " as mboxrd does.
+
+    Parameters
+    ----------
+    rows : iterable
+        Rows returned by export_rows.
+
+    Yields
+    ------
+    str
+        Each message, with its From line and headers.
+    """
+
+    for row in rows:
+        sent = row.timestamp.replace(tzinfo=timezone.utc)
+        body = '\n'.join(
+            '>' + line if line.lstrip('>').startswith('From ') else line
+            for line in (row.body or '').splitlines())
+
+        yield (
+            f'From {_header(row.author_email)} '
+            f'{sent:%a %b %d %H:%M:%S %Y}\n'
+            f'From: {_header(row.author_email)}\n'
+            f'Subject: {_header(row.title)}\n'
+            f'Date: {format_datetime(sent)}\n'
+            f'Message-ID: <{row.id}@aoopmessages>\n'
+            f'X-Thread-Id: {row.thread_id}\n'
+            'Content-Type: text/plain; charset=utf-8\n'
+            '\n'
+            f'{body}\n'
+            '\n'
+        )
+
+
+FORMATTERS = {
+    'jsonl': format_jsonl,
+    'csv': format_csv,
+    'mbox': format_mbox,
+}
+
+
+def export(user_id, export_format, compress=False, batch_size=1000):
+    """Export
+
+    Exports the Inbox of a user.
+
+    Parameters
+    ----------
+    user_id : int
+        Id of the user that received the messages.
+    export_format : str
+        One of FORMATS.
+    compress : bool
+        Gzip the output.
+    batch_size : int
+        Number of rows fetched from the database at a time.
+
+    Yields
+    ------
+    bytes
+        Chunks of the export.
+    """
+
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    pending = []
+    size = 0
+
+    for text in FORMATTERS[export_format](export_rows(user_id, batch_size)):
+        pending.append(text)
+        size += len(text)
+
+        if size >= CHUNK_SIZE:
+            chunk = ''.join(pending).encode()
+            pending, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+
+    chunk = ''.join(pending).encode()
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def filename(export_format, compress=False):
+    """Filename
+
+    Names an export file.
+
+    Parameters
+    ----------
+    export_format : str
+        One of FORMATS.
+    compress : bool
+        Whether the export is gzipped.
+
+    Returns
+    -------
+    str
+        The name, such as inbox-20261018.jsonl.gz.
+    """
+
+    return f'inbox-{datetime.utcnow():%Y%m%d}.{export_format}' + \
+        ('.gz' if compress else '')
+
+
+def _header(value):
+    # Line breaks would start new headers.
+    value = ' '.join((value or '').split())
+    return value if value.isascii() else Header(value, 'utf-8').encode()
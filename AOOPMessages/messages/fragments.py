@@ -0,0 +1,197 @@
+"""Messages fragments module.
+
+This module provides a cache of the rendered HTML of the message cards of
+the Inbox. Messages can't be edited, so a card only changes when its
+message is read. Cards are keyed by the id, timestamp and read state of
+their message, and by the RELEASE_VERSION, so cached cards never need to
+be invalidated.
+
+Cards are cached in a size bounded in-process LRU. Deployments running
+several worker processes can add a shared second level, configured with
+the import path of a class implementing FragmentBackend in
+FRAGMENT_CACHE_BACKEND.
+
+Example
+-------
+    from AOOPMessages.messages.fragments import fragment_cache
+
+    fragment_cache.init_app(app)
+
+    cards = fragment_cache.render_cards(messages, '_message_card.html')
+
+Attributes
+----------
+    fragment_cache : FragmentCache
+        Instance of the fragment cache shared by the app.
+"""
+
+from flask import current_app
+from flask import Markup
+from werkzeug.utils import import_string
+from AOOPMessages.cache import SizedLRUCache
+
+
+class FragmentBackend:
+    """Fragment backend class.
+
+    Interface of the shared backends of the FragmentCache.
+    """
+
+    def get_many(self, keys):
+        """Get Many.
+        Retrieves cached fragments.
+
+        Parameters
+        ----------
+        keys : list
+            Keys of the fragments, as str.
+
+        Returns
+        -------
+        dict
+            The cached fragments, as str, by key. Missing keys are left
+            out.
+        """
+
+        raise NotImplementedError
+
+    def set_many(self, fragments):
+        """Set Many.
+        Stores fragments.
+
+        Parameters
+        ----------
+        fragments : dict
+            Fragments to store, as str, by key.
+        """
+
+        raise NotImplementedError
+
+
+class FragmentCache:
+    """Fragment cache class.
+
+    Two level cache of rendered fragments: a size bounded in-process LRU
+    and an optional shared FragmentBackend.
+
+    Attributes
+    ----------
+        local : SizedLRUCache
+            In-process cache, read from the FRAGMENT_CACHE_SIZE,
+            FRAGMENT_CACHE_TTL and FRAGMENT_CACHE_BYTES configurations.
+        backend : FragmentBackend
+            Shared cache checked on local misses, None if not configured.
+        enabled : bool
+            Whether cards are cached. Read from FRAGMENT_CACHE_ENABLED.
+        release : str
+            Release the cards are rendered by, part of their keys. Read
+            from RELEASE_VERSION.
+    """
+
+    def __init__(self):
+        self.local = SizedLRUCache('FRAGMENT_CACHE')
+        self.backend = None
+        self.enabled = True
+        self.release = ''
+
+    def init_app(self, app):
+        """Init App.
+        Configures the cache from the app configuration and empties it.
+
+        Parameters
+        ----------
+        app : Flask
+            App to read the FRAGMENT_CACHE_* and RELEASE_VERSION
+            configurations from.
+        """
+
+        self.local.init_app(app)
+        self.enabled = app.config['FRAGMENT_CACHE_ENABLED']
+        self.release = app.config['RELEASE_VERSION']
+
+        backend = app.config['FRAGMENT_CACHE_BACKEND']
+        self.backend = import_string(backend)() if backend else None
+
+    def render_cards(self, messages, template_name):
+        """Render Cards.
+        Renders the card of each message, reusing the cached ones. Must be
+        called inside a request context.
+
+        Parameters
+        ----------
+        messages : list
+            Messages to render, with at least their `id`, `timestamp` and
+            `read` state.
+        template_name : str
+            Template rendering the card of the `message` in its context.
+
+        Returns
+        -------
+        list
+            The rendered cards, as Markup, in the order of the messages.
+        """
+
+        keys = [self._key(template_name, message) for message in messages]
+
+        if self.enabled:
+            cards = {key: card for key, card in
+                     ((key, self.local.get(key)) for key in keys)
+                     if card is not None}
+        else:
+            cards = {}
+
+        missing = [key for key in keys if key not in cards]
+
+        if missing and self.enabled and self.backend is not None:
+            shared = self.backend.get_many(missing)
+            for key, card in shared.items():
+                self.local.set(key, card)
+            cards.update(shared)
+            missing = [key for key in missing if key not in cards]
+
+        if missing:
+            template = current_app.jinja_env.get_template(template_name)
+            rendered = {}
+            for key, message in zip(keys, messages):
+                if key not in cards and key not in rendered:
+                    rendered[key] = template.render(message=message)
+
+            if self.enabled:
+                for key, card in rendered.items():
+                    self.local.set(key, card)
+                if self.backend is not None:
+                    self.backend.set_many(rendered)
+
+            cards.update(rendered)
+
+        return [Markup(cards[key]) for key in keys]
+
+    def stats(self):
+        """Stats.
+        Summarizes the usage of the in-process cache.
+
+        Returns
+        -------
+        dict
+            The `hits`, `misses`, `hit_rate`, `size` and memory used, in
+            `bytes`, by the in-process cache.
+        """
+
+        stats = self.local.stats()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) \
+            if lookups else 0.0
+
+        return stats
+
+    def _key(self, template_name, message):
+        return ':'.join((
+            self.release,
+            template_name,
+            str(message.id),
+            message.timestamp.isoformat(),
+            '1' if message.read else '0',
+        ))
+
+
+fragment_cache = FragmentCache()
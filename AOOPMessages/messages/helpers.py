@@ -1,12 +1,35 @@
 """Messages helper module.
 
-This module provides a helper method to validate user ids,
+This module provides helper methods to validate user ids,
 as well as a custom exception for when the validation fails.
+
+Validations are cached: ids known to exist are kept in `valid_user_ids`
+and ids known not to exist are kept briefly in `invalid_user_ids`, so
+repeated sends to the same users, or retries with the same bad id, don't
+query the database.
+
+Attributes
+----------
+    valid_user_ids : LRUCache
+        Cache of the ids of existing users.
+    invalid_user_ids : LRUCache
+        Short lived cache of ids that don't belong to any user.
 """
 
+from sqlalchemy import event
+from AOOPMessages import db
+from AOOPMessages.cache import LRUCache
 from AOOPMessages.models import User
 
 
+INVALID_USER_ID_ERROR = "The user id is not valid"
+USER_NOT_EXISTS_ERROR = "The user doesn't exist"
+ID_QUERY_CHUNK_SIZE = 500
+
+valid_user_ids = LRUCache('VALID_USER_ID_CACHE')
+invalid_user_ids = LRUCache('INVALID_USER_ID_CACHE')
+
+
 def get_valid_user_id(raw_id):
     """Get Valid User Id
 
@@ -16,8 +39,8 @@ def get_valid_user_id(raw_id):
 
     Parameters
     ----------
-    rawId : string
-        User id to validate.
+    rawId : int or str
+        User id to validate, an int or a string of digits.
 
     Returns
     -------
@@ -26,27 +49,165 @@ def get_valid_user_id(raw_id):
 
     Raises
     ------
-    TypeError
-        If the received id can't be parsed to an int
-    ValueError
-        If the received id isn't valid
     UserNotExistsError
-        If the user doesn't exist in the database
+        If the received id isn't an int or a string of digits, or the
+        user doesn't exist in the database
 
     """
 
     try:
-        user_id = int(raw_id)
-        if user_id < 0:
-            raise ValueError
+        user_id = parse_user_id(raw_id)
+
+        if valid_user_ids.get(user_id):
+            return user_id
 
-        user = User.query.filter_by(id=user_id).first()
-        if user is None:
-            raise UserNotExistsError("The user doesn't exist")
+        if invalid_user_ids.get(user_id):
+            raise UserNotExistsError(USER_NOT_EXISTS_ERROR)
 
-        return user.id
+        exists = db.session.query(
+            db.exists().where(User.id == user_id)
+        ).scalar()
+
+        if not exists:
+            invalid_user_ids.set(user_id, True)
+            raise UserNotExistsError(USER_NOT_EXISTS_ERROR)
+
+        valid_user_ids.set(user_id, True)
+        return user_id
     except (ValueError, TypeError):
-        raise UserNotExistsError("The user id is not valid")
+        raise UserNotExistsError(INVALID_USER_ID_ERROR)
+
+
+def get_valid_user_ids(raw_ids):
+    """Get Valid User Ids
+
+    This method validates many received ids at once, checking the ids that
+    aren't cached with one set based query per chunk of ids.
+
+    Parameters
+    ----------
+    raw_ids : list
+        User ids to validate.
+
+    Returns
+    -------
+    tuple
+        A list with the validated user ids, without duplicates and in the
+        order they were received, and a dict mapping each id that isn't
+        valid to the reason why.
+    """
+
+    parsed_ids = {}
+    failures = {}
+
+    for raw_id in raw_ids:
+        try:
+            parsed_ids.setdefault(parse_user_id(raw_id), raw_id)
+        except (ValueError, TypeError):
+            failures[raw_id] = INVALID_USER_ID_ERROR
+
+    existing_ids, unknown_ids = _split_cached(parsed_ids)
+
+    for start in range(0, len(unknown_ids), ID_QUERY_CHUNK_SIZE):
+        existing_ids.update(_query_existing(
+            unknown_ids[start:start + ID_QUERY_CHUNK_SIZE]))
+
+    valid_ids = []
+    for user_id, raw_id in parsed_ids.items():
+        if user_id in existing_ids:
+            valid_ids.append(user_id)
+        else:
+            failures[raw_id] = USER_NOT_EXISTS_ERROR
+
+    return valid_ids, failures
+
+
+def parse_user_id(raw_id):
+    """Parse User Id
+
+    This method parses a received id without checking that the user
+    exists. Only ints, that aren't bools, and strings of ASCII digits are
+    accepted, as int() would also accept True, 1.5 or ' 1'.
+
+    Parameters
+    ----------
+    raw_id : int or str
+        User id to parse.
+
+    Returns
+    -------
+    int
+        The parsed user id.
+
+    Raises
+    ------
+    TypeError
+        If the received id isn't an int or a string of digits
+    ValueError
+        If the received id is negative
+    """
+
+    if isinstance(raw_id, bool):
+        raise TypeError
+    if isinstance(raw_id, int):
+        user_id = raw_id
+    elif isinstance(raw_id, str) and raw_id.isascii() and raw_id.isdigit():
+        user_id = int(raw_id)
+    else:
+        raise TypeError
+    if user_id < 0:
+        raise ValueError
+    return user_id
+
+
+def _split_cached(user_ids):
+    # Ids cached as existing, and ids that aren't cached either way.
+    existing_ids = set()
+    unknown_ids = []
+
+    for user_id in user_ids:
+        if valid_user_ids.get(user_id):
+            existing_ids.add(user_id)
+        elif not invalid_user_ids.get(user_id):
+            unknown_ids.append(user_id)
+
+    return existing_ids, unknown_ids
+
+
+def _query_existing(user_ids):
+    found_ids = {user_id for user_id, in db.session.query(
+        User.id
+    ).filter(
+        User.id.in_(user_ids)
+    )}
+
+    for user_id in user_ids:
+        if user_id in found_ids:
+            valid_user_ids.set(user_id, True)
+        else:
+            invalid_user_ids.set(user_id, True)
+
+    return found_ids
+
+
+@event.listens_for(User, 'after_insert')
+def forget_invalid_user_id(mapper, connection, target):
+    """Forget Invalid User Id.
+
+    Removes the id of a new user from `invalid_user_ids`.
+    """
+
+    invalid_user_ids.delete(target.id)
+
+
+@event.listens_for(User, 'after_delete')
+def forget_valid_user_id(mapper, connection, target):
+    """Forget Valid User Id.
+
+    Removes the id of a deleted user from `valid_user_ids`.
+    """
+
+    valid_user_ids.delete(target.id)
 
 
 class UserNotExistsError(Exception):
@@ -0,0 +1,393 @@
+"""Messages ingestion module.
+
+This module provides the write-behind queue used when MESSAGES_WRITE_BEHIND
+is enabled. Sends are appended to a durable journal, a local SQLite file,
+and acknowledged right away. A background worker drains the journal into
+the messages table in batched transactions, so spikes in the write
+latency of the database don't reach the users.
+
+Delivery is at least once: a batch is only removed from the journal after
+its transaction commits, and batches claimed by a worker that died are
+claimed again once their lease expires. Every queued row carries an
+idempotency key, so a batch delivered twice is stored once.
+
+A batch that still fails after MESSAGE_QUEUE_MAX_ATTEMPTS attempts is
+stored one row at a time, and the rows that fail on their own are moved
+to the dead_letter table of the journal instead of being retried forever.
+
+Example
+-------
+    from AOOPMessages.messages.ingestion import message_queue
+
+    message_queue.init_app(app)
+
+    message_queue.enqueue(rows)
+    message_queue.drain()
+
+Attributes
+----------
+    message_queue : MessageQueue
+        Instance of the message queue shared by the app.
+"""
+
+import atexit
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError
+from AOOPMessages.messages import sending
+
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS pending ('
+    'key TEXT PRIMARY KEY, '
+    'row TEXT NOT NULL, '
+    'enqueued_at REAL NOT NULL, '
+    'available_at REAL NOT NULL, '
+    'attempts INTEGER NOT NULL DEFAULT 0)',
+    'CREATE INDEX IF NOT EXISTS ix_pending_available_at '
+    'ON pending (available_at, enqueued_at)',
+    'CREATE TABLE IF NOT EXISTS dead_letter ('
+    'key TEXT PRIMARY KEY, '
+    'row TEXT NOT NULL, '
+    'failed_at REAL NOT NULL, '
+    'error TEXT NOT NULL)',
+)
+
+
+class MessageQueue:
+    """Message queue class.
+
+    Durable write-behind queue of message rows, drained into the database
+    by a background thread.
+
+    Attributes
+    ----------
+        path : str
+            Path of the journal file.
+        batch_size : int
+            Maximum number of rows stored per transaction.
+        poll_interval : float
+            Seconds the worker waits when the journal is empty.
+        lease : float
+            Seconds a claimed batch stays hidden from other workers before
+            it's claimed again.
+        max_attempts : int
+            Attempts of a batch before its rows are stored one by one and
+            the failing ones are dead-lettered.
+        drain_timeout : float
+            Seconds the shutdown hook keeps draining the journal.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.batch_size = 500
+        self.poll_interval = 0.5
+        self.lease = 30
+        self.max_attempts = 5
+        self.drain_timeout = 30
+        self._app = None
+        self._lock = threading.Lock()
+        self._stopping = None
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._registered = False
+
+    def init_app(self, app):
+        """Init App.
+        Configures the queue from the app configuration. When write-behind
+        is enabled, the journal is created and the rows left in it by a
+        previous run start draining.
+
+        Parameters
+        ----------
+        app : Flask
+            App to read the MESSAGES_WRITE_BEHIND and MESSAGE_QUEUE_*
+            configurations from, and whose database the rows are stored in.
+        """
+
+        self.stop()
+
+        self._app = app
+        self.path = app.config['MESSAGE_QUEUE_PATH']
+        self.batch_size = app.config['MESSAGE_QUEUE_BATCH_SIZE']
+        self.poll_interval = app.config['MESSAGE_QUEUE_POLL_INTERVAL']
+        self.lease = app.config['MESSAGE_QUEUE_LEASE']
+        self.max_attempts = app.config['MESSAGE_QUEUE_MAX_ATTEMPTS']
+        self.drain_timeout = app.config['MESSAGE_QUEUE_DRAIN_TIMEOUT']
+
+        if not app.config['MESSAGES_WRITE_BEHIND']:
+            return
+
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            for statement in JOURNAL_SCHEMA:
+                connection.execute(statement)
+
+        if not self._registered:
+            atexit.register(self.shutdown)
+            self._registered = True
+
+        if self.pending():
+            self.start()
+
+    def enqueue(self, rows):
+        """Enqueue.
+        Appends message rows to the journal. The rows are durable once this
+        method returns. Rows without an idempotency key get a random one,
+        and rows whose key is already queued are ignored.
+
+        Parameters
+        ----------
+        rows : list
+            Dicts of column values built by sending.build_rows.
+        """
+
+        now = time.time()
+        entries = []
+
+        for row in rows:
+            key = row.get('idempotency_key') or uuid.uuid4().hex
+            entries.append((key, json.dumps({
+                **row,
+                'idempotency_key': key,
+                'timestamp': row['timestamp'].isoformat(),
+            }), now, now))
+
+        with self._connect() as connection:
+            connection.executemany(
+                'INSERT OR IGNORE INTO pending '
+                '(key, row, enqueued_at, available_at) VALUES (?, ?, ?, ?)',
+                entries)
+
+        self.start()
+        self._wakeup.set()
+
+    def pending(self):
+        """Pending.
+        Counts the rows in the journal, including the claimed ones.
+
+        Returns
+        -------
+        int
+            Number of rows not stored in the database yet.
+        """
+
+        with self._connect() as connection:
+            return connection.execute(
+                'SELECT COUNT(*) FROM pending').fetchone()[0]
+
+    def dead_letters(self):
+        """Dead Letters.
+        Counts the rows moved to the dead_letter table of the journal.
+
+        Returns
+        -------
+        int
+            Number of rows that couldn't be stored.
+        """
+
+        with self._connect() as connection:
+            return connection.execute(
+                'SELECT COUNT(*) FROM dead_letter').fetchone()[0]
+
+    def process_batch(self):
+        """Process Batch.
+        Claims the oldest available rows of the journal, stores them in the
+        database in one transaction and removes them from the journal. If
+        the transaction fails, the rows are released to be retried with an
+        exponential backoff. After max_attempts attempts, the rows are
+        stored one by one instead, and the rows that still fail are moved to
+        the dead_letter table. Must be called inside an app context.
+
+        Returns
+        -------
+        int
+            Number of rows claimed.
+        """
+
+        claimed = self._claim()
+        if not claimed:
+            return 0
+
+        keys = [key for key, _, _ in claimed]
+        rows = []
+        for _, row, _ in claimed:
+            row = json.loads(row)
+            row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+            rows.append(row)
+
+        try:
+            sending.deliver(rows)
+        except SQLAlchemyError:
+            attempts = max(attempts for _, _, attempts in claimed)
+            if attempts + 1 >= self.max_attempts:
+                self._deliver_each(claimed, rows)
+                return len(claimed)
+
+            delay = min(2 ** attempts, 60)
+            logger.warning('Storing %s queued messages failed, retrying in '
+                           '%s seconds', len(rows), delay, exc_info=True)
+            self._release(keys, delay)
+            return len(claimed)
+
+        self._acknowledge(keys)
+
+        return len(claimed)
+
+    def drain(self, timeout=None):
+        """Drain.
+        Stores the rows of the journal until it's empty. Rows claimed by
+        the worker are waited for. Must be called inside an app context.
+
+        Parameters
+        ----------
+        timeout : float
+            Maximum seconds to drain for. Drains until the journal is empty
+            if it's None.
+
+        Returns
+        -------
+        bool
+            True if the journal is empty.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if not self.process_batch():
+                time.sleep(self.poll_interval)
+
+        return True
+
+    def start(self):
+        """Start.
+        Starts the background worker, unless it's already running.
+        """
+
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+
+            self._stopping = threading.Event()
+            self._worker = threading.Thread(
+                target=self._work, args=(self._stopping,),
+                name='message-queue', daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        """Stop.
+        Stops the background worker after its current batch.
+        """
+
+        with self._lock:
+            worker, stopping = self._worker, self._stopping
+            self._worker = None
+
+        if worker is not None:
+            stopping.set()
+            self._wakeup.set()
+            worker.join()
+
+    def shutdown(self):
+        """Shutdown.
+        Stops the background worker and drains the journal for up to
+        MESSAGE_QUEUE_DRAIN_TIMEOUT seconds. Registered to run when the
+        process exits.
+        """
+
+        self.stop()
+
+        if self._app is None or not self._app.config['MESSAGES_WRITE_BEHIND']:
+            return
+
+        with self._app.app_context():
+            if not self.drain(self.drain_timeout):
+                logger.warning('%s queued messages left in %s',
+                               self.pending(), self.path)
+
+    def _work(self, stopping):
+        while not stopping.is_set():
+            try:
+                with self._app.app_context():
+                    stored = self.process_batch()
+            except Exception:
+                logger.exception('Draining the message queue failed')
+                stored = 0
+
+            if not stored:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim(self):
+        now = time.time()
+
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            claimed = connection.execute(
+                'SELECT key, row, attempts FROM pending '
+                'WHERE available_at <= ? '
+                'ORDER BY available_at, enqueued_at LIMIT ?',
+                (now, self.batch_size)).fetchall()
+            connection.executemany(
+                'UPDATE pending SET available_at = ?, '
+                'attempts = attempts + 1 WHERE key = ?',
+                [(now + self.lease, key) for key, _, _ in claimed])
+            connection.execute('COMMIT')
+
+        return claimed
+
+    def _deliver_each(self, claimed, rows):
+        for (key, row, _), values in zip(claimed, rows):
+            try:
+                sending.deliver([values])
+            except SQLAlchemyError as error:
+                logger.error('Storing queued message %s failed %s times, '
+                             'moved to the dead letters', key,
+                             self.max_attempts, exc_info=True)
+                self._dead_letter(key, row, error)
+            else:
+                self._acknowledge([key])
+
+    def _dead_letter(self, key, row, error):
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'INSERT OR REPLACE INTO dead_letter '
+                '(key, row, failed_at, error) VALUES (?, ?, ?, ?)',
+                (key, row, time.time(), repr(error)))
+            connection.execute('DELETE FROM pending WHERE key = ?', (key,))
+            connection.execute('COMMIT')
+
+    def _acknowledge(self, keys):
+        with self._connect() as connection:
+            connection.executemany('DELETE FROM pending WHERE key = ?',
+                                   [(key,) for key in keys])
+
+    def _release(self, keys, delay):
+        with self._connect() as connection:
+            connection.executemany(
+                'UPDATE pending SET available_at = ? WHERE key = ?',
+                [(time.time() + delay, key) for key in keys])
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                    exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30,
+                                     isolation_level=None)
+        connection.execute('PRAGMA synchronous=FULL')
+
+        return contextlib.closing(connection)
+
+
+message_queue = MessageQueue()
@@ -3,35 +3,80 @@
 This module contains the implementation of the messaging system for the app.
 """
 
+import json
+import time
+import click
 from flask import url_for
 from flask import redirect
 from flask import render_template
 from flask import Blueprint
 from flask import request
 from flask import flash
+from flask import current_app
+from flask import jsonify
+from flask import Response
+from flask import make_response
+from flask import abort
+from flask import stream_with_context
 from flask_login import current_user
 from AOOPMessages import db
-from AOOPMessages.models import Message, User
+from AOOPMessages.routing import read_only
+from AOOPMessages.routing import stick_to_primary
+from AOOPMessages.models import ArchivedMessage, Message, ThreadSummary
+from AOOPMessages.models import User
 from AOOPMessages.messages.helpers import UserNotExistsError
 from AOOPMessages.messages import helpers
+from AOOPMessages.messages import sending
+from AOOPMessages.messages import counters
+from AOOPMessages.messages import search as message_search
+from AOOPMessages.messages import export as message_export
+from AOOPMessages.messages import conditional
+from AOOPMessages.messages import threads
+from AOOPMessages.messages import retention
+from AOOPMessages.messages.pagination import paginate
+from AOOPMessages.messages.pagination import paginate_merged
+from AOOPMessages.messages.pagination import InvalidCursorError
+from AOOPMessages.messages.recipients import recipient_index
+from AOOPMessages.messages.events import message_hub
+from AOOPMessages.messages.events import StreamLimitError
+from AOOPMessages.messages.ingestion import message_queue
+from AOOPMessages.messages.fragments import fragment_cache
 
 
 messages = Blueprint('messages', __name__)
 
 AUTH_LOGIN_BLUEPRINT = 'auth.login'
+UNDELIVERED_MESSAGE_ERROR = "The message couldn't be delivered"
 
 
 @messages.route('/messages', methods=['GET'])
+@read_only
 def inbox():
     """This is the Inbox endpoint.
-    Call this endpoint while logged in to read your messages
+    Call this endpoint while logged in to read your messages, newest first.
+    Archived messages are listed after the others.
+
+    Parameters
+    ----------
+    before : str
+        Optional cursor to load the page of messages older than it.
+    after : str
+        Optional cursor to load the page of messages newer than it.
 
     Response codes
     --------
         - 302:
-            description: The user is not logged in. Redirected to login page.
+            - Not logged in description: The user is not logged in.
+            Redirected to login page.
+            - Bad cursor description: The cursor is not valid, redirected
+            to the first page of the Inbox.
+        - 304:
+            description: The page matches the If-None-Match or
+                If-Modified-Since header of the request. Nothing changed
+                in the Inbox since it was sent.
         - 200:
-            description: Returns the Inbox page with all the received messages.
+            description: Returns the Inbox page with a page of the received
+                messages, with its ETag and Last-Modified headers.
         - 500:
             description: There was an error retrieving the messages for the
                 current user.
@@ -39,17 +84,600 @@ def inbox():
     if not current_user.is_authenticated:
         return redirect(url_for(AUTH_LOGIN_BLUEPRINT))
 
-    received_messages = Message.query.filter_by(
-        receiver_id=current_user.id
+    inbox_version = counters.get_version(current_user.id)
+    etag = conditional.inbox_etag(current_user.id, inbox_version)
+    modified = conditional.last_modified(inbox_version)
+
+    if conditional.is_not_modified(etag, modified):
+        return conditional.not_modified(etag, modified)
+
+    query = db.session.query(
+        Message.id,
+        Message.title,
+        Message.body,
+        Message.timestamp,
+        Message.read,
+        Message.thread_id,
+        User.email.label('author_email')
+    ).join(
+        Message.author
+    ).filter(
+        Message.receiver_id == current_user.id
+    )
+
+    archived_query = db.session.query(
+        ArchivedMessage.id,
+        ArchivedMessage.title,
+        ArchivedMessage.body,
+        ArchivedMessage.timestamp,
+        ArchivedMessage.read,
+        ArchivedMessage.thread_id,
+        User.email.label('author_email')
+    ).join(
+        ArchivedMessage.author
+    ).filter(
+        ArchivedMessage.receiver_id == current_user.id
+    )
+
+    try:
+        page = paginate_merged(
+            [(query, Message.timestamp, Message.id),
+             (archived_query, ArchivedMessage.timestamp, ArchivedMessage.id)],
+            current_app.config['MESSAGES_PER_PAGE'],
+            before=request.args.get('before'),
+            after=request.args.get('after'))
+    except InvalidCursorError:
+        return redirect(url_for('messages.inbox'))
+
+    response = make_response(render_template(
+        'messages.html',
+        receivedMessages=page.items,
+        receivedCards=fragment_cache.render_cards(page.items,
+                                                  '_message_card.html'),
+        nextCursor=page.next_cursor,
+        previousCursor=page.previous_cursor))
+
+    return conditional.set_validators(response, etag, modified)
+
+
+@messages.route('/messages/sent', methods=['GET'])
+@read_only
+def sent():
+    """This is the Sent endpoint.
+    Call this endpoint while logged in to read the messages you sent,
+    newest first. Archived messages are listed after the others.
+
+    Parameters
+    ----------
+    before : str
+        Optional cursor to load the page of messages older than it.
+    after : str
+        Optional cursor to load the page of messages newer than it.
+
+    Response codes
+    --------
+        - 302:
+            - Not logged in description: The user is not logged in.
+            Redirected to login page.
+            - Bad cursor description: The cursor is not valid, redirected
+            to the first page of the Sent view.
+        - 200:
+            description: Returns the Sent page with a page of the sent
+                messages.
+    """
+    if not current_user.is_authenticated:
+        return redirect(url_for(AUTH_LOGIN_BLUEPRINT))
+
+    query = db.session.query(
+        Message.id,
+        Message.title,
+        Message.body,
+        Message.timestamp,
+        Message.read,
+        Message.thread_id,
+        User.email.label('receiver_email')
+    ).join(
+        Message.receiver
+    ).filter(
+        Message.author_id == current_user.id
+    )
+
+    archived_query = db.session.query(
+        ArchivedMessage.id,
+        ArchivedMessage.title,
+        ArchivedMessage.body,
+        ArchivedMessage.timestamp,
+        ArchivedMessage.read,
+        ArchivedMessage.thread_id,
+        User.email.label('receiver_email')
+    ).join(
+        ArchivedMessage.receiver
+    ).filter(
+        ArchivedMessage.author_id == current_user.id
+    )
+
+    try:
+        page = paginate_merged(
+            [(query, Message.timestamp, Message.id),
+             (archived_query, ArchivedMessage.timestamp, ArchivedMessage.id)],
+            current_app.config['MESSAGES_PER_PAGE'],
+            before=request.args.get('before'),
+            after=request.args.get('after'))
+    except InvalidCursorError:
+        return redirect(url_for('messages.sent'))
+
+    return render_template(
+        'sent.html',
+        sentMessages=page.items,
+        sentCards=fragment_cache.render_cards(page.items, '_sent_card.html'),
+        nextCursor=page.next_cursor,
+        previousCursor=page.previous_cursor)
+
+
+@messages.route('/messages/threads', methods=['GET'])
+@read_only
+def thread_list():
+    """This is the Conversations endpoint.
+    Call this endpoint while logged in to read your conversations, the one
+    with the latest message first. Conversations are listed from their
+    summaries, so a page costs the same whatever the number of messages.
+
+    Parameters
+    ----------
+    before : str
+        Optional cursor to load the page of conversations older than it.
+    after : str
+        Optional cursor to load the page of conversations newer than it.
+
+    Response codes
+    --------
+        - 302:
+            - Not logged in description: The user is not logged in.
+            Redirected to login page.
+            - Bad cursor description: The cursor is not valid, redirected
+            to the first page of the Conversations view.
+        - 200:
+            description: Returns the Conversations page with a page of the
+                conversations of the user.
+    """
+    if not current_user.is_authenticated:
+        return redirect(url_for(AUTH_LOGIN_BLUEPRINT))
+
+    query = db.session.query(
+        ThreadSummary.thread_id.label('id'),
+        ThreadSummary.last_activity.label('timestamp'),
+        ThreadSummary.title,
+        ThreadSummary.message_count,
+        ThreadSummary.unread,
+        User.email.label('other_email')
+    ).join(
+        User, User.id == ThreadSummary.other_user_id
+    ).filter(
+        ThreadSummary.user_id == current_user.id
+    )
+
+    try:
+        page = paginate(query, ThreadSummary.last_activity,
+                        ThreadSummary.thread_id,
+                        current_app.config['MESSAGES_PER_PAGE'],
+                        before=request.args.get('before'),
+                        after=request.args.get('after'))
+    except InvalidCursorError:
+        return redirect(url_for('messages.thread_list'))
+
+    return render_template(
+        'threads.html',
+        threads=page.items,
+        nextCursor=page.next_cursor,
+        previousCursor=page.previous_cursor)
+
+
+@messages.route('/messages/threads/<int:thread_id>', methods=['GET'])
+@read_only
+def thread(thread_id):
+    """This is the Conversation endpoint.
+    Call this endpoint while logged in to read the messages of one of your
+    conversations, newest first, and reply to it.
+
+    Parameters
+    ----------
+    thread_id : int
+        Id of the conversation.
+    before : str
+        Optional cursor to load the page of messages older than it.
+    after : str
+        Optional cursor to load the page of messages newer than it.
+
+    Response codes
+    --------
+        - 302:
+            - Not logged in description: The user is not logged in.
+            Redirected to login page.
+            - Bad cursor description: The cursor is not valid, redirected
+            to the first page of the conversation.
+        - 404:
+            description: The user doesn't take part in the conversation.
+        - 200:
+            description: Returns the Conversation page with a page of its
+                messages.
+    """
+    if not current_user.is_authenticated:
+        return redirect(url_for(AUTH_LOGIN_BLUEPRINT))
+
+    summary = threads.get_summary(current_user.id, thread_id)
+    if summary is None:
+        abort(404)
+
+    query = db.session.query(
+        Message.id,
+        Message.author_id,
+        Message.title,
+        Message.body,
+        Message.timestamp,
+        Message.read,
+        User.email.label('author_email')
     ).join(
         Message.author
-    ).all()
+    ).filter(
+        Message.thread_id == thread_id,
+        db.or_(Message.receiver_id == current_user.id,
+               Message.author_id == current_user.id)
+    )
+
+    try:
+        page = paginate(query, Message.timestamp, Message.id,
+                        current_app.config['MESSAGES_PER_PAGE'],
+                        before=request.args.get('before'),
+                        after=request.args.get('after'))
+    except InvalidCursorError:
+        return redirect(url_for('messages.thread', thread_id=thread_id))
+
+    return render_template(
+        'thread.html',
+        thread=summary,
+        replyTitle=threads.reply_title(summary.title),
+        threadMessages=page.items,
+        nextCursor=page.next_cursor,
+        previousCursor=page.previous_cursor)
+
+
+@messages.route('/messages/threads/<int:thread_id>/reply', methods=['POST'])
+def reply(thread_id):
+    """This is the Reply endpoint.
+    Call this endpoint while logged in to reply to one of your
+    conversations. The reply is sent to the other participant.
+
+    Parameters
+    ----------
+    thread_id : int
+        Id of the conversation.
+    title : str
+        Optional title of the reply. Defaults to the title of the
+        conversation with a "Re: " prefix.
+    body : str
+        Body of the reply.
+    idempotency_key : str
+        Optional key of the send, also read from the Idempotency-Key
+        header. Retrying a send with the same key doesn't store the reply
+        again.
+
+    Response codes
+    --------
+        - 302:
+            - Not logged in description: The user is not logged in.
+            Redirected to login page.
+            - Sent description: Sent the reply and redirects to the
+            conversation. With MESSAGES_WRITE_BEHIND the reply is queued,
+            and stored shortly after.
+        - 404:
+            description: The user doesn't take part in the conversation.
+    """
+    if not current_user.is_authenticated:
+        return redirect(url_for(AUTH_LOGIN_BLUEPRINT))
+
+    summary = threads.get_summary(current_user.id, thread_id)
+    if summary is None:
+        abort(404)
+
+    send_rows(sending.build_rows(
+        current_user.id,
+        [summary.other_user_id],
+        request.form.get('title') or threads.reply_title(summary.title),
+        request.form.get('body'),
+        idempotency_key(),
+        thread_id=thread_id
+    ))
+
+    return redirect(url_for('messages.thread', thread_id=thread_id))
+
+
+@messages.route('/messages/search', methods=['GET'])
+@read_only
+def search():
+    """This is the Search endpoint.
+    Call this endpoint while logged in to search your received messages by
+    the words in their title or body, best matches first.
+
+    Parameters
+    ----------
+    q : str
+        Words to search. Messages must contain all of them.
+    page : int
+        Optional number of the page of results, starting at 1.
+
+    Response codes
+    --------
+        - 302:
+            description: The user is not logged in. Redirected to login page.
+        - 200:
+            description: Returns the Search page with a page of the
+                matching messages.
+    """
+
+    if not current_user.is_authenticated:
+        return redirect(url_for(AUTH_LOGIN_BLUEPRINT))
+
+    query = request.args.get('q', '')
+    page_number = min(max(request.args.get('page', 1, type=int), 1),
+                      current_app.config['SEARCH_MAX_PAGE'])
+
+    page = message_search.search(
+        current_user.id, query, page_number,
+        current_app.config['SEARCH_RESULTS_PER_PAGE'])
+
+    return render_template('search.html',
+                           query=query,
+                           results=page.items,
+                           page=page.page,
+                           hasNext=page.has_next and
+                           page.page < current_app.config['SEARCH_MAX_PAGE'])
+
+
+@messages.route('/messages/export', methods=['GET'])
+@read_only
+def export():
+    """This is the Export endpoint.
+    Call this endpoint while logged in to download your whole Inbox,
+    archived messages included, oldest first. The export is streamed as it
+    is read from the database, so it starts right away and uses the same
+    memory whatever the size of the Inbox.
+
+    Parameters
+    ----------
+    format : str
+        Optional format of the export: jsonl (JSON Lines, the default), csv
+        or mbox.
+    gzip : str
+        Optional. Gzip the export if it's set to anything else than 0.
+
+    Response codes
+    --------
+        - 302:
+            description: The user is not logged in. Redirected to login page.
+        - 400:
+            description: The format is not supported.
+        - 200:
+            description: Returns the export as an attachment.
+    """
+
+    if not current_user.is_authenticated:
+        return redirect(url_for(AUTH_LOGIN_BLUEPRINT))
+
+    return export_response(current_user.id)
+
+
+@messages.route('/messages/counts', methods=['GET'])
+@read_only
+def counts():
+    """This is the Inbox counts endpoint.
+    Call this endpoint while logged in to get the number of messages in
+    your Inbox. It reads the precomputed counters of the user, so it's
+    cheap to poll whatever the size of the Inbox.
+
+    Response codes
+    --------
+        - 401:
+            description: The user is not logged in.
+        - 200:
+            description: Returns a JSON object with the `total` and `unread`
+                number of received messages.
+    """
+
+    if not current_user.is_authenticated:
+        return jsonify(error='Login required'), 401
+
+    return jsonify(counters.get_counts(current_user.id))
+
+
+@messages.route('/messages/stream', methods=['GET'])
+def stream():
+    """This is the Message stream endpoint.
+    Call this endpoint while logged in to receive your new messages as
+    Server-Sent Events, instead of polling the Inbox. Each new message is
+    sent as a `message` event whose data is a JSON object with its
+    `author_email`, `title`, `body` and `timestamp`. A comment is sent
+    every MESSAGE_STREAM_HEARTBEAT seconds to keep the connection open,
+    and the stream ends after MESSAGE_STREAM_MAX_DURATION seconds, when
+    clients reconnect.
+
+    Each open stream holds a thread of its worker, so at most
+    MESSAGE_STREAM_MAX_CONNECTIONS are open per worker process, and at
+    most MESSAGE_STREAM_MAX_PER_USER per user. Clients refused a stream
+    poll the counts endpoint instead.
 
-    return render_template('messages.html',
-                           receivedMessages=received_messages)
+    Response codes
+    --------
+        - 401:
+            description: The user is not logged in.
+        - 503:
+            description: Too many streams are open.
+        - 200:
+            description: Returns the event stream.
+    """
+
+    if not current_user.is_authenticated:
+        return jsonify(error='Login required'), 401
+
+    try:
+        subscription = message_hub.subscribe(current_user.id)
+    except StreamLimitError as error:
+        return jsonify(error=str(error)), 503, {'Retry-After': '60'}
+
+    heartbeat = current_app.config['MESSAGE_STREAM_HEARTBEAT']
+    deadline = time.monotonic() + \
+        current_app.config['MESSAGE_STREAM_MAX_DURATION']
+
+    def generate():
+        yield 'retry: 5000\n\n'
+        while time.monotonic() < deadline:
+            remaining = max(deadline - time.monotonic(), 0)
+            event = subscription.get(timeout=min(heartbeat, remaining))
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield f'event: message\ndata: {json.dumps(event)}\n\n'
+
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    # Closed with the response, even if the client leaves before the first
+    # event is sent.
+    response.call_on_close(subscription.close)
+    return response
+
+
+@messages.route('/messages/<int:message_id>/read', methods=['POST'])
+def read(message_id):
+    """This is the Mark as read endpoint.
+    Call this endpoint while logged in to mark a received message as read.
+
+    Parameters
+    ----------
+    message_id : int
+        Id of the message to mark as read.
+
+    Response codes
+    --------
+        - 302:
+            - Not logged in description: The user is not logged in.
+            Redirected to login page.
+            - Marked description: The message is marked as read,
+            redirected back to the Inbox.
+    """
+
+    if not current_user.is_authenticated:
+        return redirect(url_for(AUTH_LOGIN_BLUEPRINT))
+
+    counters.mark_read(current_user.id, message_id)
+    stick_to_primary()
+
+    return redirect(request.referrer or url_for('messages.inbox'))
+
+
+@messages.route('/messages/read', methods=['POST'])
+def read_all():
+    """This is the Mark all as read endpoint.
+    Call this endpoint while logged in to mark all your messages as read.
+
+    Response codes
+    --------
+        - 302:
+            - Not logged in description: The user is not logged in.
+            Redirected to login page.
+            - Marked description: The messages are marked as read,
+            redirected to the Inbox.
+    """
+
+    if not current_user.is_authenticated:
+        return redirect(url_for(AUTH_LOGIN_BLUEPRINT))
+
+    counters.mark_read(current_user.id)
+    stick_to_primary()
+
+    return redirect(url_for('messages.inbox'))
+
+
+@messages.cli.command('reconcile-counters')
+def reconcile_counters_command():
+    """Rebuild the inbox counters of every user from their messages."""
+
+    rebuilt = counters.reconcile()
+    click.echo(f'Rebuilt the inbox counters of {rebuilt} users')
+
+
+@messages.cli.command('reconcile-threads')
+def reconcile_threads_command():
+    """Rebuild the conversation summaries of every user from the messages."""
+
+    rebuilt = threads.reconcile()
+    click.echo(f'Rebuilt {rebuilt} conversation summaries')
+
+
+@messages.cli.command('archive')
+@click.option('--days', type=int, default=None,
+              help='Age in days of the messages to archive. Defaults to '
+                   'RETENTION_DAYS.')
+@click.option('--batch-size', type=int, default=None,
+              help='Messages archived per transaction. Defaults to '
+                   'RETENTION_BATCH_SIZE.')
+@click.option('--max-batches', type=int, default=None,
+              help='Maximum number of batches to archive.')
+@click.option('--jsonl', 'directory', type=click.Path(file_okay=False),
+              default=None,
+              help='Move the messages to gzipped JSONL files in this '
+                   'directory instead of the archive table.')
+def archive_command(days, batch_size, max_batches, directory):
+    """Move the old messages out of the messages table."""
+
+    result = retention.archive(
+        days if days is not None else current_app.config['RETENTION_DAYS'],
+        batch_size or current_app.config['RETENTION_BATCH_SIZE'],
+        max_batches=max_batches,
+        pause=current_app.config['RETENTION_BATCH_PAUSE'],
+        directory=directory)
+
+    click.echo(f'Archived {result.messages} messages in {result.batches} '
+               'batches')
+
+
+@messages.cli.command('export')
+@click.argument('email')
+@click.option('--format', 'export_format',
+              type=click.Choice(sorted(message_export.FORMATS)),
+              default='jsonl', help='Format of the export.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the export.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True),
+              default='-', help='File to write the export to. Defaults to '
+                                'the standard output.')
+def export_command(email, export_format, compress, output):
+    """Export the Inbox of the user with an email."""
+
+    user_id = db.session.query(User.id).filter_by(email=email).scalar()
+    if user_id is None:
+        raise click.ClickException(f'There is no user with email {email}')
+
+    with click.open_file(output, 'wb') as file:
+        for chunk in message_export.export(
+                user_id, export_format, compress,
+                current_app.config['EXPORT_BATCH_SIZE']):
+            file.write(chunk)
+
+
+@messages.cli.command('drain-queue')
+@click.option('--timeout', type=float, default=None,
+              help='Maximum seconds to drain for.')
+def drain_queue_command(timeout):
+    """Store the queued messages of the write-behind journal."""
+
+    if message_queue.drain(timeout):
+        click.echo('The message queue is empty')
+    else:
+        click.echo(f'{message_queue.pending()} messages are still queued')
 
 
 @messages.route('/messages/send', methods=['GET'])
+@read_only
 def send():
     """This is the Send message form endpoint.
     Call this endpoint while logged in to fill and send a message for another
@@ -60,21 +688,47 @@ def send():
         - 302:
             description: The user is not logged in. Redirected to login page.
         - 200:
-            description: Returns the send message form page.
-        - 500:
-            description: There was an error retrieving the users to send
-                a message to.
+            description: Returns the send message form page. Recipients are
+                loaded on demand from the Recipients endpoint.
     """
 
     if not current_user.is_authenticated:
         return redirect(url_for(AUTH_LOGIN_BLUEPRINT))
 
-    users = User.query.filter(
-        User.id != current_user.id
-    ).all()
+    return render_template('send_message.html')
+
+
+@messages.route('/messages/recipients', methods=['GET'])
+@read_only
+def recipients():
+    """This is the Recipients endpoint.
+    Call this endpoint while logged in to search users to send a message to.
+
+    Parameters
+    ----------
+    q : str
+        Start of the email of the users to search. Case insensitive.
+
+    Response codes
+    --------
+        - 401:
+            description: The user is not logged in.
+        - 200:
+            description: Returns a JSON object with a `recipients` list of
+                the matching users, each with its `id` and `email`.
+    """
+
+    if not current_user.is_authenticated:
+        return jsonify(error='Login required'), 401
 
-    return render_template('send_message.html',
-                           users=users)
+    results = recipient_index.search(
+        request.args.get('q', ''),
+        exclude_id=current_user.id,
+        limit=current_app.config['RECIPIENT_SEARCH_LIMIT'])
+
+    return jsonify(recipients=[
+        {'id': user_id, 'email': email} for user_id, email in results
+    ])
 
 
 @messages.route('/messages/send', methods=['POST'])
@@ -90,13 +744,19 @@ def send_post():
         Title of the message.
     body : str
         Body of the message.
+    idempotency_key : str
+        Optional key of the send, also read from the Idempotency-Key
+        header. Retrying a send with the same key doesn't store the message
+        again.
 
     Response codes
     --------
         - 302:
             description: The user is not logged in. Redirected to login page.
         - 200:
-            description: Sent the message and redirects to Inbox.
+            description: Sent the message and redirects to Inbox. With
+                MESSAGES_WRITE_BEHIND the message is queued, and stored
+                shortly after.
         - 500:
             description: There was an error sending the message.
     """
@@ -108,18 +768,192 @@ def send_post():
         receiver_id = helpers.get_valid_user_id(
             request.form.get('to'))
 
-        message = Message(
-            author_id=current_user.id,
-            receiver_id=receiver_id,
-            title=request.form.get('title'),
-            body=request.form.get('body')
-        )
-
-        db.session.add(message)
-        db.session.commit()
+        send_rows(sending.build_rows(
+            current_user.id,
+            [receiver_id],
+            request.form.get('title'),
+            request.form.get('body'),
+            idempotency_key()
+        ))
 
         return redirect(url_for('messages.inbox'))
 
     except UserNotExistsError as e:
         flash(message=str(e), category='error')
         return redirect(url_for('messages.send'))
+
+
+@messages.route('/messages/send/bulk', methods=['POST'])
+def send_bulk_post():
+    """This is the Bulk send message endpoint.
+    Call this endpoint while logged in to send the same message to many
+    users at once.
+
+    Parameters
+    ----------
+    to : str
+        Ids of the users to send the message to. The parameter can be
+        repeated and each value can hold many comma separated ids.
+    title : str
+        Title of the message.
+    body : str
+        Body of the message.
+    idempotency_key : str
+        Optional key of the send, also read from the Idempotency-Key
+        header. Retrying a send with the same key doesn't store the message
+        again.
+
+    Response codes
+    --------
+        - 401:
+            description: The user is not logged in.
+        - 400:
+            description: There are no recipients or more than
+                BULK_SEND_MAX_RECIPIENTS.
+        - 200:
+            description: Returns a JSON object with the number of `sent`
+                messages and a `failed` list with the `to` id and `error`
+                of each recipient the message couldn't be sent to.
+    """
+
+    if not current_user.is_authenticated:
+        return jsonify(error='Login required'), 401
+
+    raw_ids = [raw_id.strip()
+               for value in request.form.getlist('to')
+               for raw_id in value.split(',')
+               if raw_id.strip()]
+
+    if not raw_ids:
+        return jsonify(error='At least one recipient is required'), 400
+
+    if len(raw_ids) > current_app.config['BULK_SEND_MAX_RECIPIENTS']:
+        return jsonify(error='Too many recipients'), 400
+
+    sent, failed = send_bulk(current_user.id, raw_ids,
+                             request.form.get('title'),
+                             request.form.get('body'),
+                             idempotency_key())
+
+    return jsonify(sent=sent, failed=failed)
+
+
+def idempotency_key():
+    """Idempotency Key
+
+    Reads the optional idempotency key of a send from the Idempotency-Key
+    header or the idempotency_key form field.
+
+    Returns
+    -------
+    str
+        The key, None if the request has none.
+    """
+
+    return request.headers.get('Idempotency-Key') or \
+        request.form.get('idempotency_key') or None
+
+
+def send_rows(rows):
+    """Send Rows
+
+    Stores the rows of a send, or queues them when MESSAGES_WRITE_BEHIND
+    is enabled.
+
+    Parameters
+    ----------
+    rows : list
+        Dicts of column values built by sending.build_rows.
+    """
+
+    if current_app.config['MESSAGES_WRITE_BEHIND']:
+        message_queue.enqueue(rows)
+    else:
+        sending.deliver(rows)
+        stick_to_primary()
+
+
+def send_bulk(author_id, raw_ids, title, body, key=None):
+    """Send Bulk
+
+    Validates the recipients of a bulk send and stores its rows in chunks,
+    or queues them when MESSAGES_WRITE_BEHIND is enabled.
+
+    Parameters
+    ----------
+    author_id : int
+        Id of the user sending the message.
+    raw_ids : list
+        Ids of the users to send the message to, not validated yet.
+    title : str
+        Title of the message.
+    body : str
+        Body of the message.
+    key : str
+        Optional idempotency key of the send.
+
+    Returns
+    -------
+    tuple
+        The number of sent messages, and a list with the `to` id and
+        `error` of each recipient the message couldn't be sent to.
+    """
+
+    receiver_ids, failures = helpers.get_valid_user_ids(raw_ids)
+
+    rows = sending.build_rows(author_id, receiver_ids, title, body, key)
+
+    if current_app.config['MESSAGES_WRITE_BEHIND']:
+        message_queue.enqueue(rows)
+        failed_rows = []
+    else:
+        failed_rows = sending.deliver_in_chunks(
+            rows, current_app.config['BULK_SEND_CHUNK_SIZE'])
+        stick_to_primary()
+
+    failed = [{'to': raw_id, 'error': error}
+              for raw_id, error in failures.items()]
+    failed.extend({'to': str(row['receiver_id']),
+                   'error': UNDELIVERED_MESSAGE_ERROR}
+                  for row in failed_rows)
+
+    return len(receiver_ids) - len(failed_rows), failed
+
+
+def export_response(user_id):
+    """Export Response
+
+    Builds the streamed response of an Inbox export, in the format and
+    compression requested by the format and gzip parameters.
+
+    Parameters
+    ----------
+    user_id : int
+        Id of the user whose Inbox is exported.
+
+    Returns
+    -------
+    Response
+        The export as an attachment, or a 400 JSON error if the format is
+        not supported.
+    """
+
+    export_format = request.args.get('format', 'jsonl')
+    if export_format not in message_export.FORMATS:
+        return jsonify(error='Unsupported export format'), 400
+
+    compress = request.args.get('gzip', '0') not in ('', '0')
+
+    chunks = message_export.export(user_id, export_format, compress,
+                                   current_app.config['EXPORT_BATCH_SIZE'])
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress
+        else message_export.FORMATS[export_format],
+        headers={
+            'Content-Disposition': 'attachment; filename="'
+            f'{message_export.filename(export_format, compress)}"',
+            'Cache-Control': 'no-store',
+            'X-Accel-Buffering': 'no',
+        })
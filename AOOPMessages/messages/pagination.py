@@ -0,0 +1,211 @@
+"""Messages pagination module.
+
+This module provides keyset (cursor based) pagination for message listings,
+as well as a custom exception for when a cursor can't be decoded.
+
+Pages are ordered newest first by (timestamp, id). Instead of an OFFSET,
+each page is fetched by seeking past the (timestamp, id) of the last row of
+the previous page, so fetching page N costs the same as fetching page 1
+when the listing is backed by a matching composite index.
+"""
+
+import base64
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+CURSOR_SEPARATOR = '|'
+
+Page = namedtuple('Page', ['items', 'next_cursor', 'previous_cursor'])
+Page.__doc__ = """Page of a keyset paginated listing.
+
+Attributes
+----------
+    items : list
+        Rows of the page, newest first.
+    next_cursor : str
+        Cursor to fetch the next (older) page, None if there isn't one.
+    previous_cursor : str
+        Cursor to fetch the previous (newer) page, None if there isn't one.
+"""
+
+
+def encode_cursor(timestamp, row_id):
+    """Encode Cursor
+
+    Builds an opaque cursor pointing at a row of a listing.
+
+    Parameters
+    ----------
+    timestamp : datetime
+        Timestamp of the row.
+    row_id : int
+        Id of the row.
+
+    Returns
+    -------
+    str
+        URL safe cursor.
+    """
+
+    raw = f"{timestamp.isoformat()}{CURSOR_SEPARATOR}{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode Cursor
+
+    Parses a cursor built by encode_cursor.
+
+    Parameters
+    ----------
+    cursor : str
+        Cursor to decode.
+
+    Returns
+    -------
+    tuple
+        The (timestamp, id) pair the cursor points at.
+
+    Raises
+    ------
+    InvalidCursorError
+        If the cursor can't be decoded.
+    """
+
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        timestamp, row_id = raw.split(CURSOR_SEPARATOR)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError, AttributeError):
+        raise InvalidCursorError("The cursor is not valid")
+
+
+def paginate(query, timestamp_column, id_column, per_page,
+             before=None, after=None):
+    """Paginate
+
+    Fetches one page of a listing ordered newest first.
+
+    Parameters
+    ----------
+    query : Query
+        Query of the rows to paginate. Rows must expose `timestamp` and `id`
+        attributes.
+    timestamp_column : Column
+        Column holding the timestamp of the rows.
+    id_column : Column
+        Column holding the id of the rows, used to break timestamp ties.
+    per_page : int
+        Maximum number of rows in the page.
+    before : str
+        Cursor of the row the page starts after (exclusive), used to move to
+        older rows.
+    after : str
+        Cursor of the row the page ends before (exclusive), used to move to
+        newer rows. Ignored if `before` is present.
+
+    Returns
+    -------
+    Page
+        The requested page.
+
+    Raises
+    ------
+    InvalidCursorError
+        If one of the cursors can't be decoded.
+    """
+
+    return paginate_merged([(query, timestamp_column, id_column)], per_page,
+                           before=before, after=after)
+
+
+def paginate_merged(listings, per_page, before=None, after=None):
+    """Paginate Merged
+
+    Fetches one page of several listings chained newest first, such as the
+    messages of the Inbox followed by the archived ones. Every row of a
+    listing must be newer than the rows of the listings after it, and ids
+    must be unique across them.
+
+    Each listing is fetched with its own keyset seek, only while the page
+    isn't full, so the listings after the first are only read once the
+    user pages past the rows of the first.
+
+    Parameters
+    ----------
+    listings : list
+        (query, timestamp_column, id_column) tuple of each listing, as
+        taken by paginate, newest listing first. Their rows must have the
+        same attributes.
+    per_page : int
+        Maximum number of rows in the page.
+    before : str
+        Cursor of the row the page starts after (exclusive), used to move to
+        older rows.
+    after : str
+        Cursor of the row the page ends before (exclusive), used to move to
+        newer rows. Ignored if `before` is present.
+
+    Returns
+    -------
+    Page
+        The requested page.
+
+    Raises
+    ------
+    InvalidCursorError
+        If one of the cursors can't be decoded.
+    """
+
+    newer = before is None and after is not None
+    rows = []
+
+    for query, timestamp_column, id_column in \
+            (reversed(listings) if newer else listings):
+        key = tuple_(timestamp_column, id_column)
+
+        if newer:
+            query = query.filter(
+                key > decode_cursor(after)
+            ).order_by(timestamp_column.asc(), id_column.asc())
+        else:
+            if before is not None:
+                query = query.filter(key < decode_cursor(before))
+            query = query.order_by(timestamp_column.desc(), id_column.desc())
+
+        rows.extend(query.limit(per_page + 1 - len(rows)).all())
+        if len(rows) > per_page:
+            break
+
+    if newer:
+        has_newer = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+
+        return Page(
+            items=items,
+            next_cursor=_cursor_of(items[-1]) if items else None,
+            previous_cursor=_cursor_of(items[0]) if has_newer else None)
+
+    has_older = len(rows) > per_page
+    items = rows[:per_page]
+
+    return Page(
+        items=items,
+        next_cursor=_cursor_of(items[-1]) if has_older else None,
+        previous_cursor=_cursor_of(items[0])
+        if before is not None and items else None)
+
+
+def _cursor_of(row):
+    return encode_cursor(row.timestamp, row.id)
+
+
+class InvalidCursorError(ValueError):
+    """InvalidCursorError
+
+    This error should be raised when a pagination cursor can't be decoded.
+    """
+    pass
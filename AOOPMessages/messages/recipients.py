@@ -0,0 +1,180 @@
+"""Messages recipients module.
+
+This module provides an in-process index of user emails used to search
+recipients by prefix without loading the whole users table on every request.
+
+Example
+-------
+    from AOOPMessages.messages.recipients import recipient_index
+
+    recipient_index.init_app(app)
+    recipient_index.search('jo', exclude_id=current_user.id)
+
+Attributes
+----------
+    recipient_index : RecipientIndex
+        Instance of the recipient index shared by the app.
+"""
+
+import bisect
+import threading
+import time
+from AOOPMessages import db
+from AOOPMessages.models import User
+
+
+class RecipientIndex:
+    """RecipientIndex class.
+
+    Sorted index of (email, id) pairs searched by email prefix. The index is
+    loaded lazily from the database, reloaded once it's older than its TTL
+    and holds at most `max_size` users. When the users table doesn't fit in
+    the index, searches fall back to the database.
+
+    Attributes
+    ----------
+        max_size : int
+            Maximum number of users held by the index.
+        ttl : float
+            Number of seconds before the index is reloaded.
+    """
+
+    def __init__(self, max_size=50000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.clear()
+
+    def init_app(self, app):
+        """Init App.
+        Configures the index from the app configuration and empties it.
+
+        Parameters
+        ----------
+        app : Flask
+            App to read the RECIPIENT_INDEX_MAX_SIZE and RECIPIENT_INDEX_TTL
+            configurations from.
+        """
+
+        self.max_size = app.config['RECIPIENT_INDEX_MAX_SIZE']
+        self.ttl = app.config['RECIPIENT_INDEX_TTL']
+        self.clear()
+
+    def clear(self):
+        """Clear.
+        Empties the index so it's reloaded on the next search.
+        """
+
+        with self._lock:
+            self._keys = []
+            self._entries = []
+            self._loaded_at = None
+            self._complete = False
+
+    def add(self, user_id, email):
+        """Add.
+        Adds a newly created user to the index, if it's loaded.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user.
+        email : str
+            Email of the user.
+        """
+
+        with self._lock:
+            if self._loaded_at is None or not self._complete:
+                return
+
+            key = (email.lower(), user_id)
+            position = bisect.bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._entries.insert(position, (user_id, email))
+
+            if len(self._entries) > self.max_size:
+                self._keys.pop()
+                self._entries.pop()
+                self._complete = False
+
+    def search(self, prefix, exclude_id=None, limit=10):
+        """Search.
+        Searches users whose email starts with the prefix, ignoring case.
+
+        Parameters
+        ----------
+        prefix : str
+            Start of the email to search.
+        exclude_id : int
+            Optional id of a user to leave out of the results.
+        limit : int
+            Maximum number of results.
+
+        Returns
+        -------
+        list
+            (id, email) pairs of the matching users, ordered by email.
+        """
+
+        prefix = (prefix or '').lower()
+
+        with self._lock:
+            if self._is_stale():
+                self._load()
+
+            if self._complete:
+                return self._search_index(prefix, exclude_id, limit)
+
+        return self._search_database(prefix, exclude_id, limit)
+
+    def _is_stale(self):
+        return self._loaded_at is None or \
+            time.monotonic() - self._loaded_at > self.ttl
+
+    def _load(self):
+        rows = db.session.query(
+            User.id,
+            User.email
+        ).filter(
+            User.email.isnot(None)
+        ).limit(self.max_size + 1).all()
+
+        self._complete = len(rows) <= self.max_size
+        entries = sorted(rows, key=lambda row: (row.email.lower(), row.id))
+        self._entries = [(row.id, row.email) for row in entries]
+        self._keys = [(email.lower(), user_id)
+                      for user_id, email in self._entries]
+        self._loaded_at = time.monotonic()
+
+    def _search_index(self, prefix, exclude_id, limit):
+        results = []
+        position = bisect.bisect_left(self._keys, (prefix,))
+
+        while position < len(self._keys) and len(results) < limit:
+            if not self._keys[position][0].startswith(prefix):
+                break
+            if self._entries[position][0] != exclude_id:
+                results.append(self._entries[position])
+            position += 1
+
+        return results
+
+    def _search_database(self, prefix, exclude_id, limit):
+        escaped = prefix.replace('\\', '\\\\') \
+            .replace('%', '\\%').replace('_', '\\_')
+
+        query = db.session.query(
+            User.id,
+            User.email
+        ).filter(
+            User.email.ilike(escaped + '%', escape='\\')
+        )
+
+        if exclude_id is not None:
+            query = query.filter(User.id != exclude_id)
+
+        return [tuple(row) for row in
+                query.order_by(User.email).limit(limit).all()]
+
+
+recipient_index = RecipientIndex()
@@ -0,0 +1,301 @@
+"""Messages retention module.
+
+This module moves the messages older than the retention age out of the
+messages table, so the Inbox, the counters and the search index only work
+over recent messages. Messages are moved in bounded batches, each in its
+own short transaction, either into the archived_messages table, which the
+Inbox keeps listing after the recent messages, or into gzipped JSONL
+files, where they leave the app.
+
+Archived messages keep their read state and stay in the inbox counters
+of their receivers, since the Inbox keeps listing them. Each batch removes
+its messages from the conversations, deleting the summaries of the
+conversations left empty, and messages written to files also leave the
+inbox counters, bumping the inbox version so cached Inbox pages are
+revalidated. Deleting them from the messages table also
+removes them from the SQLite search index, through its triggers.
+
+On PostgreSQL the archive is partitioned by month. The partitions a batch
+needs are created before moving it.
+"""
+
+import gzip
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+from datetime import timedelta
+from sqlalchemy import and_
+from sqlalchemy import bindparam
+from sqlalchemy import case
+from sqlalchemy import false
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import select
+from sqlalchemy import union_all
+from sqlalchemy.exc import SQLAlchemyError
+from AOOPMessages import db
+from AOOPMessages.models import ArchivedMessage, InboxCounter, Message
+from AOOPMessages.models import ThreadSummary
+
+
+ARCHIVED_COLUMNS = ['id', 'author_id', 'receiver_id', 'title', 'body',
+                    'timestamp', 'read', 'thread_id', 'archived_at']
+JSONL_COLUMNS = ['id', 'author_id', 'receiver_id', 'title', 'body',
+                 'timestamp', 'read', 'thread_id']
+
+ArchiveResult = namedtuple('ArchiveResult', ['batches', 'messages'])
+ArchiveResult.__doc__ = """Result of an archive run.
+
+Attributes
+----------
+    batches : int
+        Number of batches moved.
+    messages : int
+        Number of messages moved.
+"""
+
+
+def archive(days, batch_size, max_batches=None, pause=0, directory=None):
+    """Archive
+
+    Moves the messages older than a number of days out of the messages
+    table, oldest first, one batch per transaction.
+
+    Parameters
+    ----------
+    days : int
+        Age of the messages to move, in days.
+    batch_size : int
+        Maximum number of messages moved per transaction.
+    max_batches : int
+        Maximum number of batches to move. All the old messages are moved
+        if it's None.
+    pause : float
+        Seconds to wait between batches, so other writers get the database.
+    directory : str
+        Directory to write the messages to as gzipped JSONL files. They
+        are moved to the archived_messages table if it's None.
+
+    Returns
+    -------
+    ArchiveResult
+        The number of batches and messages moved.
+
+    Raises
+    ------
+    SQLAlchemyError
+        If a batch couldn't be moved. The batches before it stay moved.
+    """
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    batches = moved = 0
+
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+
+    while max_batches is None or batches < max_batches:
+        ids = [message_id for message_id, in db.session.query(
+            Message.id
+        ).filter(
+            Message.timestamp < cutoff
+        ).order_by(
+            Message.timestamp, Message.id
+        ).limit(batch_size)]
+
+        if not ids:
+            break
+
+        move_batch(ids, directory)
+        batches += 1
+        moved += len(ids)
+
+        if pause and len(ids) == batch_size:
+            time.sleep(pause)
+
+    return ArchiveResult(batches=batches, messages=moved)
+
+
+def move_batch(ids, directory=None):
+    """Move Batch
+
+    Moves a batch of messages out of the messages table and out of the
+    conversation summaries of their receivers, in one transaction.
+    Messages written to a file also leave the inbox counters.
+
+    Parameters
+    ----------
+    ids : list
+        Ids of the messages to move.
+    directory : str
+        Directory to write the messages to as a gzipped JSONL file. They
+        are moved to the archived_messages table if it's None.
+
+    Raises
+    ------
+    SQLAlchemyError
+        If the batch couldn't be moved. The transaction is rolled back.
+    """
+
+    messages = Message.__table__
+    batch = messages.c.id.in_(ids)
+
+    try:
+        if directory is None:
+            _ensure_partitions(batch)
+            db.session.execute(ArchivedMessage.__table__.insert().from_select(
+                ARCHIVED_COLUMNS,
+                select([
+                    messages.c.id,
+                    messages.c.author_id,
+                    messages.c.receiver_id,
+                    messages.c.title,
+                    messages.c.body,
+                    messages.c.timestamp,
+                    messages.c.read,
+                    messages.c.thread_id,
+                    literal(datetime.utcnow())
+                ]).where(batch)))
+        else:
+            _write_jsonl(batch, directory)
+            _uncount_inboxes(batch)
+
+        _uncount_threads(batch)
+        db.session.execute(messages.delete().where(batch))
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+
+
+def partition_name(month):
+    """Partition Name
+
+    Names the PostgreSQL partition of the archive holding a month.
+
+    Parameters
+    ----------
+    month : datetime
+        Any date and time of the month.
+
+    Returns
+    -------
+    str
+        The name of the partition, such as archived_messages_2026_01.
+    """
+
+    return f'{ArchivedMessage.__tablename__}_{month:%Y_%m}'
+
+
+def _ensure_partitions(batch):
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+
+    messages = Message.__table__
+    first, last = db.session.execute(select([
+        func.min(messages.c.timestamp),
+        func.max(messages.c.timestamp)
+    ]).where(batch)).first()
+
+    month = first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while month <= last:
+        following = (month + timedelta(days=32)).replace(day=1)
+        db.session.execute(
+            f'CREATE TABLE IF NOT EXISTS {partition_name(month)} '
+            f'PARTITION OF {ArchivedMessage.__tablename__} '
+            f"FOR VALUES FROM ('{month.isoformat()}') "
+            f"TO ('{following.isoformat()}')")
+        month = following
+
+
+def _write_jsonl(batch, directory):
+    messages = Message.__table__
+    rows = db.session.execute(select(
+        [messages.c[column] for column in JSONL_COLUMNS]
+    ).where(batch).order_by(messages.c.id)).fetchall()
+
+    path = os.path.join(directory,
+                        f'messages-{rows[0].id}-{rows[-1].id}.jsonl.gz')
+
+    # Written aside and renamed, so an interrupted batch leaves no partial
+    # file. A batch that fails to commit is written again by the next run.
+    with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as file:
+        for row in rows:
+            record = dict(zip(JSONL_COLUMNS, row))
+            record['timestamp'] = record['timestamp'].isoformat()
+            file.write(json.dumps(record, separators=(',', ':')) + '\n')
+    os.replace(path + '.tmp', path)
+
+
+def _uncount_inboxes(batch):
+    messages = Message.__table__
+    unread = case([(messages.c.read == false(), 1)], else_=0)
+
+    received = db.session.execute(select([
+        messages.c.receiver_id,
+        func.count(messages.c.id),
+        func.sum(unread)
+    ]).where(batch).group_by(messages.c.receiver_id)).fetchall()
+
+    counters = InboxCounter.__table__
+    db.session.execute(
+        counters.update().where(
+            counters.c.user_id == bindparam('receiver_id')
+        ).values(
+            total=counters.c.total - bindparam('moved'),
+            unread=counters.c.unread - bindparam('moved_unread'),
+            version=counters.c.version + 1,
+            modified_at=datetime.utcnow()
+        ),
+        [{'receiver_id': receiver_id, 'moved': moved,
+          'moved_unread': moved_unread}
+         for receiver_id, moved, moved_unread in received])
+
+
+def _uncount_threads(batch):
+    messages = Message.__table__
+    unread = case([(messages.c.read == false(), 1)], else_=0)
+
+    # A message counts in the summaries of its receiver and, unless they
+    # sent it to themselves, of its author.
+    received = select([
+        messages.c.receiver_id,
+        messages.c.thread_id,
+        func.count(messages.c.id),
+        func.sum(unread)
+    ]).where(batch).group_by(messages.c.receiver_id, messages.c.thread_id)
+    sent = select([
+        messages.c.author_id,
+        messages.c.thread_id,
+        func.count(messages.c.id),
+        literal(0)
+    ]).where(and_(
+        batch,
+        messages.c.author_id != messages.c.receiver_id
+    )).group_by(messages.c.author_id, messages.c.thread_id)
+
+    params = [{'moved_user_id': user_id, 'moved_thread_id': thread_id,
+               'moved': moved, 'moved_unread': moved_unread}
+              for user_id, thread_id, moved, moved_unread
+              in db.session.execute(union_all(received, sent)).fetchall()]
+
+    if not params:
+        return
+
+    summaries = ThreadSummary.__table__
+    summary = and_(
+        summaries.c.user_id == bindparam('moved_user_id'),
+        summaries.c.thread_id == bindparam('moved_thread_id')
+    )
+
+    db.session.execute(summaries.update().where(summary).values(
+        message_count=summaries.c.message_count - bindparam('moved'),
+        unread=summaries.c.unread - bindparam('moved_unread')
+    ), params)
+    # Messages are moved oldest first, so the latest activity of a thread
+    # with messages left doesn't change. Threads with none left are gone.
+    db.session.execute(summaries.delete().where(and_(
+        summary,
+        summaries.c.message_count <= 0
+    )), params)
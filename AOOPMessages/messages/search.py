@@ -0,0 +1,191 @@
+"""Messages search module.
+
+This module provides full-text search over the title and body of the
+received messages, backed by an inverted index kept in sync by the
+database itself:
+
+- On SQLite, an external content FTS5 table, `messages_fts`, filled by
+  triggers on the messages table. It also indexes the receiver id, so the
+  index only returns the messages of the user searching.
+- On PostgreSQL, a GIN index over the tsvector of the title and body.
+
+Searches are ranked (bm25 on SQLite, ts_rank on PostgreSQL) and
+paginated.
+"""
+
+import re
+from collections import namedtuple
+from sqlalchemy import DDL
+from sqlalchemy import DateTime
+from sqlalchemy import event
+from sqlalchemy import text
+from AOOPMessages import db
+from AOOPMessages.models import Message
+
+
+SEARCH_TABLE = 'messages_fts'
+
+POSTGRESQL_DOCUMENT = \
+    "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(body, ''))"
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "title, body, receiver_id, content='messages', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT "
+    f"ON messages BEGIN INSERT INTO {SEARCH_TABLE}"
+    "(rowid, title, body, receiver_id) "
+    "VALUES (new.id, new.title, new.body, new.receiver_id); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE "
+    f"ON messages BEGIN INSERT INTO {SEARCH_TABLE}"
+    f"({SEARCH_TABLE}, rowid, title, body, receiver_id) "
+    "VALUES ('delete', old.id, old.title, old.body, old.receiver_id); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE "
+    "OF title, body, receiver_id ON messages BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}"
+    f"({SEARCH_TABLE}, rowid, title, body, receiver_id) "
+    "VALUES ('delete', old.id, old.title, old.body, old.receiver_id); "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, title, body, receiver_id) "
+    "VALUES (new.id, new.title, new.body, new.receiver_id); END",
+]
+
+POSTGRESQL_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_messages_search ON messages "
+    f"USING gin ({POSTGRESQL_DOCUMENT})",
+]
+
+SQLITE_QUERY = text(
+    "SELECT messages.id, messages.title, messages.body, messages.timestamp, "
+    "messages.read, users.email AS author_email "
+    f"FROM {SEARCH_TABLE} "
+    f"JOIN messages ON messages.id = {SEARCH_TABLE}.rowid "
+    "JOIN users ON users.id = messages.author_id "
+    f"WHERE {SEARCH_TABLE} MATCH :match "
+    "AND messages.receiver_id = :receiver_id "
+    f"ORDER BY bm25({SEARCH_TABLE}, 10.0, 1.0, 0.0), messages.id DESC "
+    "LIMIT :limit OFFSET :offset"
+).columns(timestamp=DateTime)
+
+POSTGRESQL_QUERY = text(
+    "SELECT messages.id, messages.title, messages.body, messages.timestamp, "
+    "messages.read, users.email AS author_email "
+    "FROM messages JOIN users ON users.id = messages.author_id "
+    f"WHERE {POSTGRESQL_DOCUMENT} @@ plainto_tsquery('simple', :terms) "
+    "AND messages.receiver_id = :receiver_id "
+    f"ORDER BY ts_rank({POSTGRESQL_DOCUMENT}, "
+    "plainto_tsquery('simple', :terms)) DESC, messages.id DESC "
+    "LIMIT :limit OFFSET :offset"
+).columns(timestamp=DateTime)
+
+SearchPage = namedtuple('SearchPage', ['items', 'page', 'has_next'])
+SearchPage.__doc__ = """Page of search results.
+
+Attributes
+----------
+    items : list
+        Matching messages, best ranked first.
+    page : int
+        Number of the page, starting at 1.
+    has_next : bool
+        Whether there are more results after this page.
+"""
+
+for statement in SQLITE_DDL:
+    event.listen(Message.__table__, 'after_create',
+                 DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRESQL_DDL:
+    event.listen(Message.__table__, 'after_create',
+                 DDL(statement).execute_if(dialect='postgresql'))
+event.listen(Message.__table__, 'before_drop',
+             DDL(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+             .execute_if(dialect='sqlite'))
+
+
+def is_search_table(name):
+    """Is Search Table
+
+    Checks if a table belongs to the SQLite search index. These tables
+    are created with DDL instead of being mapped, so they are skipped
+    when comparing the database with the models.
+
+    Parameters
+    ----------
+    name : str
+        Name of the table.
+
+    Returns
+    -------
+    bool
+        True if the table is the search index or one of its shadow tables.
+    """
+
+    return name == SEARCH_TABLE or name.startswith(f'{SEARCH_TABLE}_')
+
+
+def parse_terms(query):
+    """Parse Terms
+
+    Splits a search query into the words to search.
+
+    Parameters
+    ----------
+    query : str
+        Search query.
+
+    Returns
+    -------
+    list
+        Lowercase words of the query.
+    """
+
+    return re.findall(r'\w+', (query or '').lower())
+
+
+def search(receiver_id, query, page, per_page):
+    """Search
+
+    Searches the messages received by a user whose title or body contain
+    every word of a query. The last word also matches as a prefix on
+    SQLite.
+
+    Parameters
+    ----------
+    receiver_id : int
+        Id of the user that received the messages.
+    query : str
+        Search query.
+    page : int
+        Number of the page to return, starting at 1.
+    per_page : int
+        Maximum number of results per page.
+
+    Returns
+    -------
+    SearchPage
+        The requested page of results.
+    """
+
+    terms = parse_terms(query)
+    if not terms:
+        return SearchPage(items=[], page=page, has_next=False)
+
+    params = {
+        'receiver_id': receiver_id,
+        'limit': per_page + 1,
+        'offset': (page - 1) * per_page,
+    }
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        params['terms'] = ' '.join(terms)
+        statement = POSTGRESQL_QUERY
+    else:
+        words = ' AND '.join(f'"{term}"' for term in terms) + '*'
+        # The words are limited to the title and body, or they would also
+        # match the indexed receiver id.
+        params['match'] = \
+            f'receiver_id : "{receiver_id}" AND {{title body}} : ({words})'
+        statement = SQLITE_QUERY
+
+    rows = db.session.execute(statement, params).fetchall()
+
+    return SearchPage(items=rows[:per_page], page=page,
+                      has_next=len(rows) > per_page)
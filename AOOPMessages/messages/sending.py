@@ -0,0 +1,237 @@
+"""Messages sending module.
+
+This module provides the methods that store sent messages in the database,
+either one send at a time or in bulk, and publish them to the message hub
+once they are committed.
+
+Rows carrying an idempotency key are stored at most once: the insert skips
+the keys already in the messages table, even when they were stored by a
+concurrent transaction, and only the rows actually inserted are counted
+and published.
+"""
+
+import hashlib
+from datetime import datetime
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import SQLAlchemyError
+from AOOPMessages import db
+from AOOPMessages.models import Message, User
+from AOOPMessages.messages import counters
+from AOOPMessages.messages import threads
+from AOOPMessages.messages.events import message_hub
+
+
+def build_rows(author_id, receiver_ids, title, body, idempotency_key=None,
+               thread_id=None):
+    """Build Rows
+
+    Builds the rows of a message sent to one or more users.
+
+    Parameters
+    ----------
+    author_id : int
+        Id of the user sending the message.
+    receiver_ids : list
+        Validated ids of the users receiving the message.
+    title : str
+        Title of the message.
+    body : str
+        Body of the message.
+    idempotency_key : str
+        Optional key chosen by the client for the send. Sending again with
+        the same key doesn't store the message again.
+    thread_id : int
+        Optional id of the thread the message replies to. Each receiver
+        starts a new thread if it's None.
+
+    Returns
+    -------
+    list
+        One dict of column values per receiver.
+    """
+
+    timestamp = datetime.utcnow()
+
+    return [{
+        'author_id': author_id,
+        'receiver_id': receiver_id,
+        'title': title,
+        'body': body,
+        'timestamp': timestamp,
+        'idempotency_key': row_key(author_id, receiver_id, idempotency_key)
+        if idempotency_key else None,
+        'thread_id': thread_id or threads.new_thread_id(),
+    } for receiver_id in receiver_ids]
+
+
+def row_key(author_id, receiver_id, idempotency_key):
+    """Row Key
+
+    Derives the idempotency key of the row of one receiver from the key of
+    a send, so keys chosen by different users never collide.
+
+    Parameters
+    ----------
+    author_id : int
+        Id of the user sending the message.
+    receiver_id : int
+        Id of the user receiving the message.
+    idempotency_key : str
+        Key chosen by the client for the send.
+
+    Returns
+    -------
+    str
+        32 hexadecimal characters key.
+    """
+
+    return hashlib.sha256(
+        f'{author_id}:{idempotency_key}:{receiver_id}'.encode()
+    ).hexdigest()[:32]
+
+
+def insert(rows):
+    """Insert
+
+    Inserts message rows, skipping the rows whose idempotency key is
+    already stored. Rows without a key are inserted with a single
+    executemany statement. Rows with a key are inserted with ON CONFLICT
+    DO NOTHING on PostgreSQL and INSERT OR IGNORE on SQLite, so a key
+    stored by a concurrent transaction is skipped instead of failing.
+
+    Parameters
+    ----------
+    rows : list
+        Dicts of column values built by build_rows.
+
+    Returns
+    -------
+    list
+        The rows inserted.
+    """
+
+    messages = Message.__table__
+    unkeyed = [row for row in rows if not row.get('idempotency_key')]
+    keyed = [row for row in rows if row.get('idempotency_key')]
+
+    if unkeyed:
+        db.session.execute(messages.insert(), unkeyed)
+    if not keyed:
+        return unkeyed
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        inserted = {key for key, in db.session.execute(
+            postgresql.insert(messages).values(keyed).on_conflict_do_nothing(
+                index_elements=[messages.c.idempotency_key]
+            ).returning(messages.c.idempotency_key))}
+    else:
+        # SQLAlchemy has no RETURNING for SQLite, so each row is inserted
+        # on its own to know from its rowcount whether it was ignored.
+        statement = messages.insert().prefix_with('OR IGNORE')
+        inserted = {row['idempotency_key'] for row in keyed
+                    if db.session.execute(statement, row).rowcount}
+
+    return [row for row in rows if not row.get('idempotency_key') or
+            row['idempotency_key'] in inserted]
+
+
+def deliver(rows):
+    """Deliver
+
+    Inserts message rows and commits them, together with the updated inbox
+    counters of their receivers and the summaries of their threads, in one
+    transaction. Rows whose idempotency key is already stored are skipped.
+    The messages inserted are then published to the message hub.
+
+    Parameters
+    ----------
+    rows : list
+        Dicts of column values built by build_rows.
+
+    Returns
+    -------
+    list
+        The rows inserted.
+
+    Raises
+    ------
+    SQLAlchemyError
+        If the rows couldn't be stored. The transaction is rolled back.
+    """
+
+    try:
+        rows = insert(rows)
+        if not rows:
+            db.session.commit()
+            return rows
+
+        counters.count_delivered(rows)
+        threads.count_delivered(rows)
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+
+    publish(rows)
+
+    return rows
+
+
+def publish(rows):
+    """Publish
+
+    Publishes stored messages to the message hub, so they reach the
+    receivers connected to the message stream.
+
+    Parameters
+    ----------
+    rows : list
+        Dicts of column values of the stored messages.
+    """
+
+    author_emails = dict(db.session.query(
+        User.id,
+        User.email
+    ).filter(
+        User.id.in_({row['author_id'] for row in rows})
+    ))
+
+    for row in rows:
+        message_hub.publish(row['receiver_id'], {
+            'author_email': author_emails.get(row['author_id']),
+            'title': row['title'],
+            'body': row['body'],
+            'timestamp': row['timestamp'].isoformat(),
+        })
+
+
+def deliver_in_chunks(rows, chunk_size):
+    """Deliver In Chunks
+
+    Inserts message rows in chunks, committing each chunk in its own short
+    transaction so a large send doesn't hold one long write transaction.
+    A chunk that fails is rolled back without stopping the others.
+
+    Parameters
+    ----------
+    rows : list
+        Dicts of column values built by build_rows.
+    chunk_size : int
+        Maximum number of rows per transaction.
+
+    Returns
+    -------
+    list
+        The rows that couldn't be stored.
+    """
+
+    failed = []
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            deliver(chunk)
+        except SQLAlchemyError:
+            failed.extend(chunk)
+
+    return failed
@@ -0,0 +1,311 @@
+"""Messages threads module.
+
+This module provides the methods that group messages into conversations
+and keep the denormalized summary of each conversation up to date, so the
+conversations of a user can be listed by their latest activity with an
+index scan instead of grouping the messages table.
+
+Every message belongs to a thread. A new send starts a thread per
+receiver, whose id is drawn at send time so it's known before the rows
+are stored, even when they are queued or inserted in bulk. Replies reuse
+the id of the thread they answer.
+
+Each participant of a thread has a summary row, updated by the send path
+(see the sending module) and when messages are marked as read. Summaries
+of messages stored any other way are only built after running
+`flask messages reconcile-threads`.
+"""
+
+import secrets
+from collections import namedtuple
+from sqlalchemy import and_
+from sqlalchemy import bindparam
+from sqlalchemy import case
+from sqlalchemy import exists
+from sqlalchemy import false
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import select
+from sqlalchemy import union_all
+from AOOPMessages import db
+from AOOPMessages.models import Message, ThreadSummary
+
+
+# Threads of the messages stored before threading use the id of their
+# message, so drawn ids start above any message id. They stay below 2^53 so
+# JavaScript clients of the API read them exactly.
+THREAD_ID_MIN = 2 ** 32
+THREAD_ID_MAX = 2 ** 53 - 1
+
+REPLY_PREFIX = 'Re: '
+
+Activity = namedtuple('Activity', ['user_id', 'thread_id', 'other_user_id',
+                                   'title', 'last_activity', 'messages',
+                                   'unread'])
+Activity.__doc__ = """New activity of a thread for one of its participants.
+
+Attributes
+----------
+    user_id : int
+        Id of the participant.
+    thread_id : int
+        Id of the thread.
+    other_user_id : int
+        Id of the other participant.
+    title : str
+        Title of the first new message, the title of the thread if it's
+        new.
+    last_activity : datetime
+        Date and time of the latest new message.
+    messages : int
+        Number of new messages.
+    unread : int
+        Number of new messages the participant received.
+"""
+
+
+def new_thread_id():
+    """New Thread Id
+
+    Draws the id of a new thread.
+
+    Returns
+    -------
+    int
+        Random id between THREAD_ID_MIN and THREAD_ID_MAX.
+    """
+
+    return THREAD_ID_MIN + secrets.randbelow(THREAD_ID_MAX - THREAD_ID_MIN)
+
+
+def reply_title(title):
+    """Reply Title
+
+    Builds the default title of a reply.
+
+    Parameters
+    ----------
+    title : str
+        Title of the thread.
+
+    Returns
+    -------
+    str
+        The title with a single reply prefix.
+    """
+
+    title = title or ''
+    if title.startswith(REPLY_PREFIX):
+        return title
+
+    return REPLY_PREFIX + title
+
+
+def get_summary(user_id, thread_id):
+    """Get Summary
+
+    Reads the summary of a thread for one of its participants.
+
+    Parameters
+    ----------
+    user_id : int
+        Id of the participant.
+    thread_id : int
+        Id of the thread.
+
+    Returns
+    -------
+    ThreadSummary
+        The summary, None if the user doesn't take part in the thread.
+    """
+
+    return ThreadSummary.query.get((user_id, thread_id))
+
+
+def count_delivered(rows):
+    """Count Delivered
+
+    Adds newly stored messages to the summaries of their threads, for the
+    author and the receiver of each, as part of the transaction storing
+    them. Callers commit the transaction.
+
+    Existing summaries are updated first, then the summaries of new threads
+    are inserted, so the same statements serve new sends and replies.
+
+    Parameters
+    ----------
+    rows : list
+        Dicts of column values of the stored messages.
+    """
+
+    activity = _activity(rows)
+    if not activity:
+        return
+
+    summaries = ThreadSummary.__table__
+    # Column names are reserved in the statements, so values are bound
+    # with a prefix.
+    params = [{f'new_{name}': value
+               for name, value in item._asdict().items()}
+              for item in activity]
+
+    db.session.execute(
+        summaries.update().where(and_(
+            summaries.c.user_id == bindparam('new_user_id'),
+            summaries.c.thread_id == bindparam('new_thread_id')
+        )).values(
+            last_activity=case(
+                [(summaries.c.last_activity > bindparam('new_last_activity'),
+                  summaries.c.last_activity)],
+                else_=bindparam('new_last_activity')),
+            message_count=summaries.c.message_count +
+            bindparam('new_messages'),
+            unread=summaries.c.unread + bindparam('new_unread')
+        ), params)
+
+    existing = select([literal(1)]).where(and_(
+        summaries.c.user_id == bindparam('new_user_id'),
+        summaries.c.thread_id == bindparam('new_thread_id')
+    ))
+
+    db.session.execute(summaries.insert().from_select(
+        ['user_id', 'thread_id', 'other_user_id', 'title', 'last_activity',
+         'message_count', 'unread'],
+        select([
+            bindparam('new_user_id'),
+            bindparam('new_thread_id'),
+            bindparam('new_other_user_id'),
+            bindparam('new_title'),
+            bindparam('new_last_activity'),
+            bindparam('new_messages'),
+            bindparam('new_unread')
+        ]).where(~exists(existing))
+    ), params)
+
+
+def count_read(user_id, message_id=None):
+    """Count Read
+
+    Clears the unread messages of the threads of a user after they are
+    marked as read, as part of the transaction marking them. Callers commit
+    the transaction.
+
+    Parameters
+    ----------
+    user_id : int
+        Id of the user that received the messages.
+    message_id : int
+        Id of the message marked as read. The unread messages of every
+        thread of the user are cleared if it's None.
+    """
+
+    summaries = ThreadSummary.__table__
+    query = summaries.update().where(
+        summaries.c.user_id == user_id
+    )
+
+    if message_id is None:
+        db.session.execute(query.where(
+            summaries.c.unread > 0
+        ).values(unread=0))
+        return
+
+    messages = Message.__table__
+    thread_id = select([messages.c.thread_id]).where(
+        messages.c.id == message_id
+    ).as_scalar()
+
+    db.session.execute(query.where(
+        summaries.c.thread_id == thread_id
+    ).where(
+        summaries.c.unread > 0
+    ).values(unread=summaries.c.unread - 1))
+
+
+def reconcile():
+    """Reconcile
+
+    Rebuilds the summaries of every thread from the messages table in one
+    transaction, grouping the messages of each participant. Messages that
+    don't belong to a thread yet start their own.
+
+    Returns
+    -------
+    int
+        Number of summaries rebuilt.
+    """
+
+    summaries = ThreadSummary.__table__
+    messages = Message.__table__
+
+    db.session.execute(messages.update().where(
+        messages.c.thread_id.is_(None)
+    ).values(thread_id=messages.c.id))
+
+    received = select([
+        messages.c.receiver_id.label('user_id'),
+        messages.c.thread_id,
+        messages.c.author_id.label('other_user_id'),
+        messages.c.timestamp,
+        case([(messages.c.read == false(), 1)], else_=0).label('unread')
+    ])
+    sent = select([
+        messages.c.author_id,
+        messages.c.thread_id,
+        messages.c.receiver_id,
+        messages.c.timestamp,
+        literal(0)
+    ]).where(messages.c.author_id != messages.c.receiver_id)
+    participants = union_all(received, sent).alias('participants')
+
+    first = messages.alias('first')
+    title = select([first.c.title]).where(
+        first.c.thread_id == participants.c.thread_id
+    ).order_by(
+        first.c.timestamp.asc(), first.c.id.asc()
+    ).limit(1).as_scalar()
+
+    totals = select([
+        participants.c.user_id,
+        participants.c.thread_id,
+        func.max(participants.c.other_user_id),
+        title,
+        func.max(participants.c.timestamp),
+        func.count(),
+        func.sum(participants.c.unread)
+    ]).group_by(participants.c.user_id, participants.c.thread_id)
+
+    db.session.execute(summaries.delete())
+    result = db.session.execute(summaries.insert().from_select(
+        ['user_id', 'thread_id', 'other_user_id', 'title', 'last_activity',
+         'message_count', 'unread'], totals))
+    db.session.commit()
+
+    return result.rowcount
+
+
+def _activity(rows):
+    activity = {}
+
+    for row in sorted(rows, key=lambda row: row['timestamp']):
+        participants = {row['receiver_id']: row['author_id']}
+        participants.setdefault(row['author_id'], row['receiver_id'])
+
+        for user_id, other_user_id in participants.items():
+            key = (user_id, row['thread_id'])
+            received = int(user_id == row['receiver_id'])
+            item = activity.get(key)
+
+            if item is None:
+                activity[key] = Activity(
+                    user_id=user_id, thread_id=row['thread_id'],
+                    other_user_id=other_user_id, title=row['title'],
+                    last_activity=row['timestamp'], messages=1,
+                    unread=received)
+            else:
+                activity[key] = item._replace(
+                    last_activity=row['timestamp'],
+                    messages=item.messages + 1,
+                    unread=item.unread + received)
+
+    return [activity[key] for key in sorted(activity)]
@@ -0,0 +1,386 @@
+"""AOOPMessages metrics module.
+
+This module provides an opt-in extension that instruments the requests of
+the app. When METRICS_ENABLED is set it records, per endpoint, a latency
+histogram, the number of SQL statements and the time spent running them,
+rendering templates and hashing passwords, and exposes them with the
+stats of the in-process caches on `/metrics`, in the Prometheus text
+format. Metrics are kept per process, so each worker has to be scraped.
+
+Setting PROFILE_SAMPLE_RATE profiles that fraction of the requests with
+cProfile and dumps their profiles to PROFILE_DIR, to be read with pstats
+or snakeviz.
+
+Example
+-------
+    from AOOPMessages.metrics import metrics
+
+    metrics.init_app(app)
+
+    with metrics.timed('password_hash'):
+        ...
+
+Attributes
+----------
+    metrics : Metrics
+        Instance of the metrics extension shared by the app.
+"""
+
+import bisect
+import cProfile
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from flask import g
+from flask import has_request_context
+from flask import request
+from flask import Response
+from jinja2 import Template
+from AOOPMessages import sql_timing
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PHASES = ('sql', 'template', 'password_hash')
+
+
+class Histogram:
+    """Histogram class.
+
+    Counts observed values in buckets of increasing upper bounds.
+
+    Attributes
+    ----------
+        buckets : tuple
+            Upper bounds of the buckets, in ascending order.
+        counts : list
+            Values observed in each bucket, not cumulative.
+        sum : float
+            Sum of the observed values.
+        count : int
+            Number of observed values.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Observe.
+        Adds a value to the histogram.
+
+        Parameters
+        ----------
+        value : float
+            Value to add.
+        """
+
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class TimedTemplate(Template):
+    """Timed template class.
+
+    Jinja template adding its render time to the metrics of the request.
+    """
+
+    def render(self, *args, **kwargs):
+        with metrics.timed('template'):
+            return super().render(*args, **kwargs)
+
+
+class Metrics:
+    """Metrics class.
+
+    Flask extension recording the metrics of the requests of the app.
+
+    Attributes
+    ----------
+        enabled : bool
+            Whether requests are instrumented. Read from METRICS_ENABLED.
+        buckets : tuple
+            Upper bounds of the latency histograms, in seconds. Read from
+            METRICS_LATENCY_BUCKETS.
+        profile_rate : float
+            Fraction of the requests profiled. Read from
+            PROFILE_SAMPLE_RATE.
+        profile_dir : str
+            Directory the profiles are dumped to. Read from PROFILE_DIR.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.buckets = ()
+        self.profile_rate = 0.0
+        self.profile_dir = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def init_app(self, app):
+        """Init App.
+        Configures the extension from the app configuration, empties the
+        metrics and, if enabled, registers the instrumentation and the
+        `/metrics` endpoint. Must be called before any template is
+        rendered.
+
+        Parameters
+        ----------
+        app : Flask
+            App to instrument, and to read the METRICS_* and PROFILE_*
+            configurations from.
+        """
+
+        self.reset()
+        self.enabled = app.config['METRICS_ENABLED']
+        self.buckets = tuple(sorted(app.config['METRICS_LATENCY_BUCKETS']))
+        self.profile_rate = app.config['PROFILE_SAMPLE_RATE']
+        self.profile_dir = app.config['PROFILE_DIR']
+
+        if not self.enabled and not self.profile_rate:
+            return
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+        if not self.enabled:
+            return
+
+        app.jinja_env.template_class = TimedTemplate
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+        sql_timing.subscribe(self._observe_statement)
+
+    def reset(self):
+        """Reset.
+        Empties the recorded metrics.
+        """
+
+        with self._lock:
+            self._requests = defaultdict(int)
+            self._latency = {}
+            self._statements = defaultdict(int)
+            self._phases = defaultdict(float)
+
+    @contextmanager
+    def timed(self, phase):
+        """Timed.
+        Context manager adding the time spent in its block to a phase of
+        the current request. Does nothing outside instrumented requests.
+
+        Parameters
+        ----------
+        phase : str
+            Phase of the request, one of PHASES.
+        """
+
+        state = self._state()
+        if state is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            state['phases'][phase] += time.perf_counter() - start
+
+    def render(self):
+        """Render.
+        Formats the metrics and the stats of the caches in the Prometheus
+        text format.
+
+        Returns
+        -------
+        str
+            The metrics.
+        """
+
+        with self._lock:
+            requests = dict(self._requests)
+            latency = {labels: (list(histogram.counts), histogram.sum,
+                                histogram.count)
+                       for labels, histogram in self._latency.items()}
+            statements = dict(self._statements)
+            phases = dict(self._phases)
+
+        lines = [
+            '# HELP aoop_requests_total Requests served.',
+            '# TYPE aoop_requests_total counter',
+        ]
+        for (endpoint, method, status), value in sorted(requests.items()):
+            lines.append(_sample('aoop_requests_total', value,
+                                 endpoint=endpoint, method=method,
+                                 status=status))
+
+        lines += [
+            '# HELP aoop_request_duration_seconds Latency of the requests.',
+            '# TYPE aoop_request_duration_seconds histogram',
+        ]
+        for (endpoint, method), (counts, total, count) in \
+                sorted(latency.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(_sample(
+                    'aoop_request_duration_seconds_bucket', cumulative,
+                    endpoint=endpoint, method=method, le=repr(bound)))
+            lines += [
+                _sample('aoop_request_duration_seconds_bucket', count,
+                        endpoint=endpoint, method=method, le='+Inf'),
+                _sample('aoop_request_duration_seconds_sum', total,
+                        endpoint=endpoint, method=method),
+                _sample('aoop_request_duration_seconds_count', count,
+                        endpoint=endpoint, method=method),
+            ]
+
+        lines += [
+            '# HELP aoop_sql_statements_total SQL statements executed.',
+            '# TYPE aoop_sql_statements_total counter',
+        ]
+        for endpoint, value in sorted(statements.items()):
+            lines.append(_sample('aoop_sql_statements_total', value,
+                                 endpoint=endpoint))
+
+        lines += [
+            '# HELP aoop_request_phase_seconds_total Time spent running '
+            'SQL, rendering templates and hashing passwords.',
+            '# TYPE aoop_request_phase_seconds_total counter',
+        ]
+        for (endpoint, phase), value in sorted(phases.items()):
+            lines.append(_sample('aoop_request_phase_seconds_total', value,
+                                 endpoint=endpoint, phase=phase))
+
+        caches = {name: cache.stats() for name, cache in _caches().items()}
+        for metric, key, kind, description in (
+                ('aoop_cache_hits_total', 'hits', 'counter',
+                 'Lookups that found a valid entry.'),
+                ('aoop_cache_misses_total', 'misses', 'counter',
+                 "Lookups that didn't find a valid entry."),
+                ('aoop_cache_entries', 'size', 'gauge',
+                 'Entries in the cache.'),
+                ('aoop_cache_bytes', 'bytes', 'gauge',
+                 'Memory used by the values of the cache.')):
+            lines += [f'# HELP {metric} {description}',
+                      f'# TYPE {metric} {kind}']
+            for name, stats in sorted(caches.items()):
+                if key in stats:
+                    lines.append(_sample(metric, stats[key], cache=name))
+
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        """Metrics endpoint.
+
+        Returns the metrics of this process in the Prometheus text format.
+
+        Response codes
+        -------
+            - 200:
+                description: Returns the metrics.
+        """
+
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+    def _state(self):
+        if not has_request_context():
+            return None
+
+        return g.get('request_metrics')
+
+    def _start_request(self):
+        profiler = None
+        if self.profile_rate and random.random() < self.profile_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is already running in this process.
+                profiler = None
+
+        g.request_metrics = {
+            'start': time.perf_counter(),
+            'statements': 0,
+            'phases': defaultdict(float),
+            'profiler': profiler,
+        }
+
+    def _finish_request(self, response):
+        state = self._state()
+        if state is None:
+            return response
+
+        elapsed = time.perf_counter() - state['start']
+        endpoint = request.endpoint or 'none'
+
+        if state['profiler'] is not None:
+            state['profiler'].disable()
+            self._dump_profile(state['profiler'], endpoint)
+
+        if not self.enabled:
+            return response
+
+        with self._lock:
+            self._requests[
+                (endpoint, request.method, str(response.status_code))] += 1
+
+            histogram = self._latency.get((endpoint, request.method))
+            if histogram is None:
+                histogram = self._latency[(endpoint, request.method)] = \
+                    Histogram(self.buckets)
+            histogram.observe(elapsed)
+
+            self._statements[endpoint] += state['statements']
+            for phase, seconds in state['phases'].items():
+                self._phases[(endpoint, phase)] += seconds
+
+        return response
+
+    def _dump_profile(self, profiler, endpoint):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f'{endpoint}.{int(time.time() * 1000)}.{os.getpid()}.prof'
+        profiler.dump_stats(os.path.join(self.profile_dir, name))
+
+    def _observe_statement(self, conn, statement, parameters, executemany,
+                           elapsed):
+        state = self._state() if self.enabled else None
+        if state is None:
+            return
+
+        state['statements'] += 1
+        state['phases']['sql'] += elapsed
+
+
+def _caches():
+    from AOOPMessages.compression import compress
+    from AOOPMessages.messages.fragments import fragment_cache
+    from AOOPMessages.messages.helpers import invalid_user_ids
+    from AOOPMessages.messages.helpers import valid_user_ids
+    from AOOPMessages.models import user_cache
+
+    return {
+        'user': user_cache,
+        'valid_user_id': valid_user_ids,
+        'invalid_user_id': invalid_user_ids,
+        'fragment': fragment_cache.local,
+        'compressed_static': compress.static_cache,
+    }
+
+
+def _sample(name, value, **labels):
+    formatted = ','.join(
+        '{}="{}"'.format(label, str(label_value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for label, label_value in labels.items())
+
+    return f'{name}{{{formatted}}} {value}'
+
+
+metrics = Metrics()
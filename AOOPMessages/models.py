@@ -3,18 +3,29 @@
 This module contains the classes representing the application model.
 """
 
+import hashlib
 from AOOPMessages import db
 from AOOPMessages import login_manager
+from AOOPMessages.cache import LRUCache
 from datetime import datetime
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy import false
+from sqlalchemy import true
 from sqlalchemy.orm import relationship
 
 
+user_cache = LRUCache('USER_CACHE')
+
+
 @login_manager.user_loader
 def load_user(user_id):
     """Load User for Login Manager implementation.
 
     Method to retrieve the current_user for the Login Manager module.
+    Login Manager already keeps the loaded user for the rest of the
+    request, and across requests users are kept in `user_cache` so most
+    authenticated requests don't query the database.
 
     Parameters
     ----------
@@ -23,11 +34,76 @@ def load_user(user_id):
 
     Returns
     -------
-        User
-            User instance of the logged in user.
+        CachedUser
+            Lightweight record of the logged in user, None if it doesn't
+            exist.
     """
 
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    user = user_cache.get(user_id)
+
+    if user is None:
+        row = db.session.query(
+            User.id,
+            User.email,
+            User.password
+        ).filter_by(id=user_id).first()
+
+        if row is None:
+            return None
+
+        user = CachedUser(row.id, row.email,
+                          password_fingerprint(row.password))
+        user_cache.set(user_id, user)
+
+    return user
+
+
+class CachedUser(UserMixin):
+    """Cached user class.
+
+    Lightweight, session independent record of a user that can be shared
+    across requests.
+
+    Attributes
+    ----------
+        id : int
+            Id of the user.
+        email : str
+            Email of the user.
+        password_fingerprint : str
+            Fingerprint of the hashed password of the user.
+    """
+
+    __slots__ = ('id', 'email', 'password_fingerprint')
+
+    def __init__(self, user_id, email, password_fingerprint=None):
+        self.id = user_id
+        self.email = email
+        self.password_fingerprint = password_fingerprint
+
+    def __repr__(self):
+        return f"<CachedUser {self.id}>"
+
+
+def password_fingerprint(password_hash):
+    """Password Fingerprint
+
+    Derives a short fingerprint of a hashed password, which changes when
+    the password does, without revealing the hash.
+
+    Parameters
+    ----------
+    password_hash : str
+        Hashed password of a user.
+
+    Returns
+    -------
+    str
+        16 hexadecimal characters fingerprint.
+    """
+
+    return hashlib.sha256((password_hash or '').encode()).hexdigest()[:16]
 
 
 class User(db.Model, UserMixin):
@@ -55,6 +131,18 @@ class User(db.Model, UserMixin):
         return f"<User {self.id}>"
 
 
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    """Invalidate Cached User.
+
+    Removes a changed user from `user_cache` so it's reloaded on its next
+    request. Other processes pick the change up once their entry expires.
+    """
+
+    user_cache.delete(target.id)
+
+
 class Message(db.Model):
     """Message class.
 
@@ -74,6 +162,14 @@ class Message(db.Model):
             Id of the user that sent the message.
         receiver_id : int
             Id of the user that received the message.
+        read : bool
+            Whether the receiver read the message.
+        idempotency_key : str
+            Unique key of the send that stored the message, so a send that
+            is retried stores it only once. None for sends without a key.
+        thread_id : int
+            Id of the conversation of the message, shared by a message and
+            its replies.
         author : User
             User that sent the message.
         receiver : User
@@ -81,6 +177,14 @@ class Message(db.Model):
     """
 
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_receiver_id_timestamp_id',
+                 'receiver_id', 'timestamp', 'id'),
+        db.Index('ix_messages_author_id_timestamp_id',
+                 'author_id', 'timestamp', 'id'),
+        db.Index('ix_messages_thread_id_timestamp_id',
+                 'thread_id', 'timestamp', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.Text)
@@ -88,5 +192,158 @@ class Message(db.Model):
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     receiver_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    read = db.Column(db.Boolean, nullable=False, default=False,
+                     server_default=false())
+    idempotency_key = db.Column(db.String(32), unique=True, index=True)
+    thread_id = db.Column(db.BigInteger)
+    author = relationship("User", foreign_keys=[author_id])
+    receiver = relationship("User", foreign_keys=[receiver_id])
+
+
+class InboxCounter(db.Model):
+    """Inbox counter class.
+
+    Class defining the denormalized message counters of the inbox of a
+    user, kept up to date when messages are sent or read so they can be
+    read without counting the messages.
+
+    Attributes
+    ----------
+        user_id : int
+            Id of the user owning the inbox.
+        total : int
+            Number of messages received by the user.
+        unread : int
+            Number of received messages the user didn't read.
+        version : int
+            Number of changes to the inbox, used to tell if a cached copy
+            of it is stale.
+        modified_at : DateTime
+            Date and time of the last change to the inbox.
+    """
+
+    __tablename__ = 'inbox_counters'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'),
+                        primary_key=True, autoincrement=False)
+    total = db.Column(db.Integer, nullable=False, default=0,
+                      server_default='0')
+    unread = db.Column(db.Integer, nullable=False, default=0,
+                       server_default='0')
+    version = db.Column(db.Integer, nullable=False, default=0,
+                        server_default='0')
+    modified_at = db.Column(db.DateTime)
+
+
+@event.listens_for(User, 'after_insert')
+def create_inbox_counter(mapper, connection, target):
+    """Create Inbox Counter.
+
+    Creates the empty inbox counters of a new user in the same
+    transaction.
+    """
+
+    connection.execute(
+        InboxCounter.__table__.insert().values(user_id=target.id))
+
+
+class ThreadSummary(db.Model):
+    """Thread summary class.
+
+    Class defining the denormalized summary of a conversation for one of
+    its participants, kept up to date when messages are sent or read so
+    the conversations of a user can be listed by their latest activity
+    without grouping the messages.
+
+    Attributes
+    ----------
+        user_id : int
+            Id of the participant the summary belongs to.
+        thread_id : int
+            Id of the conversation.
+        other_user_id : int
+            Id of the other participant.
+        title : str
+            Title of the first message of the conversation.
+        last_activity : DateTime
+            Date and time of the latest message of the conversation.
+        message_count : int
+            Number of messages of the conversation.
+        unread : int
+            Number of messages of the conversation the participant received
+            and didn't read.
+    """
+
+    __tablename__ = 'thread_summaries'
+    __table_args__ = (
+        db.Index('ix_thread_summaries_user_id_last_activity_thread_id',
+                 'user_id', 'last_activity', 'thread_id'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'),
+                        primary_key=True, autoincrement=False)
+    thread_id = db.Column(db.BigInteger, primary_key=True,
+                          autoincrement=False)
+    other_user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    title = db.Column(db.Text)
+    last_activity = db.Column(db.DateTime, nullable=False)
+    message_count = db.Column(db.Integer, nullable=False, default=0,
+                              server_default='0')
+    unread = db.Column(db.Integer, nullable=False, default=0,
+                       server_default='0')
+
+
+class ArchivedMessage(db.Model):
+    """Archived message class.
+
+    Class defining the messages moved out of the messages table by the
+    retention command (see the retention module). They keep their id and
+    are listed after the messages of the Inbox and the Sent view.
+
+    On PostgreSQL the table is partitioned by month of the timestamp, so
+    the primary key includes it and old months can be detached or dropped
+    at once.
+
+    Attributes
+    ----------
+        id : int
+            Id the message had in the messages table.
+        author_id : int
+            Id of the user that sent the message.
+        receiver_id : int
+            Id of the user that received the message.
+        title : str
+            Title of the message.
+        body : str
+            Body of the message.
+        timestamp : DateTime
+            Date and time the message was sent.
+        read : bool
+            Whether the receiver read the message.
+        thread_id : int
+            Id of the conversation of the message.
+        archived_at : DateTime
+            Date and time the message was archived.
+    """
+
+    __tablename__ = 'archived_messages'
+    __table_args__ = (
+        db.Index('ix_archived_messages_receiver_id_timestamp_id',
+                 'receiver_id', 'timestamp', 'id'),
+        db.Index('ix_archived_messages_author_id_timestamp_id',
+                 'author_id', 'timestamp', 'id'),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    receiver_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    title = db.Column(db.Text)
+    body = db.Column(db.Text)
+    timestamp = db.Column(db.DateTime, primary_key=True)
+    read = db.Column(db.Boolean, nullable=False, default=True,
+                     server_default=true())
+    thread_id = db.Column(db.BigInteger)
+    archived_at = db.Column(db.DateTime, nullable=False)
     author = relationship("User", foreign_keys=[author_id])
     receiver = relationship("User", foreign_keys=[receiver_id])
@@ -0,0 +1,185 @@
+"""AOOPMessages routing module.
+
+This module provides a SQLAlchemy integration that routes the queries of
+read only views to read replicas, keeping every write on the primary
+database.
+
+Views are routed to a replica when they are decorated with `read_only`
+and the app has replica binds in SQLALCHEMY_REPLICA_BINDS. After a user
+writes, `stick_to_primary` keeps that user's reads on the primary for
+DATABASE_REPLICA_STICKY_SECONDS, so they see their own writes while the
+replicas catch up. The deadline is kept in the session cookie, so requests
+authenticated without it, such as bearer token requests, are marked with
+`without_session` and always read from the primary instead.
+
+Example
+-------
+    from AOOPMessages.routing import read_only
+
+    @blueprint.route('/items')
+    @read_only
+    def items():
+        ...
+"""
+
+import random
+import sqlite3
+import time
+from functools import wraps
+import click
+from flask import current_app
+from flask import g
+from flask import has_request_context
+from flask import session
+from flask.cli import with_appcontext
+from flask_sqlalchemy import SignallingSession
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import get_state
+from sqlalchemy import orm
+from sqlalchemy.engine.url import make_url
+
+
+PRIMARY_UNTIL_SESSION_KEY = 'db_primary_until'
+
+
+class RoutingSession(SignallingSession):
+    """Routing session class.
+
+    Session that sends the queries of read only views to a replica bind.
+    Flushes, and models with their own bind key, always use the default
+    binding rules.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        replica = current_replica_bind()
+
+        if replica is not None and not self._flushing and \
+                _bind_key(mapper) is None:
+            state = get_state(self.app)
+            return state.db.get_engine(self.app, bind=replica)
+
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Routing SQLAlchemy class.
+
+    Flask-SQLAlchemy integration whose sessions are RoutingSessions.
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def read_only(view):
+    """Read Only
+
+    Decorator marking a view as read only, so its queries can be sent to a
+    replica.
+
+    Parameters
+    ----------
+    view : function
+        View to decorate.
+
+    Returns
+    -------
+    function
+        The decorated view.
+    """
+
+    @wraps(view)
+    def decorated_view(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+
+    return decorated_view
+
+
+def stick_to_primary():
+    """Stick To Primary
+
+    Keeps the reads of the current user on the primary database for
+    DATABASE_REPLICA_STICKY_SECONDS, so the user can read their own writes.
+    """
+
+    if not g.get('db_without_session'):
+        session[PRIMARY_UNTIL_SESSION_KEY] = time.time() + \
+            current_app.config['DATABASE_REPLICA_STICKY_SECONDS']
+    g.db_replica_bind = None
+
+
+def without_session():
+    """Without Session
+
+    Marks the current request as authenticated without the session
+    cookie. There's no session to remember the writes of the user in, so
+    the reads of the request go to the primary database, and
+    stick_to_primary doesn't write the session.
+    """
+
+    g.db_without_session = True
+    g.db_replica_bind = None
+
+
+def current_replica_bind():
+    """Current Replica Bind
+
+    Chooses the replica bind for the queries of the current request. The
+    choice is kept for the rest of the request.
+
+    Returns
+    -------
+    str
+        Key of the replica bind, None if the queries must go to the
+        primary database.
+    """
+
+    if not has_request_context() or not g.get('db_read_only'):
+        return None
+
+    if 'db_replica_bind' not in g:
+        replicas = current_app.config['SQLALCHEMY_REPLICA_BINDS']
+        sticky = session.get(PRIMARY_UNTIL_SESSION_KEY, 0) > time.time()
+
+        g.db_replica_bind = random.choice(replicas) \
+            if replicas and not sticky else None
+
+    return g.db_replica_bind
+
+
+def _bind_key(mapper):
+    if mapper is None:
+        return None
+    return mapper.persist_selectable.info.get('bind_key')
+
+
+@click.command('sync-replicas')
+@with_appcontext
+def sync_replicas_command():
+    """Copy the SQLite primary database to its SQLite replicas.
+
+    Local stand-in for database replication, for development setups where
+    two SQLite files play the primary and the replica.
+    """
+
+    primary = make_url(current_app.config['SQLALCHEMY_DATABASE_URI'])
+    binds = current_app.config['SQLALCHEMY_BINDS'] or {}
+
+    if primary.get_backend_name() != 'sqlite':
+        raise click.ClickException('The primary database is not SQLite')
+
+    for bind in current_app.config['SQLALCHEMY_REPLICA_BINDS']:
+        replica = make_url(binds[bind])
+        if replica.get_backend_name() != 'sqlite':
+            raise click.ClickException(f'The {bind} bind is not SQLite')
+
+        source = sqlite3.connect(primary.database)
+        target = sqlite3.connect(replica.database)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+
+        click.echo(f'Copied {primary.database} to {replica.database}')
@@ -0,0 +1,151 @@
+"""AOOPMessages slow queries module.
+
+This module provides an extension that logs the SQL statements taking
+longer than SLOW_QUERY_THRESHOLD seconds, with the endpoint that issued
+them. With SLOW_QUERY_EXPLAIN set, the plan of slow SELECT statements is
+logged too: `EXPLAIN QUERY PLAN` on SQLite and `EXPLAIN ANALYZE` on
+PostgreSQL. Each statement is explained at most once every
+SLOW_QUERY_EXPLAIN_CACHE_TTL seconds, so a query that's slow for every
+user doesn't double the load of the database.
+
+Parameters aren't logged, as they hold emails and message contents.
+
+Example
+-------
+    from AOOPMessages.slow_queries import slow_query_log
+
+    slow_query_log.init_app(app)
+"""
+
+import logging
+from flask import has_request_context
+from flask import request
+from AOOPMessages import sql_timing
+from AOOPMessages.cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ANALYZE ',
+}
+
+
+class SlowQueryLog:
+    """Slow query log class.
+
+    Flask extension logging the slow SQL statements of the app.
+
+    Attributes
+    ----------
+        threshold : float
+            Seconds a statement has to take to be logged, 0 to log none.
+            Read from SLOW_QUERY_THRESHOLD.
+        explain : bool
+            Whether the plans of slow SELECT statements are logged. Read
+            from SLOW_QUERY_EXPLAIN.
+        explained : LRUCache
+            Statements explained recently, read from the
+            SLOW_QUERY_EXPLAIN_CACHE_SIZE and SLOW_QUERY_EXPLAIN_CACHE_TTL
+            configurations.
+    """
+
+    def __init__(self):
+        self.threshold = 0
+        self.explain = False
+        self.explained = LRUCache('SLOW_QUERY_EXPLAIN_CACHE')
+
+    def init_app(self, app):
+        """Init App.
+        Configures the log from the app configuration and starts timing
+        the statements of every engine.
+
+        Parameters
+        ----------
+        app : Flask
+            App to read the SLOW_QUERY_* configurations from.
+        """
+
+        self.threshold = app.config['SLOW_QUERY_THRESHOLD']
+        self.explain = app.config['SLOW_QUERY_EXPLAIN']
+        self.explained.init_app(app)
+
+        if self.threshold:
+            sql_timing.subscribe(self._observe_statement)
+
+    def log(self, conn, statement, parameters, elapsed, executemany):
+        """Log.
+        Logs a slow statement, with its plan if it's a SELECT and
+        SLOW_QUERY_EXPLAIN is set.
+
+        Parameters
+        ----------
+        conn : Connection
+            Connection that ran the statement.
+        statement : str
+            The statement.
+        parameters : tuple or dict
+            Parameters of the statement.
+        elapsed : float
+            Seconds the statement took.
+        executemany : bool
+            Whether the statement ran once per set of parameters.
+        """
+
+        endpoint = request.endpoint if has_request_context() else None
+        logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000,
+                       endpoint or 'no request', ' '.join(statement.split()))
+
+        if not self.explain or executemany or \
+                not statement.lstrip().upper().startswith('SELECT') or \
+                conn.dialect.name not in EXPLAIN_PREFIXES or \
+                self.explained.get(statement) is not None:
+            return
+
+        self.explained.set(statement, True)
+
+        try:
+            plan = self._explain(conn, statement, parameters)
+        except Exception:
+            logger.debug('Explaining a slow query failed', exc_info=True)
+            return
+
+        logger.warning('Plan of the slow query in %s:\n%s',
+                       endpoint or 'no request', plan)
+
+    def _explain(self, conn, statement, parameters):
+        dialect = conn.dialect.name
+        cursor = conn.connection.cursor()
+
+        try:
+            if dialect == 'postgresql':
+                # A failed EXPLAIN would abort the transaction of the view.
+                cursor.execute('SAVEPOINT slow_query_explain')
+            try:
+                cursor.execute(EXPLAIN_PREFIXES[dialect] + statement,
+                               parameters)
+                rows = cursor.fetchall()
+            except Exception:
+                if dialect == 'postgresql':
+                    cursor.execute(
+                        'ROLLBACK TO SAVEPOINT slow_query_explain')
+                raise
+            if dialect == 'postgresql':
+                cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        finally:
+            cursor.close()
+
+        if dialect == 'sqlite':
+            # Rows are (id, parent, notused, detail).
+            return '\n'.join(row[3] for row in rows)
+
+        return '\n'.join(row[0] for row in rows)
+
+    def _observe_statement(self, conn, statement, parameters, executemany,
+                           elapsed):
+        if self.threshold and elapsed >= self.threshold:
+            self.log(conn, statement, parameters, elapsed, executemany)
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,72 @@
+"""AOOPMessages SQL timing module.
+
+This module times the SQL statements of every engine with a single pair of
+cursor execute listeners, and passes each statement and the seconds it
+took to the subscribed observers, such as the metrics and the slow query
+log. The start time is kept on the execution context of the statement, so
+a statement that fails leaves nothing behind on its connection.
+
+Example
+-------
+    from AOOPMessages import sql_timing
+
+    def observe(conn, statement, parameters, executemany, elapsed):
+        ...
+
+    sql_timing.subscribe(observe)
+"""
+
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+_observers = []
+_lock = threading.Lock()
+_listening = False
+
+
+def subscribe(observer):
+    """Subscribe
+
+    Calls an observer after each SQL statement of every engine, starting
+    the timing listeners if they aren't listening yet. Subscribing the same
+    observer again does nothing.
+
+    Parameters
+    ----------
+    observer : callable
+        Called with the connection, the statement, its parameters, whether
+        it ran once per set of parameters and the seconds it took.
+    """
+
+    global _listening
+
+    with _lock:
+        if observer not in _observers:
+            _observers.append(observer)
+
+        if not _listening:
+            event.listen(Engine, 'before_cursor_execute',
+                         _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute',
+                         _after_cursor_execute)
+            _listening = True
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if context is not None:
+        context.sql_timing_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    started = getattr(context, 'sql_timing_started', None)
+    if started is None:
+        return
+
+    elapsed = time.perf_counter() - started
+    for observer in _observers:
+        observer(conn, statement, parameters, executemany, elapsed)
@@ -0,0 +1,26 @@
+document.addEventListener('aoop:message', function (event) {
+    var message = event.detail;
+    var column = document.createElement('div');
+    column.className = 'col-md-12 col-lg-6';
+    column.innerHTML = '<div class="card mt-2"><div class="card-body">' +
+        '<h5 class="card-title"></h5>' +
+        '<h6 class="card-subtitle mb-2 text-muted"></h6>' +
+        '<p class="card-text"></p></div></div>';
+    column.querySelector('.card-title').textContent = message.author_email + ' ';
+    column.querySelector('.card-subtitle').textContent =
+        message.title + ' - ' + message.timestamp.slice(0, 10);
+    column.querySelector('.card-text').textContent = message.body;
+
+    var badge = document.createElement('span');
+    badge.className = 'badge badge-primary';
+    badge.textContent = 'Unread';
+    column.querySelector('.card-title').appendChild(badge);
+
+    var empty = document.getElementById('noMessages');
+    if (empty) {
+        empty.parentNode.removeChild(empty);
+    }
+
+    var list = document.getElementById('receivedMessages');
+    list.insertBefore(column, list.firstChild);
+});
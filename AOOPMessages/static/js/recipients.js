@@ -0,0 +1,27 @@
+(function () {
+    var search = document.getElementById('recipientSearch');
+    var select = document.getElementById('to');
+    var timer = null;
+
+    function loadRecipients() {
+        var url = search.dataset.url + '?q=' + encodeURIComponent(search.value);
+        fetch(url, { credentials: 'same-origin' })
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                select.innerHTML = '';
+                data.recipients.forEach(function (recipient) {
+                    var option = document.createElement('option');
+                    option.value = recipient.id;
+                    option.textContent = recipient.email;
+                    select.appendChild(option);
+                });
+            });
+    }
+
+    search.addEventListener('input', function () {
+        clearTimeout(timer);
+        timer = setTimeout(loadRecipients, 200);
+    });
+
+    loadRecipients();
+})();
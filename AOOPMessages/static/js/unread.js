@@ -0,0 +1,36 @@
+(function () {
+    var badge = document.getElementById('unreadCount');
+
+    function loadCounts() {
+        fetch(badge.dataset.url, { credentials: 'same-origin' })
+            .then(function (response) { return response.json(); })
+            .then(function (counts) {
+                badge.textContent = counts.unread > 0 ? counts.unread : '';
+            });
+    }
+
+    function pollCounts() {
+        setInterval(loadCounts, 30000);
+    }
+
+    loadCounts();
+
+    // Only the first Inbox page streams new messages. The other pages, and
+    // the Inbox when the server refuses the stream, poll the counts.
+    if (window.EventSource && badge.dataset.streamUrl) {
+        var stream = new EventSource(badge.dataset.streamUrl);
+        stream.addEventListener('message', function (event) {
+            loadCounts();
+            document.dispatchEvent(new CustomEvent('aoop:message', {
+                detail: JSON.parse(event.data)
+            }));
+        });
+        stream.addEventListener('error', function () {
+            if (stream.readyState === EventSource.CLOSED) {
+                pollCounts();
+            }
+        });
+    } else {
+        pollCounts();
+    }
+})();
@@ -0,0 +1,10 @@
+"""AOOPMessages benchmarks.
+
+This package contains scripts measuring the performance of the app. Run
+them as modules from the repository root, e.g.:
+
+    python -m benchmarks.startup
+
+The seed module fills a database with synthetic users and messages for
+them.
+"""
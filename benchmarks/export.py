@@ -0,0 +1,98 @@
+"""Export benchmark.
+
+This module streams the export of a single mailbox as it grows and
+reports, for each format, the bytes sent, the time taken and the peak
+memory allocated while streaming, which should stay flat whatever the
+size of the mailbox.
+
+The database is a temporary SQLite file unless PRODUCTION_DATABASE_URI is
+set. Results are printed as JSON.
+
+Example
+-------
+    python -m benchmarks.export --sizes 10000 100000 1000000 --gzip
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+FORMATS = ('jsonl', 'csv', 'mbox')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000],
+                        help='sizes of the mailbox to measure at')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS,
+                        default=list(FORMATS), help='formats to export')
+    parser.add_argument('--gzip', action='store_true',
+                        help='gzip the exports')
+    args = parser.parse_args()
+
+    database_file = os.path.join(tempfile.mkdtemp(), 'export.db')
+    os.environ.setdefault('PRODUCTION_DATABASE_URI',
+                          'sqlite:///' + database_file)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from AOOPMessages import create_app, db
+    from AOOPMessages.api.tokens import generate_token
+    from benchmarks.seed import seed
+
+    app = create_app('production')
+    client = app.test_client()
+    results = []
+    seeded = 0
+
+    # The token of user 1 is built once the first seed created it.
+    headers = {}
+
+    with app.app_context():
+        db.create_all()
+
+    for size in sorted(args.sizes):
+        with app.app_context():
+            seed(db, 10 if not seeded else 0, size - seeded, receiver_id=1,
+                 random_seed=size)
+            headers.setdefault(
+                'Authorization', f'Bearer {generate_token(1)}')
+        seeded = size
+
+        result = {'messages': size}
+
+        for export_format in args.formats:
+            tracemalloc.start()
+            start = time.perf_counter()
+
+            response = client.get('/api/v1/messages/export', headers=headers,
+                                  query_string={'format': export_format,
+                                                'gzip': int(args.gzip)})
+            sent = sum(len(chunk) for chunk in response.response)
+            response.close()
+
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            result[export_format] = {
+                'bytes': sent,
+                'seconds': round(seconds, 3),
+                'peak_memory_kib': round(peak / 1024, 1),
+            }
+
+        results.append(result)
+
+    print(json.dumps({
+        'benchmark': 'export',
+        'gzip': args.gzip,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Fragment cache benchmark.
+
+This module measures the latency of rendering the pages of the Inbox with
+and without the message card fragment cache, and reports the hit rate
+and memory use of the cache.
+
+The database is a temporary SQLite file unless PRODUCTION_DATABASE_URI is
+set. Results are printed as JSON.
+
+Example
+-------
+    python -m benchmarks.fragments --messages 10000 --pages 20 --rounds 5
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+
+
+NEXT_PAGE = re.compile(r'href="(/messages\?before=[^"]+)"')
+
+
+def walk(client, pages):
+    """Walk
+
+    Requests the first pages of the Inbox, following their Next links.
+
+    Parameters
+    ----------
+    client : FlaskClient
+        Client logged in as the owner of the Inbox.
+    pages : int
+        Number of pages to request.
+
+    Returns
+    -------
+    list
+        Latency of each request, in milliseconds.
+    """
+
+    timings = []
+    url = '/messages'
+
+    for _ in range(pages):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+
+        next_page = NEXT_PAGE.search(response.get_data(as_text=True))
+        if next_page is None:
+            break
+        url = next_page.group(1).replace('&amp;', '&')
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--messages', type=int, default=10000,
+                        help='messages in the mailbox')
+    parser.add_argument('--pages', type=int, default=20,
+                        help='Inbox pages requested per round')
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='rounds over the same pages')
+    args = parser.parse_args()
+
+    database_file = os.path.join(tempfile.mkdtemp(), 'fragments.db')
+    os.environ.setdefault('PRODUCTION_DATABASE_URI',
+                          'sqlite:///' + database_file)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+    from AOOPMessages import create_app, db
+    from AOOPMessages.messages.fragments import fragment_cache
+    from benchmarks.seed import seed, SEED_PASSWORD
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        seed(db, 10, args.messages, receiver_id=1)
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'user1@example.com',
+                                'password': SEED_PASSWORD})
+
+    results = {}
+
+    for mode, enabled in (('uncached', False), ('cached', True)):
+        fragment_cache.init_app(app)
+        fragment_cache.enabled = enabled
+
+        timings = []
+        for _ in range(args.rounds):
+            timings.extend(walk(client, args.pages))
+
+        results[mode] = {
+            'requests': len(timings),
+            'median_ms': round(statistics.median(timings), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+        }
+        if enabled:
+            results[mode]['cache'] = fragment_cache.stats()
+
+    print(json.dumps({
+        'benchmark': 'fragments',
+        'messages': args.messages,
+        'pages': args.pages,
+        'rounds': args.rounds,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+"""Load benchmark.
+
+This module seeds synthetic users and messages, then drives the login,
+Inbox, send and sign up endpoints with concurrent clients and reports the
+p50, p95 and p99 latency and the throughput of each.
+
+Requests go through the Flask test client by default. With --gunicorn
+they go over HTTP to a local gunicorn started on the same database, and
+with --url to a server that's already running. The database is a
+temporary SQLite file unless PRODUCTION_DATABASE_URI is set, so --url
+takes --no-seed unless PRODUCTION_DATABASE_URI is the database of that
+server. Results are printed as JSON, with the commit they were measured
+on, and written to --output if given, so runs can be compared across
+commits.
+
+Example
+-------
+    python -m benchmarks.load --users 10000 --messages 10000000 \\
+        --requests 2000 --concurrency 8 --gunicorn 4 --output load.json
+"""
+
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from benchmarks.seed import SEED_PASSWORD
+
+
+SCENARIOS = ('login', 'inbox', 'send', 'signup')
+EXPECTED_STATUS = {'login': 302, 'inbox': 200, 'send': 302, 'signup': 302}
+
+
+class TestClientSession:
+    """Test client session class.
+
+    Client of the app going through the Flask test client.
+    """
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        """Request.
+        Sends a request without following redirects.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+        path : str
+            Path of the URL.
+        data : dict
+            Form fields of the request.
+
+        Returns
+        -------
+        int
+            Status code of the response.
+        """
+
+        response = self.client.open(path, method=method, data=data)
+        response.close()
+        return response.status_code
+
+
+class HTTPSession:
+    """HTTP session class.
+
+    Client of a running server, keeping its cookies.
+    """
+
+    class NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            self.NoRedirect)
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data else None
+
+        try:
+            with self.opener.open(urllib.request.Request(
+                    self.url + path, data=body, method=method)) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code
+
+
+def percentile(timings, fraction):
+    """Percentile
+
+    Computes a nearest rank percentile.
+
+    Parameters
+    ----------
+    timings : list
+        Sorted latencies.
+    fraction : float
+        Percentile, between 0 and 1.
+
+    Returns
+    -------
+    float
+        The percentile, rounded to microseconds.
+    """
+
+    return round(timings[max(math.ceil(len(timings) * fraction) - 1, 0)], 3)
+
+
+def run(scenario, sessions, requests, users):
+    """Run
+
+    Sends the requests of a scenario from one thread per session.
+
+    Parameters
+    ----------
+    scenario : str
+        Name of the scenario, one of SCENARIOS.
+    sessions : list
+        Sessions sending the requests, logged in as different users.
+    requests : int
+        Number of requests sent in total.
+    users : int
+        Number of seeded users, the recipients of the sends.
+
+    Returns
+    -------
+    dict
+        Number of `requests` and of `errors`, responses with another
+        status than the expected one, `seconds` taken, throughput in
+        requests per second and latency percentiles in milliseconds.
+    """
+
+    timings = []
+    errors = []
+    lock = threading.Lock()
+
+    def work(index, session, count):
+        rng = random.Random(index)
+        local_timings = []
+        local_errors = 0
+
+        for _ in range(count):
+            method, path, data = scenario_request(scenario, index, rng, users)
+            start = time.perf_counter()
+            status = session.request(method, path, data)
+            local_timings.append((time.perf_counter() - start) * 1000)
+            local_errors += status != EXPECTED_STATUS[scenario]
+
+        with lock:
+            timings.extend(local_timings)
+            errors.append(local_errors)
+
+    counts = [requests // len(sessions) +
+              (index < requests % len(sessions))
+              for index in range(len(sessions))]
+    threads = [threading.Thread(target=work, args=(index, session, count))
+               for index, (session, count)
+               in enumerate(zip(sessions, counts))]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    timings.sort()
+
+    return {
+        'requests': len(timings),
+        'errors': sum(errors),
+        'seconds': round(seconds, 3),
+        'throughput_rps': round(len(timings) / seconds, 2),
+        'p50_ms': percentile(timings, 0.5),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+        'max_ms': round(timings[-1], 3),
+    }
+
+
+def scenario_request(scenario, index, rng, users):
+    """Scenario Request
+
+    Builds the next request of a scenario.
+
+    Parameters
+    ----------
+    scenario : str
+        Name of the scenario, one of SCENARIOS.
+    index : int
+        Index of the session sending the request.
+    rng : Random
+        Random generator of the session.
+    users : int
+        Number of seeded users.
+
+    Returns
+    -------
+    tuple
+        Method, path and form fields of the request.
+    """
+
+    if scenario == 'login':
+        return 'POST', '/login', credentials(index, users)
+    if scenario == 'inbox':
+        return 'GET', '/messages', None
+    if scenario == 'send':
+        return 'POST', '/messages/send', {
+            'to': rng.randint(1, users),
+            'title': 'load test',
+            'body': 'Sent by the load benchmark.',
+        }
+
+    return 'POST', '/signup', {
+        'email': f'load-{uuid.uuid4().hex}@example.com',
+        'password': SEED_PASSWORD,
+    }
+
+
+def credentials(index, users):
+    """Credentials
+
+    Returns the login form of the seeded user of a session.
+
+    Parameters
+    ----------
+    index : int
+        Index of the session.
+    users : int
+        Number of seeded users.
+
+    Returns
+    -------
+    dict
+        The email and password fields.
+    """
+
+    return {'email': f'user{index % users + 1}@example.com',
+            'password': SEED_PASSWORD}
+
+
+def start_gunicorn(workers):
+    """Start Gunicorn
+
+    Starts gunicorn serving the production app on a free local port.
+
+    Parameters
+    ----------
+    workers : int
+        Number of worker processes.
+
+    Returns
+    -------
+    tuple
+        The gunicorn Popen and the URL it serves.
+    """
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+
+    process = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+        '--threads', '4', '--bind', f'127.0.0.1:{port}', '--log-level',
+        'warning', "AOOPMessages:create_app('production')"])
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + '/login').close()
+            return process, url
+        except OSError:
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def commit():
+    """Commit
+
+    Returns the git commit of the working tree, if any.
+
+    Returns
+    -------
+    str
+        The commit hash, None outside a git checkout.
+    """
+
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=1000,
+                        help='users to seed')
+    parser.add_argument('--messages', type=int, default=100000,
+                        help='messages to seed')
+    parser.add_argument('--no-seed', action='store_true',
+                        help='use the users and messages already seeded')
+    parser.add_argument('--requests', type=int, default=500,
+                        help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='concurrent clients')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS,
+                        default=list(SCENARIOS), help='scenarios to run')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--gunicorn', type=int, metavar='WORKERS',
+                        help='serve the app with a local gunicorn')
+    target.add_argument('--url', help='URL of a running server')
+    parser.add_argument('--output', help='file to write the results to')
+    args = parser.parse_args()
+
+    # A remote server never reads the temporary database seeded otherwise.
+    if args.url and not args.no_seed and \
+            not os.environ.get('PRODUCTION_DATABASE_URI'):
+        parser.error('--url requires --no-seed, or PRODUCTION_DATABASE_URI '
+                     'set to the database of the server to seed it')
+
+    database_file = os.path.join(tempfile.mkdtemp(), 'load.db')
+    os.environ.setdefault('PRODUCTION_DATABASE_URI',
+                          'sqlite:///' + database_file)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from AOOPMessages import create_app, db
+    from benchmarks.seed import seed
+
+    app = create_app('production')
+    seeded = None
+    if not args.no_seed:
+        with app.app_context():
+            db.create_all()
+            seeded = seed(db, args.users, args.messages)
+
+    server = None
+    if args.gunicorn:
+        server, url = start_gunicorn(args.gunicorn)
+    else:
+        url = args.url
+
+    def session():
+        return HTTPSession(url) if url else TestClientSession(app)
+
+    try:
+        sessions = []
+        for index in range(args.concurrency):
+            sessions.append(session())
+            sessions[-1].request('POST', '/login',
+                                 credentials(index, args.users))
+
+        results = {scenario: run(scenario, sessions if scenario != 'login'
+                                 else [session() for _ in sessions],
+                                 args.requests, args.users)
+                   for scenario in args.scenarios}
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    output = json.dumps({
+        'benchmark': 'load',
+        'commit': commit(),
+        'target': url or 'test client',
+        'users': args.users,
+        'messages': args.messages,
+        'seed': seeded,
+        'concurrency': args.concurrency,
+        'results': results,
+    }, indent=2)
+
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Search benchmark.
+
+This module measures the latency of the message search against a single
+mailbox holding a large number of messages, and compares it with scanning
+the title and body with LIKE, as an unindexed search would.
+
+The database is a temporary SQLite file unless PRODUCTION_DATABASE_URI is
+set. The mailbox is seeded first unless --no-seed is passed. Results are
+printed as JSON.
+
+Example
+-------
+    python -m benchmarks.search --messages 1000000 --runs 20
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import tempfile
+import time
+
+
+def measure(function, runs):
+    """Measure
+
+    Times repeated calls to a function.
+
+    Parameters
+    ----------
+    function : function
+        Function to time, called without arguments.
+    runs : int
+        Number of timed calls.
+
+    Returns
+    -------
+    dict
+        Median, p95 and max latency in milliseconds.
+    """
+
+    timings = []
+
+    for _ in range(runs + 1):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings = sorted(timings[1:])
+
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[math.ceil(len(timings) * 0.95) - 1], 3),
+        'max_ms': round(timings[-1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--messages', type=int, default=1000000,
+                        help='messages in the mailbox')
+    parser.add_argument('--runs', type=int, default=20,
+                        help='timed searches per query')
+    parser.add_argument('--scan-runs', type=int, default=3,
+                        help='timed LIKE scans per query')
+    parser.add_argument('--no-seed', action='store_true',
+                        help='search an already seeded database')
+    args = parser.parse_args()
+
+    database_file = os.path.join(tempfile.mkdtemp(), 'search.db')
+    os.environ.setdefault('PRODUCTION_DATABASE_URI',
+                          'sqlite:///' + database_file)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from sqlalchemy import and_
+    from AOOPMessages import create_app, db
+    from AOOPMessages.models import Message
+    from AOOPMessages.messages import search
+    from benchmarks.seed import seed, vocabulary
+
+    app = create_app('production')
+    per_page = app.config['SEARCH_RESULTS_PER_PAGE']
+    words = vocabulary()
+    queries = {
+        'frequent_word': words[0],
+        'common_word': words[100],
+        'rare_word': words[-1],
+        'two_words': f'{words[10]} {words[500]}',
+        'prefix': words[200][:2],
+    }
+    results = {}
+
+    with app.app_context():
+        if not args.no_seed:
+            db.create_all()
+            seeding = seed(db, 10, args.messages, receiver_id=1)
+            results['seed'] = seeding
+
+        for name, query in queries.items():
+            results[name] = {
+                'query': query,
+                'index': measure(
+                    lambda: search.search(1, query, 1, per_page),
+                    args.runs),
+                'scan': measure(
+                    lambda: db.session.query(Message.id).filter(
+                        Message.receiver_id == 1,
+                        and_(*((Message.title.ilike(f'%{term}%') |
+                                Message.body.ilike(f'%{term}%'))
+                               for term in query.split()))
+                    ).order_by(Message.id.desc()).limit(per_page).all(),
+                    args.scan_runs),
+            }
+
+    print(json.dumps({
+        'benchmark': 'search',
+        'messages': args.messages,
+        'runs': args.runs,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Seed benchmark data.
+
+This module fills a database with synthetic users and messages for the
+benchmarks. Titles and bodies are drawn from a vocabulary with a Zipf
+distribution, so a few words appear in most messages and most words in
+few of them, as in real text.
+
+Rows are inserted with executemany statements in chunks, and the inbox
+counters are rebuilt once at the end.
+
+Example
+-------
+    PRODUCTION_DATABASE_URI=sqlite:////tmp/bench.db \\
+        python -m benchmarks.seed --users 1000 --messages 100000
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+VOCABULARY_SIZE = 10000
+SEED_PASSWORD = 'benchmark'
+
+
+def vocabulary(size=VOCABULARY_SIZE):
+    """Vocabulary
+
+    Builds the synthetic words of the messages, most frequent first.
+
+    Parameters
+    ----------
+    size : int
+        Number of words.
+
+    Returns
+    -------
+    list
+        The words.
+    """
+
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = (''.join(chars) for chars in itertools.chain.from_iterable(
+        itertools.product(letters, repeat=length) for length in (3, 4)))
+
+    return list(itertools.islice(words, size))
+
+
+def sentences(words, rng, minimum, maximum):
+    """Sentences
+
+    Generates random sentences of Zipf distributed words.
+
+    Parameters
+    ----------
+    words : list
+        Vocabulary, most frequent word first.
+    rng : Random
+        Random generator.
+    minimum : int
+        Minimum number of words of a sentence.
+    maximum : int
+        Maximum number of words of a sentence.
+
+    Yields
+    ------
+    str
+        The sentences.
+    """
+
+    weights = list(itertools.accumulate(
+        1 / rank for rank in range(1, len(words) + 1)))
+
+    while True:
+        yield ' '.join(rng.choices(words, cum_weights=weights,
+                                   k=rng.randint(minimum, maximum)))
+
+
+def seed(db, users, messages, receiver_id=None, chunk_size=10000,
+         random_seed=0):
+    """Seed
+
+    Inserts users and messages into the database of the current app. Must
+    be called inside an app context.
+
+    Parameters
+    ----------
+    db : SQLAlchemy
+        SQLAlchemy integration of the app.
+    users : int
+        Number of users to create. Their emails are `user<n>@example.com`
+        and their password is SEED_PASSWORD.
+    messages : int
+        Number of messages to create.
+    receiver_id : int
+        Id of the user receiving every message. The messages are spread
+        among all the users if it's None.
+    chunk_size : int
+        Number of rows inserted per statement.
+    random_seed : int
+        Seed of the random generator, so runs are repeatable.
+
+    Returns
+    -------
+    dict
+        Number of `users` and `messages` created, and `seconds` taken.
+    """
+
+    from werkzeug.security import generate_password_hash
+    from AOOPMessages.models import Message, User
+    from AOOPMessages.messages import counters
+    from AOOPMessages.messages import threads
+
+    start = time.perf_counter()
+    rng = random.Random(random_seed)
+    password = generate_password_hash(SEED_PASSWORD)
+
+    first_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    for chunk_start in range(0, users, chunk_size):
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'user{first_id + n}@example.com', 'password': password}
+            for n in range(chunk_start, min(chunk_start + chunk_size, users))
+        ])
+    db.session.commit()
+
+    user_ids = [user_id for user_id, in db.session.query(User.id)]
+    words = vocabulary()
+    titles = sentences(words, rng, 2, 6)
+    bodies = sentences(words, rng, 10, 40)
+    now = datetime.utcnow()
+
+    for chunk_start in range(0, messages, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, messages)
+        db.session.execute(Message.__table__.insert(), [{
+            'author_id': rng.choice(user_ids),
+            'receiver_id': receiver_id or rng.choice(user_ids),
+            'title': next(titles),
+            'body': next(bodies),
+            'timestamp': now - timedelta(seconds=messages - n),
+        } for n in range(chunk_start, chunk_end)])
+        db.session.commit()
+
+    counters.reconcile()
+    threads.reconcile()
+
+    return {
+        'users': users,
+        'messages': messages,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=1000,
+                        help='users to create')
+    parser.add_argument('--messages', type=int, default=100000,
+                        help='messages to create')
+    parser.add_argument('--receiver-id', type=int, default=None,
+                        help='user receiving every message')
+    args = parser.parse_args()
+
+    database_file = os.path.join(tempfile.mkdtemp(), 'seed.db')
+    os.environ.setdefault('PRODUCTION_DATABASE_URI',
+                          'sqlite:///' + database_file)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from AOOPMessages import create_app, db
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        results = seed(db, args.users, args.messages, args.receiver_id)
+
+    print(json.dumps({
+        'benchmark': 'seed',
+        'database': app.config['SQLALCHEMY_DATABASE_URI'],
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
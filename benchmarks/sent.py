@@ -0,0 +1,117 @@
+"""Sent view benchmark.
+
+This module measures the latency of listing the sent messages of a user
+through the API as the messages table grows, with the
+(author_id, timestamp, id) index and, with --compare-scan, without it.
+
+The database is a temporary SQLite file unless PRODUCTION_DATABASE_URI is
+set. Results are printed as JSON.
+
+Example
+-------
+    python -m benchmarks.sent --sizes 10000 100000 1000000 --compare-scan
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+
+INDEX_NAME = 'ix_messages_author_id_timestamp_id'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000, 1000000],
+                        help='sizes of the messages table to measure at')
+    parser.add_argument('--users', type=int, default=1000,
+                        help='users sending the messages')
+    parser.add_argument('--runs', type=int, default=20,
+                        help='timed requests per measure')
+    parser.add_argument('--compare-scan', action='store_true',
+                        help='also measure without the author index')
+    args = parser.parse_args()
+
+    database_file = os.path.join(tempfile.mkdtemp(), 'sent.db')
+    os.environ.setdefault('PRODUCTION_DATABASE_URI',
+                          'sqlite:///' + database_file)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from AOOPMessages import create_app, db
+    from AOOPMessages.api.tokens import generate_token
+    from benchmarks.search import measure
+    from benchmarks.seed import seed
+
+    app = create_app('production')
+    client = app.test_client()
+    results = []
+    seeded = 0
+
+    # The token of user 1 is built once the first seed created it.
+    headers = {}
+
+    with app.app_context():
+        db.create_all()
+
+    def first_page():
+        client.get('/api/v1/messages/sent', headers=headers)
+
+    def deep_page():
+        cursor = None
+        for _ in range(10):
+            response = client.get(
+                '/api/v1/messages/sent' +
+                (f'?before={cursor}' if cursor else ''), headers=headers)
+            cursor = response.get_json()['next']
+            if cursor is None:
+                break
+
+    for size in sorted(args.sizes):
+        with app.app_context():
+            seed(db, args.users if not seeded else 0, size - seeded,
+                 random_seed=size)
+            headers.setdefault(
+                'Authorization', f'Bearer {generate_token(1)}')
+            sent = db.session.execute(
+                'SELECT COUNT(*) FROM messages WHERE author_id = 1').scalar()
+        seeded = size
+
+        result = {
+            'messages': size,
+            'sent_by_user': sent,
+            'indexed': {
+                'first_page': measure(first_page, args.runs),
+                'ten_pages': measure(deep_page, max(args.runs // 10, 1)),
+            },
+        }
+
+        if args.compare_scan:
+            with app.app_context():
+                db.session.execute(f'DROP INDEX {INDEX_NAME}')
+                db.session.commit()
+
+            result['scan'] = {
+                'first_page': measure(first_page, args.runs),
+                'ten_pages': measure(deep_page, max(args.runs // 10, 1)),
+            }
+
+            with app.app_context():
+                db.session.execute(
+                    f'CREATE INDEX {INDEX_NAME} ON messages '
+                    '(author_id, timestamp, id)')
+                db.session.commit()
+
+        results.append(result)
+
+    print(json.dumps({
+        'benchmark': 'sent',
+        'users': args.users,
+        'runs': args.runs,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Startup benchmark.
+
+This module measures how long `create_app('production')` takes when the
+schema is created at startup with `db.create_all()`, the previous
+behaviour, and when it's left to the migrations.
+
+The database is a temporary SQLite file unless PRODUCTION_DATABASE_URI is
+set. Results are printed as JSON.
+
+Example
+-------
+    python -m benchmarks.startup --runs 50
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+
+def measure(create_app, db, runs):
+    """Measure
+
+    Times repeated calls to create_app('production').
+
+    Parameters
+    ----------
+    create_app : function
+        App factory to time.
+    db : SQLAlchemy
+        SQLAlchemy integration, used to close the connections of each app.
+    runs : int
+        Number of timed calls.
+
+    Returns
+    -------
+    dict
+        Mean, median, min and max startup time in milliseconds.
+    """
+
+    timings = []
+
+    for _ in range(runs + 1):
+        start = time.perf_counter()
+        app = create_app('production')
+        timings.append((time.perf_counter() - start) * 1000)
+
+        with app.app_context():
+            db.get_engine().dispose()
+
+    timings = timings[1:]
+
+    return {
+        'mean_ms': round(statistics.mean(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=20,
+                        help='timed create_app calls per mode')
+    args = parser.parse_args()
+
+    database_file = os.path.join(tempfile.mkdtemp(), 'startup.db')
+    os.environ.setdefault('PRODUCTION_DATABASE_URI',
+                          'sqlite:///' + database_file)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from AOOPMessages import create_app, db
+    from AOOPMessages.config import config
+
+    production = config['production']
+    results = {}
+
+    for mode, create_schema in (('create_all', True), ('migrations', False)):
+        production.SCHEMA_CREATE_ON_STARTUP = create_schema
+        results[mode] = measure(create_app, db, args.runs)
+
+    print(json.dumps({
+        'benchmark': 'startup',
+        'runs': args.runs,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Bytes on wire benchmark.
+
+This module measures the bytes sent for an Inbox page holding 500
+messages, with and without compression, and for the static assets it
+loads, on a first visit and on a repeated visit with a warm browser
+cache.
+
+The database is a temporary SQLite file unless PRODUCTION_DATABASE_URI is
+set. Results are printed as JSON.
+
+Example
+-------
+    python -m benchmarks.wire --messages 500
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+
+
+ASSET_URL = re.compile(r'(?:href|src)="(/(?:static|bootstrap)/[^"]+)"')
+
+
+def wire_size(response):
+    """Wire Size
+
+    Computes the bytes sent for a response, headers included.
+
+    Parameters
+    ----------
+    response : Response
+        Response of the test client.
+
+    Returns
+    -------
+    int
+        Size of the status line, headers and body.
+    """
+
+    headers = ''.join(f'{name}: {value}\r\n'
+                      for name, value in response.headers.items())
+
+    return len(f'HTTP/1.1 {response.status}\r\n{headers}\r\n') + \
+        len(response.data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--messages', type=int, default=500,
+                        help='messages in the Inbox page')
+    args = parser.parse_args()
+
+    database_file = os.path.join(tempfile.mkdtemp(), 'wire.db')
+    os.environ.setdefault('PRODUCTION_DATABASE_URI',
+                          'sqlite:///' + database_file)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+    os.environ['MESSAGES_PER_PAGE'] = str(args.messages)
+
+    from AOOPMessages import create_app, db
+    from AOOPMessages.compression import brotli
+    from benchmarks.seed import seed, SEED_PASSWORD
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        seed(db, 10, args.messages, receiver_id=1)
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'user1@example.com',
+                                'password': SEED_PASSWORD})
+
+    encodings = ['identity', 'gzip'] + (['br'] if brotli else [])
+    results = {}
+
+    for encoding in encodings:
+        headers = {'Accept-Encoding': encoding}
+        page = client.get('/messages', headers=headers)
+        assets = {url: client.get(url, headers=headers)
+                  for url in ASSET_URL.findall(
+                      client.get('/messages').get_data(as_text=True))}
+
+        revisit = client.get('/messages', headers={
+            **headers, 'If-None-Match': page.headers['ETag']})
+
+        results[encoding] = {
+            'inbox_bytes': wire_size(page),
+            'assets_bytes': sum(wire_size(response)
+                                for response in assets.values()),
+            'assets': len(assets),
+            'assets_cache_control': sorted({
+                response.headers.get('Cache-Control', '')
+                for response in assets.values()}),
+            'revisit_inbox_status': revisit.status_code,
+            'revisit_inbox_bytes': wire_size(revisit),
+            # Immutable assets are reused by browsers without a request.
+            'revisit_assets_bytes': sum(
+                wire_size(response) for response in assets.values()
+                if 'immutable' not in response.headers.get(
+                    'Cache-Control', '')),
+        }
+
+        for response in assets.values():
+            response.close()
+
+    print(json.dumps({
+        'benchmark': 'wire',
+        'messages': args.messages,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Alembic environment module.
+
+This module runs the AOOPMessages database migrations against the database
+of the app. Inside an app context the current app is used, otherwise an
+app is created with the configuration named by the FLASK_CONFIG
+environment variable.
+"""
+
+import os
+import sys
+from logging.config import fileConfig
+from alembic import context
+from flask import current_app
+from flask import has_app_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AOOPMessages import create_app, db  # noqa: E402
+from AOOPMessages.messages.search import is_search_table  # noqa: E402
+
+
+config = context.config
+
+if config.config_file_name is not None and not has_app_context():
+    fileConfig(config.config_file_name)
+
+target_metadata = db.metadata
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Skips the tables of the search index, which aren't mapped."""
+
+    return not (type_ == 'table' and is_search_table(name))
+
+
+def run_migrations_offline(app):
+    """Run migrations in 'offline' mode.
+
+    Emits the migration SQL to the script output instead of running it.
+    """
+
+    context.configure(
+        url=app.config['SQLALCHEMY_DATABASE_URI'],
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_object=include_object,
+        render_as_batch=True)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online(app):
+    """Run migrations in 'online' mode.
+
+    Runs the migrations on a connection to the database of the app.
+    """
+
+    with app.app_context():
+        with db.engine.connect() as connection:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                include_object=include_object,
+                render_as_batch=True)
+
+            with context.begin_transaction():
+                context.run_migrations()
+
+
+if has_app_context():
+    migrated_app = current_app._get_current_object()
+else:
+    migrated_app = create_app(os.environ.get('FLASK_CONFIG') or 'development')
+
+if context.is_offline_mode():
+    run_migrations_offline(migrated_app)
+else:
+    run_migrations_online(migrated_app)
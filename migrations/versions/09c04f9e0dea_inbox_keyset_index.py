@@ -0,0 +1,25 @@
+"""Inbox keyset index
+
+Revision ID: 09c04f9e0dea
+Revises: 8ffe42a8c07c
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '09c04f9e0dea'
+down_revision = '8ffe42a8c07c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_messages_receiver_id_timestamp_id', 'messages',
+                    ['receiver_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_messages_receiver_id_timestamp_id',
+                  table_name='messages')
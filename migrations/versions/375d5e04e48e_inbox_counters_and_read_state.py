@@ -0,0 +1,45 @@
+"""Inbox counters and read state
+
+Revision ID: 375d5e04e48e
+Revises: 09c04f9e0dea
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '375d5e04e48e'
+down_revision = '09c04f9e0dea'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('messages') as batch_op:
+        batch_op.add_column(sa.Column('read', sa.Boolean(), nullable=False,
+                                      server_default=sa.false()))
+    op.create_table(
+        'inbox_counters',
+        sa.Column('user_id', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('unread', sa.Integer(), nullable=False,
+                  server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute(
+        'INSERT INTO inbox_counters (user_id, total, unread) '
+        'SELECT users.id, COUNT(messages.id), COUNT(messages.id) '
+        'FROM users LEFT OUTER JOIN messages '
+        'ON messages.receiver_id = users.id '
+        'GROUP BY users.id'
+    )
+
+
+def downgrade():
+    op.drop_table('inbox_counters')
+    with op.batch_alter_table('messages') as batch_op:
+        batch_op.drop_column('read')
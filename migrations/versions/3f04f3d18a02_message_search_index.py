@@ -0,0 +1,62 @@
+"""Message search index
+
+Revision ID: 3f04f3d18a02
+Revises: 375d5e04e48e
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f04f3d18a02'
+down_revision = '375d5e04e48e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE messages_fts USING fts5("
+            "title, body, receiver_id, content='messages', "
+            "content_rowid='id')")
+        op.execute(
+            "CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages "
+            "BEGIN INSERT INTO messages_fts(rowid, title, body, receiver_id) "
+            "VALUES (new.id, new.title, new.body, new.receiver_id); END")
+        op.execute(
+            "CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages "
+            "BEGIN INSERT INTO messages_fts"
+            "(messages_fts, rowid, title, body, receiver_id) "
+            "VALUES ('delete', old.id, old.title, old.body, old.receiver_id); "
+            "END")
+        op.execute(
+            "CREATE TRIGGER messages_fts_update AFTER UPDATE "
+            "OF title, body, receiver_id ON messages BEGIN "
+            "INSERT INTO messages_fts"
+            "(messages_fts, rowid, title, body, receiver_id) "
+            "VALUES ('delete', old.id, old.title, old.body, old.receiver_id); "
+            "INSERT INTO messages_fts(rowid, title, body, receiver_id) "
+            "VALUES (new.id, new.title, new.body, new.receiver_id); END")
+        op.execute(
+            "INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_messages_search ON messages USING gin "
+            "(to_tsvector('simple', "
+            "coalesce(title, '') || ' ' || coalesce(body, '')))")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER messages_fts_update')
+        op.execute('DROP TRIGGER messages_fts_delete')
+        op.execute('DROP TRIGGER messages_fts_insert')
+        op.execute('DROP TABLE messages_fts')
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX ix_messages_search')
@@ -0,0 +1,30 @@
+"""Inbox version
+
+Revision ID: 5d2a8e6c71f3
+Revises: b7e1c92a40d5
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a8e6c71f3'
+down_revision = 'b7e1c92a40d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('inbox_counters', sa.Column('version', sa.Integer(),
+                                              nullable=False,
+                                              server_default='0'))
+    op.add_column('inbox_counters', sa.Column('modified_at', sa.DateTime(),
+                                              nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('inbox_counters') as batch_op:
+        batch_op.drop_column('modified_at')
+        batch_op.drop_column('version')
@@ -0,0 +1,52 @@
+"""Initial schema
+
+Schema previously created by db.create_all() at startup. Databases created
+that way are already at this revision and only need to be stamped:
+
+    alembic stamp 8ffe42a8c07c
+
+Revision ID: 8ffe42a8c07c
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8ffe42a8c07c'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=150), nullable=True),
+        sa.Column('password', sa.String(length=100), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email')
+    )
+    op.create_table(
+        'messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.Text(), nullable=True),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('author_id', sa.Integer(), nullable=True),
+        sa.Column('receiver_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['receiver_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_messages_timestamp'), 'messages',
+                    ['timestamp'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_messages_timestamp'), table_name='messages')
+    op.drop_table('messages')
+    op.drop_table('users')
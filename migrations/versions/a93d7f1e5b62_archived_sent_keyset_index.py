@@ -0,0 +1,26 @@
+"""Archived sent keyset index
+
+Revision ID: a93d7f1e5b62
+Revises: f2c6a8d41b97
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93d7f1e5b62'
+down_revision = 'f2c6a8d41b97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_archived_messages_author_id_timestamp_id',
+                    'archived_messages', ['author_id', 'timestamp', 'id'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_archived_messages_author_id_timestamp_id',
+                  table_name='archived_messages')
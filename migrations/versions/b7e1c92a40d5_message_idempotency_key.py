@@ -0,0 +1,30 @@
+"""Message idempotency key
+
+Revision ID: b7e1c92a40d5
+Revises: 3f04f3d18a02
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e1c92a40d5'
+down_revision = '3f04f3d18a02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ALTER TABLE statements, as a batch operation would recreate the
+    # messages table on SQLite and drop the triggers of the search index.
+    op.add_column('messages', sa.Column('idempotency_key',
+                                        sa.String(length=32), nullable=True))
+    op.create_index(op.f('ix_messages_idempotency_key'), 'messages',
+                    ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_messages_idempotency_key'), table_name='messages')
+    op.drop_column('messages', 'idempotency_key')
@@ -0,0 +1,25 @@
+"""Sent keyset index
+
+Revision ID: c4a9e2f7d813
+Revises: 5d2a8e6c71f3
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a9e2f7d813'
+down_revision = '5d2a8e6c71f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_messages_author_id_timestamp_id', 'messages',
+                    ['author_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_messages_author_id_timestamp_id',
+                  table_name='messages')
@@ -0,0 +1,69 @@
+"""Message threads
+
+Revision ID: e81b3d5a9c20
+Revises: c4a9e2f7d813
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81b3d5a9c20'
+down_revision = 'c4a9e2f7d813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ALTER TABLE, so the search triggers of messages are kept.
+    op.add_column('messages', sa.Column('thread_id', sa.BigInteger(),
+                                        nullable=True))
+    op.execute('UPDATE messages SET thread_id = id')
+    op.create_index('ix_messages_thread_id_timestamp_id', 'messages',
+                    ['thread_id', 'timestamp', 'id'], unique=False)
+
+    op.create_table(
+        'thread_summaries',
+        sa.Column('user_id', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.Column('thread_id', sa.BigInteger(), autoincrement=False,
+                  nullable=False),
+        sa.Column('other_user_id', sa.Integer(), nullable=True),
+        sa.Column('title', sa.Text(), nullable=True),
+        sa.Column('last_activity', sa.DateTime(), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=False,
+                  server_default='0'),
+        sa.Column('unread', sa.Integer(), nullable=False,
+                  server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['other_user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'thread_id')
+    )
+    op.create_index('ix_thread_summaries_user_id_last_activity_thread_id',
+                    'thread_summaries',
+                    ['user_id', 'last_activity', 'thread_id'], unique=False)
+
+    # Every message stored so far starts its own thread.
+    op.execute(
+        'INSERT INTO thread_summaries (user_id, thread_id, other_user_id, '
+        'title, last_activity, message_count, unread) '
+        'SELECT receiver_id, thread_id, author_id, title, timestamp, 1, '
+        'CASE WHEN read THEN 0 ELSE 1 END FROM messages'
+    )
+    op.execute(
+        'INSERT INTO thread_summaries (user_id, thread_id, other_user_id, '
+        'title, last_activity, message_count, unread) '
+        'SELECT author_id, thread_id, receiver_id, title, timestamp, 1, 0 '
+        'FROM messages WHERE author_id != receiver_id'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_thread_summaries_user_id_last_activity_thread_id',
+                  table_name='thread_summaries')
+    op.drop_table('thread_summaries')
+    op.drop_index('ix_messages_thread_id_timestamp_id',
+                  table_name='messages')
+    op.drop_column('messages', 'thread_id')
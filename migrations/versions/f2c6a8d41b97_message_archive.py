@@ -0,0 +1,47 @@
+"""Message archive
+
+Revision ID: f2c6a8d41b97
+Revises: e81b3d5a9c20
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a8d41b97'
+down_revision = 'e81b3d5a9c20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Partitioned by month on PostgreSQL. The partitions are created by
+    # `flask messages archive` before moving messages into them.
+    op.create_table(
+        'archived_messages',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=True),
+        sa.Column('receiver_id', sa.Integer(), nullable=True),
+        sa.Column('title', sa.Text(), nullable=True),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('read', sa.Boolean(), nullable=False,
+                  server_default=sa.true()),
+        sa.Column('thread_id', sa.BigInteger(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['receiver_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id', 'timestamp'),
+        postgresql_partition_by='RANGE (timestamp)'
+    )
+    op.create_index('ix_archived_messages_receiver_id_timestamp_id',
+                    'archived_messages',
+                    ['receiver_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_archived_messages_receiver_id_timestamp_id',
+                  table_name='archived_messages')
+    op.drop_table('archived_messages')
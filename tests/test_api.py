@@ -0,0 +1,259 @@
+"""Test API module.
+
+This module contains the unit tests for the API module.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from werkzeug.security import generate_password_hash
+from AOOPMessages import create_app, db
+from AOOPMessages.api.tokens import generate_token
+from AOOPMessages.models import Message, User
+
+
+TOKENS_ENDPOINT = '/api/v1/tokens'
+MESSAGES_ENDPOINT = '/api/v1/messages'
+BULK_ENDPOINT = '/api/v1/messages/bulk'
+SENT_ENDPOINT = '/api/v1/messages/sent'
+
+
+class APITests(unittest.TestCase):
+    """API tests class.
+
+    Class defining the unit tests for the API module.
+    """
+
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.test_client = self.app.test_client()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.configure(expire_on_commit=False)
+            self.testUser = User(email='test',
+                                 password=generate_password_hash('test'))
+            self.testUser2 = User(email='test2',
+                                  password=generate_password_hash('test'))
+            db.session.add_all([self.testUser, self.testUser2])
+            db.session.commit()
+
+            now = datetime.utcnow()
+            db.session.add_all([Message(
+                title=f'title {index}', body=f'body {index}',
+                timestamp=now - timedelta(minutes=index),
+                author_id=self.testUser2.id,
+                receiver_id=self.testUser.id) for index in range(5)])
+            db.session.commit()
+
+    def headers(self, user=None):
+        with self.app.app_context():
+            token = generate_token((user or self.testUser).id)
+        return {'Authorization': f'Bearer {token}'}
+
+    def test_token(self):
+        response = self.test_client.post(TOKENS_ENDPOINT, json={
+            'email': 'test', 'password': 'test'})
+        self.assertEqual(response.status_code, 201)
+        token = response.get_json()['token']
+        self.assertEqual(response.get_json()['expires_in'], 86400)
+
+        response = self.test_client.get(MESSAGES_ENDPOINT, headers={
+            'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.test_client.post(TOKENS_ENDPOINT, json={
+            'email': 'test', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+
+        for data in ({'email': ['test'], 'password': 'test'},
+                     {'email': {'test': 1}}, ['test'], 'test'):
+            response = self.test_client.post(TOKENS_ENDPOINT, json=data)
+            self.assertEqual(response.status_code, 401)
+
+    def test_token_required(self):
+        response = self.test_client.get(MESSAGES_ENDPOINT)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.headers['WWW-Authenticate'], 'Bearer')
+        self.assertIn('error', response.get_json())
+
+        response = self.test_client.get(MESSAGES_ENDPOINT, headers={
+            'Authorization': 'Bearer forged'})
+        self.assertEqual(response.status_code, 401)
+
+        with patch.dict(self.app.config, {'API_TOKEN_MAX_AGE': -1}):
+            response = self.test_client.get(MESSAGES_ENDPOINT,
+                                            headers=self.headers())
+        self.assertEqual(response.status_code, 401)
+
+    def test_token_revoked(self):
+        headers = self.headers()
+        self.assertEqual(self.test_client.get(
+            MESSAGES_ENDPOINT, headers=headers).status_code, 200)
+
+        with self.app.app_context():
+            user = User.query.get(self.testUser.id)
+            user.password = generate_password_hash('changed')
+            db.session.commit()
+
+        self.assertEqual(self.test_client.get(
+            MESSAGES_ENDPOINT, headers=headers).status_code, 401)
+        self.assertEqual(self.test_client.get(
+            MESSAGES_ENDPOINT, headers=self.headers()).status_code, 200)
+
+    def test_list_messages(self):
+        response = self.test_client.get(MESSAGES_ENDPOINT + '?limit=2',
+                                        headers=self.headers())
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b' ', response.data.split(b'"title"')[0])
+        self.assertIn('Authorization', response.headers['Vary'])
+        page = response.get_json()
+
+        self.assertEqual([message['title'] for message in page['messages']],
+                         ['title 0', 'title 1'])
+        self.assertEqual(page['messages'][0]['author_email'], 'test2')
+        self.assertFalse(page['messages'][0]['read'])
+        self.assertIsNone(page['previous'])
+
+        response = self.test_client.get(
+            MESSAGES_ENDPOINT + '?limit=2&before=' + page['next'],
+            headers=self.headers())
+        self.assertEqual([message['title']
+                          for message in response.get_json()['messages']],
+                         ['title 2', 'title 3'])
+
+        response = self.test_client.get(
+            MESSAGES_ENDPOINT + '?limit=2',
+            headers={**self.headers(),
+                     'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+
+        first = self.test_client.get(MESSAGES_ENDPOINT + '?limit=2',
+                                     headers=self.headers())
+        response = self.test_client.get(
+            MESSAGES_ENDPOINT + '?limit=2',
+            headers={**self.headers(),
+                     'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.test_client.get(MESSAGES_ENDPOINT + '?before=bad',
+                                        headers=self.headers())
+        self.assertEqual(response.status_code, 400)
+
+        response = self.test_client.get(MESSAGES_ENDPOINT,
+                                        headers=self.headers(self.testUser2))
+        self.assertEqual(response.get_json()['messages'], [])
+
+    def test_list_sent_messages(self):
+        response = self.test_client.get(SENT_ENDPOINT + '?limit=3',
+                                        headers=self.headers(self.testUser2))
+        self.assertEqual(response.status_code, 200)
+        page = response.get_json()
+
+        self.assertEqual([message['title'] for message in page['messages']],
+                         ['title 0', 'title 1', 'title 2'])
+        self.assertEqual(page['messages'][0]['receiver_email'], 'test')
+
+        response = self.test_client.get(
+            SENT_ENDPOINT + '?limit=3&before=' + page['next'],
+            headers=self.headers(self.testUser2))
+        self.assertEqual([message['title']
+                          for message in response.get_json()['messages']],
+                         ['title 3', 'title 4'])
+        self.assertIsNone(response.get_json()['next'])
+
+        response = self.test_client.get(SENT_ENDPOINT,
+                                        headers=self.headers())
+        self.assertEqual(response.get_json()['messages'], [])
+
+    def test_get_message(self):
+        with self.app.app_context():
+            message_id = Message.query.first().id
+
+        response = self.test_client.get(f'{MESSAGES_ENDPOINT}/{message_id}',
+                                        headers=self.headers())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['id'], message_id)
+
+        response = self.test_client.get(f'{MESSAGES_ENDPOINT}/{message_id}',
+                                        headers=self.headers(self.testUser2))
+        self.assertEqual(response.status_code, 200)
+
+        with self.app.app_context():
+            stranger = User(email='stranger', password='test')
+            db.session.add(stranger)
+            db.session.commit()
+
+        response = self.test_client.get(f'{MESSAGES_ENDPOINT}/{message_id}',
+                                        headers=self.headers(stranger))
+        self.assertEqual(response.status_code, 404)
+
+    def test_send(self):
+        response = self.test_client.post(MESSAGES_ENDPOINT, json={
+            'to': self.testUser2.id, 'title': 'api title',
+            'body': 'api body'}, headers={**self.headers(),
+                                          'Idempotency-Key': 'once'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json(), {'sent': 1})
+
+        response = self.test_client.post(MESSAGES_ENDPOINT, json={
+            'to': self.testUser2.id, 'title': 'api title',
+            'body': 'api body'}, headers={**self.headers(),
+                                          'Idempotency-Key': 'once'})
+        self.assertEqual(response.status_code, 201)
+
+        with self.app.app_context():
+            self.assertEqual(Message.query.filter_by(
+                title='api title').count(), 1)
+
+        response = self.test_client.post(MESSAGES_ENDPOINT, json={
+            'to': 999, 'title': 'api title', 'body': 'api body'},
+            headers=self.headers())
+        self.assertEqual(response.status_code, 400)
+
+        response = self.test_client.post(MESSAGES_ENDPOINT, json={
+            'to': self.testUser2.id, 'title': ['not a string']},
+            headers=self.headers())
+        self.assertEqual(response.status_code, 400)
+
+    def test_send_invalid_to(self):
+        for to in (1.5, True, '1.5', ' 1', '+1', -1, None, [1]):
+            response = self.test_client.post(MESSAGES_ENDPOINT, json={
+                'to': to, 'title': 'api title', 'body': 'api body'},
+                headers=self.headers())
+            self.assertEqual(response.status_code, 400, to)
+            self.assertEqual(response.get_json(),
+                             {'error': 'The user id is not valid'})
+
+        response = self.test_client.post(MESSAGES_ENDPOINT, json={
+            'to': str(self.testUser2.id), 'title': 'api title',
+            'body': 'api body'}, headers=self.headers())
+        self.assertEqual(response.status_code, 201)
+
+        for to in (1.5, True):
+            response = self.test_client.post(BULK_ENDPOINT, json={
+                'to': [self.testUser2.id, to], 'title': 'bulk title',
+                'body': 'bulk body'}, headers=self.headers())
+            self.assertEqual(response.status_code, 400, to)
+
+        with self.app.app_context():
+            self.assertEqual(Message.query.filter_by(
+                title='bulk title').count(), 0)
+
+    def test_bulk_send(self):
+        response = self.test_client.post(BULK_ENDPOINT, json={
+            'to': [self.testUser.id, self.testUser2.id, 999],
+            'title': 'bulk title', 'body': 'bulk body'},
+            headers=self.headers())
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['sent'], 2)
+        self.assertEqual(response.get_json()['failed'][0]['to'], '999')
+
+        response = self.test_client.post(BULK_ENDPOINT, json={
+            'to': [], 'title': 'bulk title', 'body': 'bulk body'},
+            headers=self.headers())
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
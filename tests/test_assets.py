@@ -0,0 +1,81 @@
+"""Test Assets module.
+
+This module contains the unit tests for the Assets module.
+"""
+
+import re
+import unittest
+from unittest.mock import patch
+from flask import url_for
+from AOOPMessages import create_app
+from AOOPMessages.config import config
+
+
+FINGERPRINTED_URL = re.compile(r'^/static/js/unread\.[0-9a-f]{12}\.js$')
+
+
+class AssetsTests(unittest.TestCase):
+    """Assets tests class.
+
+    Class defining the unit tests for the Assets module.
+    """
+
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.test_client = self.app.test_client()
+
+    def test_fingerprinted_url(self):
+        with self.app.test_request_context():
+            url = url_for('static', filename='js/unread.js')
+            self.assertRegex(url, FINGERPRINTED_URL)
+            self.assertEqual(url_for('static', filename='missing.js'),
+                             '/static/missing.js')
+
+        response = self.test_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'unreadCount', response.data)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertIn('max-age=31536000', response.headers['Cache-Control'])
+        response.close()
+
+    def test_stale_and_plain_urls(self):
+        response = self.test_client.get('/static/js/unread.000000000000.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable',
+                         response.headers.get('Cache-Control', ''))
+        response.close()
+
+        response = self.test_client.get('/static/js/unread.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable',
+                         response.headers.get('Cache-Control', ''))
+        response.close()
+
+        response = self.test_client.get('/static/missing.000000000000.js')
+        self.assertEqual(response.status_code, 404)
+
+    def test_bootstrap_served_locally(self):
+        response = self.test_client.get('/login')
+
+        self.assertNotIn('bootstrapcdn.com', str(response.data))
+        self.assertNotIn('cdnjs.cloudflare.com', str(response.data))
+
+        stylesheet = re.search(r'href="(/bootstrap/static/css/[^"]+)"',
+                               response.get_data(as_text=True)).group(1)
+        response = self.test_client.get(stylesheet)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        response.close()
+
+    def test_disabled(self):
+        with patch.object(config['testing'], 'STATIC_ASSETS_FINGERPRINT',
+                          False):
+            app = create_app(config_name='testing')
+
+        with app.test_request_context():
+            self.assertEqual(url_for('static', filename='js/unread.js'),
+                             '/static/js/unread.js')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,10 +3,14 @@
 This module contains the unit tests for the Auth module.
 """
 
+import os
+import signal
 import unittest
 from unittest.mock import patch
 from AOOPMessages import create_app, db
-from AOOPMessages.models import User
+from AOOPMessages.models import User, load_user, user_cache
+from AOOPMessages.auth.hashing import password_hasher
+from AOOPMessages.auth.hashing import HashingPoolSaturatedError
 from werkzeug.security import generate_password_hash
 
 
@@ -167,6 +171,86 @@ class AuthTests(unittest.TestCase):
         self.assertIn('Password is required',
                       str(response.data))
 
+    def test_load_user_cache(self):
+        self.create_test_user()
+
+        with self.app.app_context():
+            user = load_user(str(self.testUser.id))
+            self.assertEqual(user.id, self.testUser.id)
+            self.assertEqual(user.email, self.testUser.email)
+            self.assertTrue(user.is_authenticated)
+
+            self.assertIs(load_user(self.testUser.id), user)
+            self.assertEqual(user_cache.hits, 1)
+            self.assertEqual(user_cache.misses, 1)
+
+            db_user = User.query.get(self.testUser.id)
+            db_user.email = 'changed'
+            db.session.commit()
+
+            self.assertEqual(load_user(self.testUser.id).email, 'changed')
+            self.assertEqual(user_cache.misses, 2)
+
+            self.assertIsNone(load_user(100))
+
+    def test_password_hasher(self):
+        pwhash = password_hasher.generate(self.testUserPassword)
+        self.assertTrue(pwhash.startswith('pbkdf2:sha256:1000$'))
+        self.assertTrue(password_hasher.check(pwhash, self.testUserPassword))
+        self.assertFalse(password_hasher.check(pwhash, 'wrongPassword'))
+
+        self.app.config['PASSWORD_HASH_WORKERS'] = 1
+        self.app.config['PASSWORD_HASH_QUEUE_SIZE'] = 0
+        password_hasher.init_app(self.app)
+        try:
+            self.assertTrue(
+                password_hasher.check(pwhash, self.testUserPassword))
+
+            password_hasher._slots.acquire()
+            self.assertRaises(HashingPoolSaturatedError,
+                              password_hasher.check,
+                              pwhash, self.testUserPassword)
+        finally:
+            password_hasher.shutdown()
+
+    def test_password_hasher_worker_killed(self):
+        pwhash = password_hasher.generate(self.testUserPassword)
+
+        self.app.config['PASSWORD_HASH_WORKERS'] = 1
+        password_hasher.init_app(self.app)
+        try:
+            self.assertTrue(
+                password_hasher.check(pwhash, self.testUserPassword))
+
+            for process in list(password_hasher._executor._processes.values()):
+                os.kill(process.pid, signal.SIGKILL)
+                process.join()
+
+            self.assertTrue(
+                password_hasher.check(pwhash, self.testUserPassword))
+            self.assertTrue(password_hasher.generate(self.testUserPassword))
+        finally:
+            password_hasher.shutdown()
+
+    @patch('AOOPMessages.auth.hashing.password_hasher.check')
+    @patch('AOOPMessages.auth.hashing.password_hasher.generate')
+    def test_hashing_pool_saturated(self, generate, check):
+        generate.side_effect = HashingPoolSaturatedError()
+        check.side_effect = HashingPoolSaturatedError()
+
+        self.create_test_user()
+
+        response = self.test_client.post(
+            LOGIN_ENDPOINT, data=dict(email=self.testUser.email,
+                                      password=self.testUserPassword))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+        response = self.test_client.post(
+            SIGNUP_ENDPOINT, data=dict(email='new@test.com',
+                                       password=self.testUserPassword))
+        self.assertEqual(response.status_code, 503)
+
     @patch('flask_login.utils._get_user')
     def test_login_get_logged_in(self, current_user):
         current_user.return_value = self.testUser
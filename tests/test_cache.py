@@ -0,0 +1,85 @@
+"""Test Cache module.
+
+This module contains the unit tests for the Cache module.
+"""
+
+import unittest
+from unittest.mock import patch
+from AOOPMessages.cache import LRUCache, SizedLRUCache
+
+
+class CacheTests(unittest.TestCase):
+    """Cache tests class.
+
+    Class defining the unit tests for the Cache module.
+    """
+
+    def test_get_set(self):
+        cache = LRUCache(max_size=2)
+
+        self.assertIsNone(cache.get('missing'))
+        self.assertEqual(cache.get('missing', 'default'), 'default')
+
+        cache.set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+
+        cache.delete('key')
+        self.assertIsNone(cache.get('key'))
+
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 3, 'size': 0})
+
+    def test_eviction(self):
+        cache = LRUCache(max_size=2)
+
+        cache.set('first', 1)
+        cache.set('second', 2)
+        cache.get('first')
+        cache.set('third', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('first'), 1)
+        self.assertIsNone(cache.get('second'))
+        self.assertEqual(cache.get('third'), 3)
+
+    @patch('AOOPMessages.cache.time.monotonic')
+    def test_expiration(self, monotonic):
+        cache = LRUCache(max_size=2, ttl=10)
+
+        monotonic.return_value = 100
+        cache.set('key', 'value')
+
+        monotonic.return_value = 105
+        self.assertEqual(cache.get('key'), 'value')
+
+        monotonic.return_value = 111
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(len(cache), 0)
+
+    def test_sized_eviction(self):
+        cache = SizedLRUCache(max_size=10, max_bytes=10, sizeof=len)
+
+        cache.set('first', 'aaaa')
+        cache.set('second', 'bbbb')
+        self.assertEqual(cache.stats()['bytes'], 8)
+
+        cache.set('first', 'aaa')
+        self.assertEqual(cache.stats()['bytes'], 7)
+
+        cache.set('third', 'cccc')
+        self.assertIsNone(cache.get('second'))
+        self.assertEqual(cache.get('first'), 'aaa')
+        self.assertEqual(cache.stats()['bytes'], 7)
+
+        cache.set('large', 'x' * 11)
+        self.assertIsNone(cache.get('large'))
+
+        cache.delete('first')
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 2, 'size': 1,
+                                         'bytes': 4})
+
+        cache.clear()
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Test Compression module.
+
+This module contains the unit tests for the Compression module.
+"""
+
+import gzip
+import unittest
+from unittest.mock import patch, Mock
+from AOOPMessages import create_app, db
+from AOOPMessages.models import User
+
+
+INBOX_ENDPOINT = '/messages'
+LOGIN_ENDPOINT = '/login'
+
+
+class CompressionTests(unittest.TestCase):
+    """Compression tests class.
+
+    Class defining the unit tests for the Compression module.
+    """
+
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.test_client = self.app.test_client()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.configure(expire_on_commit=False)
+            self.testUser = User(email='test', password='test')
+            db.session.add(self.testUser)
+            db.session.commit()
+
+    def test_gzip(self):
+        plain = self.test_client.get(LOGIN_ENDPOINT)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        response = self.test_client.get(
+            LOGIN_ENDPOINT, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertEqual(int(response.headers['Content-Length']),
+                         len(response.data))
+
+    def test_min_size(self):
+        self.app.config['COMPRESS_MIN_SIZE'] = 1 << 20
+
+        response = self.test_client.get(
+            LOGIN_ENDPOINT, headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    @patch('AOOPMessages.compression.brotli')
+    def test_brotli(self, brotli):
+        brotli.compress = Mock(return_value=b'brotli')
+
+        response = self.test_client.get(
+            LOGIN_ENDPOINT, headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(response.data, b'brotli')
+
+    @patch('flask_login.utils._get_user')
+    def test_inbox_etag(self, current_user):
+        current_user.return_value = self.testUser
+        self.app.config['COMPRESS_MIN_SIZE'] = 0
+
+        response = self.test_client.get(
+            INBOX_ENDPOINT, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        etag = response.headers['ETag']
+        self.assertTrue(etag.endswith('-gzip"'))
+
+        response = self.test_client.get(
+            INBOX_ENDPOINT, headers={'Accept-Encoding': 'gzip',
+                                     'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+    @patch('flask_login.utils._get_user')
+    def test_stream_not_compressed(self, current_user):
+        current_user.return_value = self.testUser
+        self.app.config['COMPRESS_MIN_SIZE'] = 0
+        self.app.config['MESSAGE_STREAM_MAX_DURATION'] = 0
+
+        response = self.test_client.get(
+            '/messages/stream', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_static_file(self):
+        url = '/bootstrap/static/css/bootstrap.min.css'
+
+        response = self.test_client.get(
+            url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        data = gzip.decompress(response.data)
+        self.assertEqual(data, self.test_client.get(url).data)
+
+        cached = self.test_client.get(
+            url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(cached.data, response.data)
+
+        response = self.test_client.get(
+            url, headers={'Accept-Encoding': 'gzip',
+                          'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Test Events module.
+
+This module contains the unit tests for the message hub.
+"""
+
+import unittest
+from AOOPMessages.messages.events import InMemoryBackend, MessageHub
+from AOOPMessages.messages.events import StreamLimitError
+
+
+class EventsTests(unittest.TestCase):
+    """Events tests class.
+
+    Class defining the unit tests for the message hub.
+    """
+
+    def setUp(self):
+        self.hub = MessageHub()
+        self.hub.backend = InMemoryBackend(queue_size=1)
+
+    def test_publish_subscribe(self):
+        subscription = self.hub.subscribe(1)
+        other_subscription = self.hub.subscribe(2)
+
+        self.hub.publish(1, {'title': 'first'})
+
+        self.assertEqual(subscription.get(timeout=0), {'title': 'first'})
+        self.assertIsNone(other_subscription.get(timeout=0))
+
+    def test_full_queue_drops_events(self):
+        subscription = self.hub.subscribe(1)
+
+        self.hub.publish(1, {'title': 'first'})
+        self.hub.publish(1, {'title': 'second'})
+
+        self.assertEqual(subscription.get(timeout=0), {'title': 'first'})
+        self.assertIsNone(subscription.get(timeout=0))
+
+    def test_close(self):
+        subscription = self.hub.subscribe(1)
+        self.assertEqual(self.hub.backend.subscriber_count('inbox:1'), 1)
+
+        subscription.close()
+        self.assertEqual(self.hub.backend.subscriber_count('inbox:1'), 0)
+
+        self.hub.publish(1, {'title': 'first'})
+        self.assertIsNone(subscription.get(timeout=0))
+
+    def test_stream_limits(self):
+        self.hub.max_streams = 2
+        self.hub.max_streams_per_user = 1
+
+        subscription = self.hub.subscribe(1)
+        self.assertRaises(StreamLimitError, self.hub.subscribe, 1)
+
+        other_subscription = self.hub.subscribe(2)
+        self.assertRaises(StreamLimitError, self.hub.subscribe, 3)
+        self.assertEqual(self.hub.stream_count(), 2)
+
+        subscription.close()
+        subscription.close()
+        self.assertEqual(self.hub.stream_count(), 1)
+
+        self.hub.subscribe(3)
+        other_subscription.close()
+        self.assertEqual(self.hub.stream_count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+"""Test Export module.
+
+This module contains the unit tests for the Export module.
+"""
+
+import csv
+import gzip
+import io
+import json
+import mailbox
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from AOOPMessages import create_app, db
+from AOOPMessages.api.tokens import generate_token
+from AOOPMessages.models import ArchivedMessage, Message, User
+from AOOPMessages.messages import export
+from AOOPMessages.messages.messages import export_command
+
+
+EXPORT_ENDPOINT = '/messages/export'
+API_EXPORT_ENDPOINT = '/api/v1/messages/export'
+
+
+class ExportTests(unittest.TestCase):
+    """Export tests class.
+
+    Class defining the unit tests for the Export module.
+    """
+
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.test_client = self.app.test_client()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.configure(expire_on_commit=False)
+            self.testUser = User(email='test',
+                                 password=generate_password_hash('test'))
+            self.testUser2 = User(email='test2',
+                                  password=generate_password_hash('test'))
+            db.session.add_all([self.testUser, self.testUser2])
+            db.session.commit()
+
+            now = datetime.utcnow()
+            db.session.add(ArchivedMessage(
+                id=100, title='archived title', body='archived body',
+                timestamp=now - timedelta(days=400), read=True,
+                author_id=self.testUser2.id, receiver_id=self.testUser.id,
+                archived_at=now))
+            db.session.add_all([Message(
+                title=f'title {index}',
+                body=f'body {index}\nFrom the export, with "quotes", too',
+                timestamp=now - timedelta(minutes=index),
+                author_id=self.testUser2.id,
+                receiver_id=self.testUser.id) for index in range(3)])
+            db.session.add(Message(
+                title='other title', body='other body', timestamp=now,
+                author_id=self.testUser.id, receiver_id=self.testUser2.id))
+            db.session.commit()
+
+    @patch('flask_login.utils._get_user')
+    def test_export_jsonl(self, current_user):
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(EXPORT_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertIn('attachment; filename="inbox-',
+                      response.headers['Content-Disposition'])
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        records = [json.loads(line)
+                   for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([record['title'] for record in records],
+                         ['archived title', 'title 2', 'title 1', 'title 0'])
+        self.assertEqual(records[0]['author_email'], 'test2')
+        self.assertTrue(records[0]['read'])
+        self.assertFalse(records[1]['read'])
+
+    @patch('flask_login.utils._get_user')
+    def test_export_csv_gzip(self, current_user):
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(EXPORT_ENDPOINT,
+                                        query_string={'format': 'csv',
+                                                      'gzip': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/gzip')
+        self.assertTrue(response.headers['Content-Disposition']
+                        .endswith('.csv.gz"'))
+
+        rows = list(csv.reader(io.StringIO(
+            gzip.decompress(response.data).decode())))
+        self.assertEqual(rows[0], list(export.FIELDS))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[-1][2], 'title 0')
+        self.assertEqual(rows[-1][3],
+                         'body 0\nFrom the export, with "quotes", too')
+
+    @patch('flask_login.utils._get_user')
+    def test_export_mbox(self, current_user):
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(EXPORT_ENDPOINT + '?format=mbox')
+        self.assertEqual(response.status_code, 200)
+
+        path = os.path.join(tempfile.mkdtemp(), 'inbox.mbox')
+        with open(path, 'wb') as file:
+            file.write(response.data)
+
+        messages = list(mailbox.mbox(path))
+        self.assertEqual([message['Subject'] for message in messages],
+                         ['archived title', 'title 2', 'title 1', 'title 0'])
+        self.assertEqual(messages[1]['From'], 'test2')
+        self.assertIn('>From the export', messages[1].get_payload())
+
+    @patch('flask_login.utils._get_user')
+    def test_export_streams_chunks(self, current_user):
+        current_user.return_value = self.testUser
+
+        with patch.object(export, 'CHUNK_SIZE', 1):
+            response = self.test_client.get(EXPORT_ENDPOINT)
+            chunks = list(response.response)
+
+        self.assertEqual(len(chunks), 4)
+
+    def test_export_single_statement(self):
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                records = list(export.export_rows(self.testUser.id, 2))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute',
+                             count_statement)
+
+        self.assertEqual([record.title for record in records],
+                         ['archived title', 'title 2', 'title 1', 'title 0'])
+        # Both tables are read in one snapshot, so an archive batch can't
+        # move messages between them while they are exported.
+        self.assertEqual(len(statements), 1)
+        self.assertIn('UNION ALL', statements[0])
+
+    @patch('flask_login.utils._get_user')
+    def test_export_bad_format(self, current_user):
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(EXPORT_ENDPOINT + '?format=pst')
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_not_logged_in(self):
+        response = self.test_client.get(EXPORT_ENDPOINT)
+        self.assertEqual(response.status_code, 302)
+
+    def test_api_export(self):
+        with self.app.app_context():
+            token = generate_token(self.testUser2.id)
+
+        response = self.test_client.get(API_EXPORT_ENDPOINT, headers={
+            'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([json.loads(line)['title'] for line in
+                          response.get_data(as_text=True).splitlines()],
+                         ['other title'])
+
+        response = self.test_client.get(API_EXPORT_ENDPOINT)
+        self.assertEqual(response.status_code, 401)
+
+    def test_export_command(self):
+        path = os.path.join(tempfile.mkdtemp(), 'inbox.jsonl.gz')
+
+        result = self.app.test_cli_runner().invoke(
+            export_command, ['test', '--gzip', '--output', path])
+        self.assertEqual(result.exit_code, 0)
+
+        with gzip.open(path, 'rt') as file:
+            self.assertEqual(len(file.readlines()), 4)
+
+        result = self.app.test_cli_runner().invoke(
+            export_command, ['nobody'])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('There is no user with email nobody', result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,239 @@
+"""Test Ingestion module.
+
+This module contains the unit tests for the write-behind message queue.
+"""
+
+import os
+import time
+import unittest
+from tempfile import gettempdir
+from unittest.mock import patch
+from sqlalchemy.exc import SQLAlchemyError
+from AOOPMessages import create_app, db
+from AOOPMessages.models import User, Message, InboxCounter
+from AOOPMessages.messages import sending
+from AOOPMessages.messages.ingestion import message_queue
+from AOOPMessages.messages.messages import drain_queue_command
+
+
+QUEUE_PATH = os.path.join(gettempdir(), 'test-ingestion-queue.db')
+SEND_MESSAGE_ENDPOINT = '/messages/send'
+BULK_SEND_ENDPOINT = '/messages/send/bulk'
+
+
+class IngestionTests(unittest.TestCase):
+    """Ingestion tests class.
+
+    Class defining the unit tests for the write-behind message queue.
+    """
+
+    def setUp(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(QUEUE_PATH + suffix):
+                os.remove(QUEUE_PATH + suffix)
+
+        app = create_app(config_name='testing')
+        app.config['MESSAGES_WRITE_BEHIND'] = True
+        app.config['MESSAGE_QUEUE_PATH'] = QUEUE_PATH
+        app.config['MESSAGE_QUEUE_POLL_INTERVAL'] = 0.01
+        self.app = app
+        self.test_client = app.test_client()
+
+        self.start = patch.object(message_queue, 'start')
+        self.start.start()
+        message_queue.init_app(app)
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.configure(expire_on_commit=False)
+
+            self.testUser = User(email='test', password='test')
+            self.testUser2 = User(email='test2', password='test')
+            db.session.add(self.testUser)
+            db.session.add(self.testUser2)
+            db.session.commit()
+
+    def tearDown(self):
+        self.start.stop()
+        message_queue.stop()
+
+    def build_rows(self, title, idempotency_key=None):
+        return sending.build_rows(self.testUser.id, [self.testUser2.id],
+                                  title, 'queued body', idempotency_key)
+
+    def stored(self, title):
+        with self.app.app_context():
+            return Message.query.filter_by(title=title).count()
+
+    @patch('flask_login.utils._get_user')
+    def test_send_post_is_queued(self, current_user):
+        current_user.return_value = self.testUser
+
+        response = self.test_client.post(
+            SEND_MESSAGE_ENDPOINT,
+            data=dict(title='queued title', body='queued body',
+                      to=self.testUser2.id))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(message_queue.pending(), 1)
+        self.assertEqual(self.stored('queued title'), 0)
+
+        with self.app.app_context():
+            self.assertTrue(message_queue.drain())
+            self.assertEqual(
+                InboxCounter.query.get(self.testUser2.id).total, 1)
+
+        self.assertEqual(message_queue.pending(), 0)
+        self.assertEqual(self.stored('queued title'), 1)
+
+    @patch('flask_login.utils._get_user')
+    def test_send_bulk_post_is_queued(self, current_user):
+        current_user.return_value = self.testUser
+
+        response = self.test_client.post(
+            BULK_SEND_ENDPOINT,
+            data=dict(title='queued bulk', body='queued body',
+                      to=f'{self.testUser.id},{self.testUser2.id},100'))
+        self.assertEqual(response.get_json(), {
+            'sent': 2,
+            'failed': [{'to': '100', 'error': "The user doesn't exist"}]
+        })
+        self.assertEqual(message_queue.pending(), 2)
+
+        result = self.app.test_cli_runner().invoke(drain_queue_command)
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('empty', result.output)
+        self.assertEqual(self.stored('queued bulk'), 2)
+
+    @patch('flask_login.utils._get_user')
+    def test_idempotency_key(self, current_user):
+        current_user.return_value = self.testUser
+
+        for _ in range(2):
+            self.test_client.post(
+                SEND_MESSAGE_ENDPOINT,
+                headers={'Idempotency-Key': 'retried'},
+                data=dict(title='retried title', body='queued body',
+                          to=self.testUser2.id))
+        self.assertEqual(message_queue.pending(), 1)
+
+        with self.app.app_context():
+            message_queue.drain()
+
+        self.test_client.post(
+            SEND_MESSAGE_ENDPOINT,
+            data=dict(title='retried title', body='queued body',
+                      to=self.testUser2.id, idempotency_key='retried'))
+
+        with self.app.app_context():
+            message_queue.drain()
+
+        self.assertEqual(self.stored('retried title'), 1)
+
+    def test_redelivery_is_stored_once(self):
+        rows = self.build_rows('redelivered title')
+        message_queue.enqueue(rows)
+
+        message_queue.lease = 0
+
+        with self.app.app_context():
+            with patch.object(message_queue, '_acknowledge',
+                              side_effect=OSError('crashed')):
+                with self.assertRaises(OSError):
+                    message_queue.process_batch()
+
+            self.assertEqual(self.stored('redelivered title'), 1)
+            self.assertEqual(message_queue.pending(), 1)
+
+            self.assertTrue(message_queue.drain())
+
+        self.assertEqual(self.stored('redelivered title'), 1)
+
+    def test_concurrently_stored_key_is_skipped(self):
+        rows = sending.build_rows(
+            self.testUser.id, [self.testUser2.id, self.testUser.id],
+            'raced title', 'queued body', 'raced')
+
+        with self.app.app_context():
+            db.session.execute(Message.__table__.insert(), rows[:1])
+            db.session.commit()
+
+            with patch('AOOPMessages.messages.sending.message_hub') as hub:
+                self.assertEqual(sending.deliver(rows), rows[1:])
+                self.assertEqual(sending.deliver(rows), [])
+            hub.publish.assert_called_once()
+
+            self.assertEqual(
+                InboxCounter.query.get(self.testUser2.id).total, 0)
+            self.assertEqual(
+                InboxCounter.query.get(self.testUser.id).total, 1)
+
+        self.assertEqual(self.stored('raced title'), 2)
+
+    def test_failing_row_is_dead_lettered(self):
+        deliver = sending.deliver
+
+        def fail_poison(rows):
+            if any(row['title'] == 'poison title' for row in rows):
+                raise SQLAlchemyError()
+            return deliver(rows)
+
+        message_queue.max_attempts = 2
+        message_queue.enqueue(self.build_rows('poison title'))
+        message_queue.enqueue(self.build_rows('good title'))
+
+        with self.app.app_context():
+            with patch('AOOPMessages.messages.sending.deliver',
+                       side_effect=fail_poison):
+                message_queue.process_batch()
+                self.assertEqual(message_queue.pending(), 2)
+                self.assertEqual(message_queue.dead_letters(), 0)
+
+                with patch('AOOPMessages.messages.ingestion.time.time',
+                           return_value=time.time() + 60), \
+                        self.assertLogs('AOOPMessages.messages.ingestion',
+                                        'ERROR'):
+                    self.assertEqual(message_queue.process_batch(), 2)
+
+        self.assertEqual(message_queue.pending(), 0)
+        self.assertEqual(message_queue.dead_letters(), 1)
+        self.assertEqual(self.stored('good title'), 1)
+        self.assertEqual(self.stored('poison title'), 0)
+
+    def test_failed_batch_is_retried(self):
+        message_queue.enqueue(self.build_rows('failed title'))
+
+        with self.app.app_context():
+            with patch('AOOPMessages.messages.sending.deliver',
+                       side_effect=SQLAlchemyError()):
+                self.assertEqual(message_queue.process_batch(), 1)
+
+            self.assertEqual(message_queue.process_batch(), 0)
+            self.assertEqual(message_queue.pending(), 1)
+            self.assertFalse(message_queue.drain(timeout=0))
+
+    def test_worker(self):
+        self.start.stop()
+        message_queue.enqueue(self.build_rows('worker title'))
+
+        deadline = time.monotonic() + 5
+        while message_queue.pending() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(message_queue.pending(), 0)
+        self.assertEqual(self.stored('worker title'), 1)
+
+        message_queue.stop()
+        self.start.start()
+
+    def test_shutdown_drains(self):
+        message_queue.enqueue(self.build_rows('shutdown title'))
+
+        message_queue.shutdown()
+
+        self.assertEqual(message_queue.pending(), 0)
+        self.assertEqual(self.stored('shutdown title'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,17 +3,37 @@
 This module contains the unit tests for the Messages module.
 """
 
+import re
 import unittest
+import json
 from unittest.mock import patch, Mock
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
 from AOOPMessages import create_app, db
 from AOOPMessages.models import User, Message
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
 from AOOPMessages.messages.helpers import get_valid_user_id, UserNotExistsError
+from AOOPMessages.messages.helpers import get_valid_user_ids
+from AOOPMessages.messages.helpers import valid_user_ids, invalid_user_ids
+from AOOPMessages.messages.pagination import encode_cursor, decode_cursor
+from AOOPMessages.messages.pagination import InvalidCursorError
+from AOOPMessages.messages.recipients import recipient_index
+from AOOPMessages.messages.events import message_hub
+from AOOPMessages.messages.messages import reconcile_counters_command
+from AOOPMessages.messages.messages import reconcile_threads_command
+from AOOPMessages.messages.fragments import fragment_cache, FragmentBackend
 
 TEST_DB = 'test.db'
 INBOX_ENDPOINT = '/messages'
 SEND_MESSAGE_ENDPOINT = '/messages/send'
+RECIPIENTS_ENDPOINT = '/messages/recipients'
+BULK_SEND_ENDPOINT = '/messages/send/bulk'
+COUNTS_ENDPOINT = '/messages/counts'
+STREAM_ENDPOINT = '/messages/stream'
+SEARCH_ENDPOINT = '/messages/search'
+SENT_ENDPOINT = '/messages/sent'
+THREADS_ENDPOINT = '/messages/threads'
 DATE_FORMAT = '%Y-%m-%d'
 
 
@@ -122,6 +142,216 @@ class MessagesTests(unittest.TestCase):
         self.assertNotIn(self.testMessage2.timestamp.strftime(DATE_FORMAT),
                          str(response.data))
 
+    @patch('flask_login.utils._get_user')
+    def test_inbox_pagination(self, current_user):
+        self.create_test_users()
+
+        with self.app.app_context():
+            base_timestamp = datetime.utcnow() - timedelta(days=1)
+            for index in range(4):
+                db.session.add(Message(
+                    title=f'page title {index}',
+                    body=f'page body {index}',
+                    timestamp=base_timestamp + timedelta(minutes=index),
+                    author_id=self.testUser2.id,
+                    receiver_id=self.testUser.id))
+            db.session.commit()
+
+        current_user.return_value = self.testUser
+        self.app.config['MESSAGES_PER_PAGE'] = 2
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.testMessage2.title, str(response.data))
+        self.assertIn('page title 3', str(response.data))
+        self.assertNotIn('page title 2', str(response.data))
+
+        with self.app.app_context():
+            message = Message.query.filter_by(title='page title 3').first()
+            cursor = encode_cursor(message.timestamp, message.id)
+
+        response = self.test_client.get(INBOX_ENDPOINT + '?before=' + cursor)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('page title 2', str(response.data))
+        self.assertIn('page title 1', str(response.data))
+        self.assertNotIn('page title 3', str(response.data))
+        self.assertNotIn('page title 0', str(response.data))
+
+        with self.app.app_context():
+            message = Message.query.filter_by(title='page title 2').first()
+            cursor = encode_cursor(message.timestamp, message.id)
+
+        response = self.test_client.get(INBOX_ENDPOINT + '?after=' + cursor)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.testMessage2.title, str(response.data))
+        self.assertIn('page title 3', str(response.data))
+        self.assertNotIn('page title 2', str(response.data))
+
+        response = self.test_client.get(INBOX_ENDPOINT + '?before=notACursor',
+                                        follow_redirects=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.testMessage2.title, str(response.data))
+
+    @patch('flask_login.utils._get_user')
+    def test_inbox_query_count(self, current_user):
+        self.create_test_users()
+
+        with self.app.app_context():
+            for index in range(3):
+                author = User(email=f'author{index}', password='password')
+                db.session.add(author)
+                db.session.flush()
+                db.session.add(Message(
+                    title=f'title {index}',
+                    body=f'body {index}',
+                    author_id=author.id,
+                    receiver_id=self.testUser.id))
+            db.session.commit()
+            engine = db.engine
+
+        current_user.return_value = self.testUser
+
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', count_statement)
+        try:
+            response = self.test_client.get(INBOX_ENDPOINT)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statement)
+
+        self.assertEqual(response.status_code, 200)
+        for index in range(3):
+            self.assertIn(f'author{index}', str(response.data))
+        self.assertIn(self.testUser2.email, str(response.data))
+        # The inbox version for the ETag, the page of messages, then the
+        # archived messages, as the page isn't full.
+        self.assertEqual(len(statements), 3)
+
+        statements.clear()
+        event.listen(engine, 'before_cursor_execute', count_statement)
+        try:
+            response = self.test_client.get(
+                INBOX_ENDPOINT,
+                headers={'If-None-Match': response.headers['ETag']})
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statement)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(statements), 1)
+
+    @patch('flask_login.utils._get_user')
+    def test_inbox_conditional(self, current_user):
+        self.create_test_users()
+
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response.headers['Cache-Control'])
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        with patch('AOOPMessages.messages.messages.render_template') \
+                as render_template:
+            response = self.test_client.get(
+                INBOX_ENDPOINT, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etag)
+            render_template.assert_not_called()
+
+        response = self.test_client.get(
+            INBOX_ENDPOINT, query_string={'before': 'cursor'},
+            headers={'If-None-Match': etag})
+        self.assertNotEqual(response.status_code, 304)
+
+        response = self.test_client.post(
+            SEND_MESSAGE_ENDPOINT,
+            data=dict(title='new title', body='new body',
+                      to=self.testUser.id))
+        self.assertEqual(response.status_code, 302)
+
+        response = self.test_client.get(
+            INBOX_ENDPOINT, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('new title', str(response.data))
+        self.assertNotEqual(response.headers['ETag'], etag)
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+
+        response = self.test_client.get(
+            INBOX_ENDPOINT, headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+        self.test_client.post('/messages/read')
+
+        response = self.test_client.get(
+            INBOX_ENDPOINT, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    @patch('flask_login.utils._get_user')
+    def test_inbox_fragment_cache(self, current_user):
+        self.create_test_users()
+
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertIn('Mark as read', str(response.data))
+        self.assertEqual(fragment_cache.stats()['misses'], 1)
+        self.assertEqual(fragment_cache.stats()['size'], 1)
+        self.assertGreater(fragment_cache.stats()['bytes'], 0)
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertIn(self.testMessage2.body, str(response.data))
+        self.assertEqual(fragment_cache.stats()['hits'], 1)
+        self.assertEqual(fragment_cache.stats()['hit_rate'], 0.5)
+
+        self.test_client.post('/messages/read')
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertIn(self.testMessage2.body, str(response.data))
+        self.assertNotIn('Mark as read', str(response.data))
+        self.assertEqual(fragment_cache.stats()['misses'], 2)
+
+    @patch('flask_login.utils._get_user')
+    def test_inbox_fragment_cache_backend(self, current_user):
+        self.create_test_users()
+
+        class DictBackend(FragmentBackend):
+            fragments = {}
+
+            def get_many(self, keys):
+                return {key: self.fragments[key] for key in keys
+                        if key in self.fragments}
+
+            def set_many(self, fragments):
+                self.fragments.update(fragments)
+
+        current_user.return_value = self.testUser
+
+        fragment_cache.backend = DictBackend()
+        self.test_client.get(INBOX_ENDPOINT)
+        self.assertEqual(len(DictBackend.fragments), 1)
+
+        fragment_cache.local.clear()
+        key = next(iter(DictBackend.fragments))
+        DictBackend.fragments[key] = '<p>shared card</p>'
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertIn('shared card', str(response.data))
+
+    def test_cursor(self):
+        timestamp = datetime.utcnow()
+        cursor = encode_cursor(timestamp, 42)
+        self.assertEqual(decode_cursor(cursor), (timestamp, 42))
+
+        self.assertRaises(InvalidCursorError, decode_cursor, 'notACursor')
+        self.assertRaises(InvalidCursorError, decode_cursor, None)
+
     def test_inbox_not_logged_in(self):
         response = self.test_client.get(INBOX_ENDPOINT, follow_redirects=True)
         self.assertEqual(response.status_code, 200)
@@ -139,8 +369,56 @@ class MessagesTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('Send a message',
                       str(response.data))
-        self.assertIn(self.testUser2.email,
+        self.assertIn('recipientSearch',
                       str(response.data))
+        self.assertNotIn(self.testUser2.email,
+                         str(response.data))
+
+    @patch('flask_login.utils._get_user')
+    def test_recipients(self, current_user):
+        self.create_test_users()
+
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(RECIPIENTS_ENDPOINT + '?q=TE')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'recipients': [
+            {'id': self.testUser2.id, 'email': self.testUser2.email}
+        ]})
+
+        response = self.test_client.get(RECIPIENTS_ENDPOINT + '?q=other')
+        self.assertEqual(response.get_json(), {'recipients': []})
+
+        self.test_client.post('/signup', data=dict(email='other@test.com',
+                                                   password='password'))
+
+        with self.app.app_context():
+            other_id = User.query.filter_by(email='other@test.com').first().id
+
+        response = self.test_client.get(RECIPIENTS_ENDPOINT + '?q=other')
+        self.assertEqual(response.get_json(), {'recipients': [
+            {'id': other_id, 'email': 'other@test.com'}
+        ]})
+
+    @patch('flask_login.utils._get_user')
+    def test_recipients_database_fallback(self, current_user):
+        self.create_test_users()
+
+        current_user.return_value = self.testUser
+        recipient_index.max_size = 1
+
+        response = self.test_client.get(RECIPIENTS_ENDPOINT + '?q=test')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'recipients': [
+            {'id': self.testUser2.id, 'email': self.testUser2.email}
+        ]})
+
+        response = self.test_client.get(RECIPIENTS_ENDPOINT + '?q=te_')
+        self.assertEqual(response.get_json(), {'recipients': []})
+
+    def test_recipients_not_logged_in(self):
+        response = self.test_client.get(RECIPIENTS_ENDPOINT)
+        self.assertEqual(response.status_code, 401)
 
     def test_send_get_not_logged_in(self):
         response = self.test_client.get(
@@ -205,6 +483,361 @@ class MessagesTests(unittest.TestCase):
                 body=body
             ).first())
 
+    @patch('flask_login.utils._get_user')
+    def test_send_bulk_post(self, current_user):
+        self.create_test_users()
+
+        current_user.return_value = self.testUser
+        self.app.config['BULK_SEND_CHUNK_SIZE'] = 1
+
+        response = self.test_client.post(
+            BULK_SEND_ENDPOINT,
+            data=dict(title='bulk title',
+                      body='bulk body',
+                      to=[f'{self.testUser.id},{self.testUser2.id}',
+                          str(self.testUser2.id), '100', 'notAnId']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {
+            'sent': 2,
+            'failed': [
+                {'to': 'notAnId', 'error': 'The user id is not valid'},
+                {'to': '100', 'error': "The user doesn't exist"},
+            ]
+        })
+
+        with self.app.app_context():
+            self.assertEqual(Message.query.filter_by(
+                title='bulk title', body='bulk body').count(), 2)
+
+        with patch('AOOPMessages.messages.sending.deliver') as deliver:
+            deliver.side_effect = [None, SQLAlchemyError()]
+            response = self.test_client.post(
+                BULK_SEND_ENDPOINT,
+                data=dict(title='bulk title',
+                          body='bulk body',
+                          to=[str(self.testUser.id), str(self.testUser2.id)]))
+
+        self.assertEqual(response.get_json(), {
+            'sent': 1,
+            'failed': [{'to': str(self.testUser2.id),
+                        'error': "The message couldn't be delivered"}]
+        })
+
+        response = self.test_client.post(BULK_SEND_ENDPOINT,
+                                         data=dict(title='bulk title'))
+        self.assertEqual(response.status_code, 400)
+
+        self.app.config['BULK_SEND_MAX_RECIPIENTS'] = 1
+        response = self.test_client.post(
+            BULK_SEND_ENDPOINT,
+            data=dict(to=f'{self.testUser.id},{self.testUser2.id}'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_send_bulk_post_not_logged_in(self):
+        response = self.test_client.post(BULK_SEND_ENDPOINT)
+        self.assertEqual(response.status_code, 401)
+
+    @patch('flask_login.utils._get_user')
+    def test_search(self, current_user):
+        self.create_test_users()
+
+        current_user.return_value = self.testUser
+        self.app.config['SEARCH_RESULTS_PER_PAGE'] = 1
+
+        response = self.test_client.post(
+            SEND_MESSAGE_ENDPOINT,
+            data=dict(title='Quarterly report',
+                      body='Numbers for the quarter',
+                      to=self.testUser2.id))
+        self.assertEqual(response.status_code, 302)
+        response = self.test_client.post(
+            SEND_MESSAGE_ENDPOINT,
+            data=dict(title='Lunch',
+                      body='The quarterly numbers are in the report',
+                      to=self.testUser2.id))
+        self.assertEqual(response.status_code, 302)
+
+        response = self.test_client.get(SEARCH_ENDPOINT,
+                                        query_string={'q': 'REPORT quarter'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('No messages match your search', str(response.data))
+
+        current_user.return_value = self.testUser2
+
+        response = self.test_client.get(SEARCH_ENDPOINT,
+                                        query_string={'q': 'REPORT quarter'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Quarterly report', str(response.data))
+        self.assertNotIn('Lunch', str(response.data))
+        self.assertIn('page=2', str(response.data))
+
+        response = self.test_client.get(
+            SEARCH_ENDPOINT, query_string={'q': 'report quarter', 'page': 2})
+        self.assertIn('Lunch', str(response.data))
+        self.assertNotIn('page=3', str(response.data))
+
+        response = self.test_client.get(SEARCH_ENDPOINT,
+                                        query_string={'q': 'title 1'})
+        self.assertIn(self.testMessage.body, str(response.data))
+
+        response = self.test_client.get(SEARCH_ENDPOINT,
+                                        query_string={'q': '" OR *'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('No messages match', str(response.data))
+
+        with self.app.app_context():
+            Message.query.filter_by(title='Lunch').delete()
+            db.session.commit()
+
+        response = self.test_client.get(
+            SEARCH_ENDPOINT, query_string={'q': 'report', 'page': 2})
+        self.assertNotIn('Lunch', str(response.data))
+
+    @patch('flask_login.utils._get_user')
+    def test_search_own_id(self, current_user):
+        self.testMessage.title = 'test title'
+        self.testMessage.body = 'test body'
+        self.create_test_users()
+
+        current_user.return_value = self.testUser2
+        response = self.test_client.get(
+            SEARCH_ENDPOINT, query_string={'q': str(self.testUser2.id)})
+        self.assertIn('No messages match your search', str(response.data))
+
+        response = self.test_client.get(
+            SEARCH_ENDPOINT, query_string={'q': str(self.testUser.id)})
+        self.assertIn('No messages match your search', str(response.data))
+
+        response = self.test_client.get(
+            SEARCH_ENDPOINT, query_string={'q': 'title'})
+        self.assertIn(self.testMessage.title, str(response.data))
+
+    def test_search_not_logged_in(self):
+        response = self.test_client.get(SEARCH_ENDPOINT,
+                                        follow_redirects=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Login', str(response.data))
+
+    @patch('flask_login.utils._get_user')
+    def test_sent(self, current_user):
+        self.create_test_users()
+
+        current_user.return_value = self.testUser
+        self.app.config['MESSAGES_PER_PAGE'] = 2
+
+        for index in range(3):
+            self.test_client.post(SEND_MESSAGE_ENDPOINT, data=dict(
+                title=f'sent title {index}', body=f'sent body {index}',
+                to=self.testUser2.id))
+
+        response = self.test_client.get(SENT_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'To {self.testUser2.email}', str(response.data))
+        self.assertIn('sent title 2', str(response.data))
+        self.assertIn('sent title 1', str(response.data))
+        self.assertNotIn('sent title 0', str(response.data))
+
+        next_page = re.search(r'href="(/messages/sent\?before=[^"]+)"',
+                              response.get_data(as_text=True)).group(1)
+        response = self.test_client.get(next_page)
+        self.assertIn('sent title 0', str(response.data))
+
+        current_user.return_value = self.testUser2
+        response = self.test_client.get(SENT_ENDPOINT)
+        self.assertNotIn('sent title', str(response.data))
+
+        response = self.test_client.get(SENT_ENDPOINT + '?before=bad')
+        self.assertEqual(response.status_code, 302)
+
+    def test_sent_not_logged_in(self):
+        response = self.test_client.get(SENT_ENDPOINT, follow_redirects=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Login', str(response.data))
+
+    @patch('flask_login.utils._get_user')
+    def test_threads(self, current_user):
+        self.create_test_users()
+
+        current_user.return_value = self.testUser
+        self.test_client.post(SEND_MESSAGE_ENDPOINT, data=dict(
+            title='thread title', body='thread body', to=self.testUser2.id))
+
+        current_user.return_value = self.testUser2
+        response = self.test_client.get(THREADS_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('thread title', str(response.data))
+        self.assertIn('1 unread', str(response.data))
+        thread_path = re.search(r'href="(/messages/threads/\d+)"',
+                                response.get_data(as_text=True)).group(1)
+
+        response = self.test_client.post(thread_path + '/reply', data=dict(
+            body='reply body'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.location.endswith(thread_path))
+
+        response = self.test_client.get(thread_path)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('thread body', str(response.data))
+        self.assertIn('reply body', str(response.data))
+        self.assertIn('Re: thread title', str(response.data))
+
+        with self.app.app_context():
+            reply = Message.query.filter_by(body='reply body').first()
+            self.assertEqual(reply.receiver_id, self.testUser.id)
+            self.assertEqual(reply.thread_id, Message.query.filter_by(
+                body='thread body').first().thread_id)
+
+        current_user.return_value = self.testUser
+        response = self.test_client.get(THREADS_ENDPOINT)
+        self.assertIn('2 messages', str(response.data))
+        self.assertIn('1 unread', str(response.data))
+
+        self.test_client.post('/messages/read')
+        response = self.test_client.get(THREADS_ENDPOINT)
+        self.assertNotIn(' unread<', str(response.data))
+
+        response = self.test_client.get(THREADS_ENDPOINT + '/1')
+        self.assertEqual(response.status_code, 404)
+        response = self.test_client.post(THREADS_ENDPOINT + '/1/reply',
+                                         data=dict(body='stray body'))
+        self.assertEqual(response.status_code, 404)
+
+        result = self.app.test_cli_runner().invoke(reconcile_threads_command)
+        self.assertIn('Rebuilt 6 conversation summaries', result.output)
+
+        response = self.test_client.get(THREADS_ENDPOINT)
+        self.assertLess(str(response.data).index('thread title'),
+                        str(response.data).index(self.testMessage2.title))
+        self.assertIn(self.testMessage.title, str(response.data))
+
+    def test_threads_not_logged_in(self):
+        response = self.test_client.get(THREADS_ENDPOINT,
+                                        follow_redirects=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Login', str(response.data))
+
+    @patch('flask_login.utils._get_user')
+    def test_counts(self, current_user):
+        self.create_test_users()
+
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(COUNTS_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'total': 0, 'unread': 0})
+
+        result = self.app.test_cli_runner().invoke(reconcile_counters_command)
+        self.assertIn('Rebuilt the inbox counters of 2 users', result.output)
+
+        response = self.test_client.get(COUNTS_ENDPOINT)
+        self.assertEqual(response.get_json(), {'total': 1, 'unread': 1})
+
+        current_user.return_value = self.testUser2
+        for index in range(2):
+            self.test_client.post(
+                SEND_MESSAGE_ENDPOINT,
+                data=dict(title=f'unread title {index}',
+                          body='unread body',
+                          to=self.testUser.id))
+
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(COUNTS_ENDPOINT)
+        self.assertEqual(response.get_json(), {'total': 3, 'unread': 3})
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertEqual(str(response.data).count('Mark as read'), 3)
+
+        with self.app.app_context():
+            message_id = Message.query.filter_by(
+                title='unread title 0').first().id
+
+        response = self.test_client.post(f'/messages/{message_id}/read')
+        self.assertEqual(response.status_code, 302)
+        response = self.test_client.post(f'/messages/{message_id}/read')
+        self.assertEqual(response.status_code, 302)
+
+        response = self.test_client.get(COUNTS_ENDPOINT)
+        self.assertEqual(response.get_json(), {'total': 3, 'unread': 2})
+
+        response = self.test_client.post('/messages/read')
+        self.assertEqual(response.status_code, 302)
+
+        response = self.test_client.get(COUNTS_ENDPOINT)
+        self.assertEqual(response.get_json(), {'total': 3, 'unread': 0})
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertNotIn('Mark as read', str(response.data))
+
+    @patch('flask_login.utils._get_user')
+    def test_stream(self, current_user):
+        self.create_test_users()
+
+        current_user.return_value = self.testUser
+        self.app.config['MESSAGE_STREAM_HEARTBEAT'] = 0.01
+        self.app.config['MESSAGE_STREAM_MAX_DURATION'] = 0.2
+
+        response = self.test_client.get(STREAM_ENDPOINT, buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+
+        current_user.return_value = self.testUser2
+        self.test_client.post(
+            SEND_MESSAGE_ENDPOINT,
+            data=dict(title='streamed title',
+                      body='streamed body',
+                      to=self.testUser.id))
+
+        events = [chunk.decode() for chunk in response.response]
+        response.close()
+
+        self.assertEqual(events[0], 'retry: 5000\n\n')
+        self.assertTrue(events[1].startswith('event: message\ndata: '))
+        event = json.loads(events[1].split('data: ', 1)[1])
+        self.assertEqual(event['author_email'], self.testUser2.email)
+        self.assertEqual(event['title'], 'streamed title')
+        self.assertEqual(event['body'], 'streamed body')
+        self.assertIn(': keepalive\n\n', events[2:])
+
+    @patch('flask_login.utils._get_user')
+    def test_stream_limit(self, current_user):
+        self.create_test_users()
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(STREAM_ENDPOINT, buffered=False)
+        self.assertEqual(response.status_code, 200)
+
+        refused = self.test_client.get(STREAM_ENDPOINT, buffered=False)
+        self.assertEqual(refused.status_code, 503)
+        self.assertIn('Retry-After', refused.headers)
+
+        response.close()
+        self.assertEqual(message_hub.stream_count(), 0)
+
+        response = self.test_client.get(STREAM_ENDPOINT, buffered=False)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    @patch('flask_login.utils._get_user')
+    def test_stream_only_on_inbox(self, current_user):
+        self.create_test_users()
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertIn(f'data-stream-url="{STREAM_ENDPOINT}"',
+                      str(response.data))
+
+        response = self.test_client.get(SENT_ENDPOINT)
+        self.assertIn('data-stream-url=""', str(response.data))
+
+    def test_stream_not_logged_in(self):
+        response = self.test_client.get(STREAM_ENDPOINT)
+        self.assertEqual(response.status_code, 401)
+
+    def test_counts_not_logged_in(self):
+        response = self.test_client.get(COUNTS_ENDPOINT)
+        self.assertEqual(response.status_code, 401)
+
     def test_send_post_not_logged_in(self):
         response = self.test_client.post(
             SEND_MESSAGE_ENDPOINT, follow_redirects=True)
@@ -229,6 +862,53 @@ class MessagesTests(unittest.TestCase):
             validated_user_id = get_valid_user_id(user_id)
             self.assertEqual(user_id, validated_user_id)
 
+    def test_get_valid_user_id_cache(self):
+        self.create_test_users()
+        with self.app.app_context():
+            self.assertEqual(get_valid_user_id(self.testUser.id),
+                             self.testUser.id)
+            self.assertRaises(UserNotExistsError, get_valid_user_id, 100)
+
+            statements = []
+
+            def count_statement(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                self.assertEqual(get_valid_user_id(self.testUser.id),
+                                 self.testUser.id)
+                self.assertRaises(UserNotExistsError, get_valid_user_id, 100)
+                self.assertEqual(
+                    get_valid_user_ids([self.testUser.id, 100]),
+                    ([self.testUser.id], {100: "The user doesn't exist"}))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute',
+                             count_statement)
+
+            self.assertEqual(statements, [])
+            self.assertEqual(valid_user_ids.hits, 2)
+            self.assertEqual(invalid_user_ids.hits, 2)
+
+            db.session.add(User(id=100, email='test100', password='test'))
+            db.session.commit()
+
+            self.assertEqual(get_valid_user_id(100), 100)
+
+    def test_get_valid_user_ids(self):
+        self.create_test_users()
+        with self.app.app_context():
+            valid_ids, failures = get_valid_user_ids(
+                [str(self.testUser2.id), None, -1, 100, self.testUser.id,
+                 self.testUser2.id])
+
+            self.assertEqual(valid_ids, [self.testUser2.id, self.testUser.id])
+            self.assertEqual(failures, {
+                None: 'The user id is not valid',
+                -1: 'The user id is not valid',
+                100: "The user doesn't exist",
+            })
+
 
 if __name__ == '__main__':
     unittest.main()
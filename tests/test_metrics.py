@@ -0,0 +1,113 @@
+"""Test Metrics module.
+
+This module contains the unit tests for the Metrics module.
+"""
+
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from werkzeug.security import generate_password_hash
+from AOOPMessages import create_app, db
+from AOOPMessages.config import config
+from AOOPMessages.metrics import Histogram
+from AOOPMessages.models import User
+
+
+INBOX_ENDPOINT = '/messages'
+LOGIN_ENDPOINT = '/login'
+METRICS_ENDPOINT = '/metrics'
+
+
+class MetricsTests(unittest.TestCase):
+    """Metrics tests class.
+
+    Class defining the unit tests for the Metrics module.
+    """
+
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        with patch.object(config['testing'], 'METRICS_ENABLED', True), \
+                patch.object(config['testing'], 'PROFILE_DIR',
+                             self.profile_dir):
+            self.app = create_app(config_name='testing')
+        self.test_client = self.app.test_client()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.configure(expire_on_commit=False)
+            self.testUser = User(email='test',
+                                 password=generate_password_hash('test'))
+            db.session.add(self.testUser)
+            db.session.commit()
+
+    def tearDown(self):
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    def test_histogram(self):
+        histogram = Histogram([0.1, 1])
+
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [2, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 5.65)
+
+    @patch('flask_login.utils._get_user')
+    def test_metrics(self, current_user):
+        current_user.return_value = self.testUser
+
+        self.assertEqual(self.test_client.get(INBOX_ENDPOINT).status_code,
+                         200)
+        self.test_client.post(LOGIN_ENDPOINT, data={
+            'email': 'test', 'password': 'test'})
+
+        response = self.test_client.get(METRICS_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        text = response.get_data(as_text=True)
+
+        self.assertIn('aoop_requests_total{endpoint="messages.inbox",'
+                      'method="GET",status="200"} 1', text)
+        self.assertIn('aoop_request_duration_seconds_bucket{endpoint='
+                      '"messages.inbox",method="GET",le="+Inf"} 1', text)
+        self.assertIn('aoop_request_duration_seconds_count{endpoint='
+                      '"messages.inbox",method="GET"} 1', text)
+        self.assertIn('aoop_sql_statements_total{endpoint="messages.inbox"} '
+                      '3', text)
+        self.assertIn('aoop_request_phase_seconds_total{endpoint='
+                      '"messages.inbox",phase="sql"}', text)
+        self.assertIn('aoop_request_phase_seconds_total{endpoint='
+                      '"messages.inbox",phase="template"}', text)
+        self.assertIn('aoop_request_phase_seconds_total{endpoint='
+                      '"auth.login_post",phase="password_hash"}', text)
+        self.assertIn('aoop_cache_hits_total{cache="user"}', text)
+        self.assertIn('aoop_cache_bytes{cache="fragment"}', text)
+
+    def test_disabled(self):
+        app = create_app(config_name='testing')
+
+        response = app.test_client().get(METRICS_ENDPOINT)
+        self.assertEqual(response.status_code, 404)
+
+    def test_profiling(self):
+        with patch.object(config['testing'], 'PROFILE_SAMPLE_RATE', 1), \
+                patch.object(config['testing'], 'PROFILE_DIR',
+                             self.profile_dir):
+            app = create_app(config_name='testing')
+
+        self.assertEqual(app.test_client().get(LOGIN_ENDPOINT).status_code,
+                         200)
+
+        profiles = os.listdir(self.profile_dir)
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].startswith('auth.login.'))
+        stats = pstats.Stats(os.path.join(self.profile_dir, profiles[0]))
+        self.assertGreater(stats.total_calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
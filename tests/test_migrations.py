@@ -0,0 +1,62 @@
+"""Test Migrations module.
+
+This module contains the unit tests for the database migrations.
+"""
+
+import os
+import unittest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from AOOPMessages import create_app, db
+from AOOPMessages.messages.search import is_search_table
+
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+class MigrationsTests(unittest.TestCase):
+    """Migrations tests class.
+
+    Class defining the unit tests for the database migrations.
+    """
+
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.alembic_config = Config(os.path.join(ROOT_DIR, 'alembic.ini'))
+        self.alembic_config.set_main_option(
+            'script_location', os.path.join(ROOT_DIR, 'migrations'))
+
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.execute('DROP TABLE IF EXISTS alembic_version')
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.execute('DROP TABLE IF EXISTS alembic_version')
+            db.create_all()
+
+    def test_migrations_match_models(self):
+        with self.app.app_context():
+            command.upgrade(self.alembic_config, 'head')
+
+            with db.engine.connect() as connection:
+                context = MigrationContext.configure(connection, opts={
+                    'include_object': lambda object, name, type_, *args:
+                        not (type_ == 'table' and is_search_table(name))
+                })
+                self.assertEqual(
+                    compare_metadata(context, db.metadata), [])
+
+    def test_downgrade(self):
+        with self.app.app_context():
+            command.upgrade(self.alembic_config, 'head')
+            command.downgrade(self.alembic_config, 'base')
+
+            self.assertEqual(db.engine.table_names(), ['alembic_version'])
+
+
+if __name__ == '__main__':
+    unittest.main()
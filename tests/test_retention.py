@@ -0,0 +1,308 @@
+"""Test Retention module.
+
+This module contains the unit tests for the Retention module.
+"""
+
+import gzip
+import json
+import os
+import re
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from werkzeug.security import generate_password_hash
+from AOOPMessages import create_app, db
+from AOOPMessages.api.tokens import generate_token
+from AOOPMessages.models import ArchivedMessage, Message, ThreadSummary, User
+from AOOPMessages.messages import counters
+from AOOPMessages.messages import search
+from AOOPMessages.messages import threads
+from AOOPMessages.messages.messages import archive_command
+
+
+INBOX_ENDPOINT = '/messages'
+API_MESSAGES_ENDPOINT = '/api/v1/messages'
+API_SENT_ENDPOINT = '/api/v1/messages/sent'
+SENT_ENDPOINT = '/messages/sent'
+THREADS_ENDPOINT = '/messages/threads'
+
+
+class RetentionTests(unittest.TestCase):
+    """Retention tests class.
+
+    Class defining the unit tests for the Retention module.
+    """
+
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app.config['RETENTION_BATCH_PAUSE'] = 0
+        self.test_client = self.app.test_client()
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.configure(expire_on_commit=False)
+            self.testUser = User(email='test',
+                                 password=generate_password_hash('test'))
+            self.testUser2 = User(email='test2',
+                                  password=generate_password_hash('test'))
+            db.session.add_all([self.testUser, self.testUser2])
+            db.session.commit()
+
+            now = datetime.utcnow()
+            db.session.add_all([Message(
+                title=f'old title {index}', body=f'old body {index}',
+                timestamp=now - timedelta(days=400 + index),
+                author_id=self.testUser2.id,
+                receiver_id=self.testUser.id) for index in range(3)])
+            db.session.add_all([Message(
+                title=f'new title {index}', body=f'new body {index}',
+                timestamp=now - timedelta(days=index),
+                author_id=self.testUser2.id,
+                receiver_id=self.testUser.id) for index in range(2)])
+            db.session.commit()
+
+            counters.reconcile()
+            threads.reconcile()
+            self.version = counters.get_version(self.testUser.id).version
+
+    def archive(self, *args):
+        return self.app.test_cli_runner().invoke(
+            archive_command, ['--batch-size', '2', *args])
+
+    @patch('flask_login.utils._get_user')
+    def test_archive(self, current_user):
+        result = self.archive()
+        self.assertIn('Archived 3 messages in 2 batches', result.output)
+
+        with self.app.app_context():
+            self.assertEqual(Message.query.count(), 2)
+            archived = ArchivedMessage.query.order_by(
+                ArchivedMessage.timestamp.desc()).all()
+            self.assertEqual([message.title for message in archived],
+                             ['old title 0', 'old title 1', 'old title 2'])
+            self.assertFalse(any(message.read for message in archived))
+
+            self.assertEqual(counters.get_counts(self.testUser.id),
+                             {'total': 5, 'unread': 5})
+            self.assertEqual(counters.get_version(self.testUser.id).version,
+                             self.version)
+            self.assertEqual(sum(summary.unread for summary in
+                                 ThreadSummary.query.filter_by(
+                                     user_id=self.testUser.id)), 2)
+            self.assertEqual(
+                search.search(self.testUser.id, 'old', 1, 10).items, [])
+
+        result = self.archive()
+        self.assertIn('Archived 0 messages in 0 batches', result.output)
+
+        current_user.return_value = self.testUser
+        self.app.config['MESSAGES_PER_PAGE'] = 2
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertIn('new title 0', str(response.data))
+        self.assertNotIn('old title', str(response.data))
+
+        titles = []
+        while True:
+            cursor = re.search(r'href="/messages\?before=([^"]+)"',
+                               response.get_data(as_text=True))
+            if cursor is None:
+                break
+            response = self.test_client.get(
+                INBOX_ENDPOINT + '?before=' + cursor.group(1))
+            titles.extend(re.findall(r'old title \d',
+                                     response.get_data(as_text=True)))
+
+        self.assertEqual(titles, ['old title 0', 'old title 1',
+                                  'old title 2'])
+
+        for expected in ('old title 0', 'new title 1'):
+            previous = re.search(r'href="/messages\?after=([^"]+)"',
+                                 response.get_data(as_text=True)).group(1)
+            response = self.test_client.get(
+                INBOX_ENDPOINT + '?after=' + previous)
+            self.assertIn(expected, str(response.data))
+
+        with self.app.app_context():
+            token = generate_token(self.testUser.id)
+        response = self.test_client.get(
+            API_MESSAGES_ENDPOINT + '?limit=5',
+            headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual([message['title']
+                          for message in response.get_json()['messages']],
+                         ['new title 0', 'new title 1', 'old title 0',
+                          'old title 1', 'old title 2'])
+
+    @patch('flask_login.utils._get_user')
+    def test_archive_sent(self, current_user):
+        self.archive()
+        current_user.return_value = self.testUser2
+        self.app.config['MESSAGES_PER_PAGE'] = 3
+
+        response = self.test_client.get(SENT_ENDPOINT)
+        self.assertIn('new title 1', str(response.data))
+        self.assertIn('old title 0', str(response.data))
+        self.assertNotIn('old title 1', str(response.data))
+
+        cursor = re.search(r'href="/messages/sent\?before=([^"]+)"',
+                           response.get_data(as_text=True)).group(1)
+        response = self.test_client.get(SENT_ENDPOINT + '?before=' + cursor)
+        self.assertIn('old title 2', str(response.data))
+
+        with self.app.app_context():
+            token = generate_token(self.testUser2.id)
+        headers = {'Authorization': f'Bearer {token}'}
+
+        response = self.test_client.get(API_SENT_ENDPOINT + '?limit=4',
+                                        headers=headers)
+        page = response.get_json()
+        self.assertEqual([message['title'] for message in page['messages']],
+                         ['new title 0', 'new title 1', 'old title 0',
+                          'old title 1'])
+        self.assertEqual(page['messages'][3]['receiver_email'], 'test')
+
+        response = self.test_client.get(
+            API_SENT_ENDPOINT + '?limit=4&before=' + page['next'],
+            headers=headers)
+        self.assertEqual([message['title']
+                          for message in response.get_json()['messages']],
+                         ['old title 2'])
+
+    def test_archive_get_message(self):
+        self.archive()
+
+        with self.app.app_context():
+            message_id = ArchivedMessage.query.filter_by(
+                title='old title 0').first().id
+            stranger = User(email='stranger', password='test')
+            db.session.add(stranger)
+            db.session.commit()
+            tokens = {user: generate_token(user.id) for user in
+                      (self.testUser, self.testUser2, stranger)}
+
+        for user in (self.testUser, self.testUser2):
+            response = self.test_client.get(
+                f'{API_MESSAGES_ENDPOINT}/{message_id}',
+                headers={'Authorization': f'Bearer {tokens[user]}'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['id'], message_id)
+            self.assertEqual(response.get_json()['title'], 'old title 0')
+            self.assertEqual(response.get_json()['author_email'], 'test2')
+
+        response = self.test_client.get(
+            f'{API_MESSAGES_ENDPOINT}/{message_id}',
+            headers={'Authorization': f'Bearer {tokens[stranger]}'})
+        self.assertEqual(response.status_code, 404)
+
+    @patch('flask_login.utils._get_user')
+    def test_archive_mark_read(self, current_user):
+        self.archive()
+        current_user.return_value = self.testUser
+
+        with self.app.app_context():
+            archived_id = ArchivedMessage.query.filter_by(
+                title='old title 0').one().id
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertIn(f'/messages/{archived_id}/read', str(response.data))
+
+        response = self.test_client.post(f'/messages/{archived_id}/read')
+        self.assertEqual(response.status_code, 302)
+
+        with self.app.app_context():
+            self.assertTrue(ArchivedMessage.query.filter_by(
+                id=archived_id).one().read)
+            self.assertEqual(counters.get_counts(self.testUser.id),
+                             {'total': 5, 'unread': 4})
+
+        response = self.test_client.post('/messages/read')
+        self.assertEqual(response.status_code, 302)
+
+        with self.app.app_context():
+            self.assertEqual(ArchivedMessage.query.filter_by(
+                read=False).count(), 0)
+            self.assertEqual(counters.get_counts(self.testUser.id),
+                             {'total': 5, 'unread': 0})
+
+            counters.reconcile()
+            self.assertEqual(counters.get_counts(self.testUser.id),
+                             {'total': 5, 'unread': 0})
+
+    @patch('flask_login.utils._get_user')
+    def test_archive_threads(self, current_user):
+        with self.app.app_context():
+            old_thread = Message.query.filter_by(
+                title='old title 0').one().thread_id
+            archived_thread = Message.query.filter_by(
+                title='old title 1').one().thread_id
+            db.session.add(Message(
+                title='Re: old title 0', body='reply body',
+                timestamp=datetime.utcnow(), author_id=self.testUser.id,
+                receiver_id=self.testUser2.id, thread_id=old_thread))
+            db.session.commit()
+            threads.reconcile()
+
+        self.archive()
+
+        with self.app.app_context():
+            self.assertIsNone(
+                threads.get_summary(self.testUser.id, archived_thread))
+            self.assertIsNone(
+                threads.get_summary(self.testUser2.id, archived_thread))
+
+            summary = threads.get_summary(self.testUser.id, old_thread)
+            self.assertEqual((summary.message_count, summary.unread), (1, 0))
+            summary = threads.get_summary(self.testUser2.id, old_thread)
+            self.assertEqual((summary.message_count, summary.unread), (1, 1))
+
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(THREADS_ENDPOINT)
+        self.assertIn(f'{THREADS_ENDPOINT}/{old_thread}"', str(response.data))
+        self.assertNotIn(f'{THREADS_ENDPOINT}/{archived_thread}"',
+                         str(response.data))
+        self.assertIn('1 message<', str(response.data))
+
+        response = self.test_client.get(f'{THREADS_ENDPOINT}/{old_thread}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('reply body', str(response.data))
+        self.assertNotIn('old body 0', str(response.data))
+
+        response = self.test_client.get(
+            f'{THREADS_ENDPOINT}/{archived_thread}')
+        self.assertEqual(response.status_code, 404)
+
+    def test_archive_max_batches(self):
+        result = self.archive('--max-batches', '1')
+        self.assertIn('Archived 2 messages in 1 batches', result.output)
+
+        result = self.archive('--days', '1000')
+        self.assertIn('Archived 0 messages in 0 batches', result.output)
+
+    def test_archive_jsonl(self):
+        directory = tempfile.mkdtemp()
+
+        result = self.archive('--jsonl', directory)
+        self.assertIn('Archived 3 messages in 2 batches', result.output)
+
+        records = []
+        for name in sorted(os.listdir(directory)):
+            self.assertTrue(name.endswith('.jsonl.gz'))
+            with gzip.open(os.path.join(directory, name), 'rt') as file:
+                records.extend(json.loads(line) for line in file)
+
+        self.assertEqual(sorted(record['title'] for record in records),
+                         ['old title 0', 'old title 1', 'old title 2'])
+        self.assertFalse(records[0]['read'])
+
+        with self.app.app_context():
+            self.assertEqual(Message.query.count(), 2)
+            self.assertEqual(ArchivedMessage.query.count(), 0)
+            self.assertEqual(counters.get_counts(self.testUser.id),
+                             {'total': 2, 'unread': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""Test Routing module.
+
+This module contains the unit tests for the Routing module.
+"""
+
+import os
+import unittest
+from tempfile import gettempdir
+from unittest.mock import patch
+from AOOPMessages import create_app, db
+from AOOPMessages.api.tokens import generate_token
+from AOOPMessages.models import User, Message
+from AOOPMessages.routing import sync_replicas_command
+
+
+REPLICA_DB = os.path.join(gettempdir(), 'test_replica.db')
+INBOX_ENDPOINT = '/messages'
+SEND_MESSAGE_ENDPOINT = '/messages/send'
+API_MESSAGES_ENDPOINT = '/api/v1/messages'
+
+
+class RoutingTests(unittest.TestCase):
+    """Routing tests class.
+
+    Class defining the unit tests for the Routing module.
+    """
+
+    def setUp(self):
+        app = create_app(config_name='testing')
+        app.config['SQLALCHEMY_BINDS'] = {'replica_1': 'sqlite:///' + REPLICA_DB}
+        app.config['SQLALCHEMY_REPLICA_BINDS'] = ['replica_1']
+        self.app = app
+        self.test_client = app.test_client()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.configure(expire_on_commit=False)
+
+            self.testUser = User(email='test', password='test')
+            self.testUser2 = User(email='test2', password='test')
+            db.session.add(self.testUser)
+            db.session.add(self.testUser2)
+            db.session.commit()
+
+            db.session.add(Message(title='replicated title',
+                                   body='replicated body',
+                                   author_id=self.testUser2.id,
+                                   receiver_id=self.testUser.id))
+            db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(sync_replicas_command)
+        self.assertEqual(result.exit_code, 0)
+
+        with self.app.app_context():
+            db.session.add(Message(title='primary title',
+                                   body='primary body',
+                                   author_id=self.testUser2.id,
+                                   receiver_id=self.testUser.id))
+            db.session.commit()
+
+    @patch('flask_login.utils._get_user')
+    def test_read_only_views_use_replica(self, current_user):
+        current_user.return_value = self.testUser
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('replicated title', str(response.data))
+        self.assertNotIn('primary title', str(response.data))
+
+        response = self.test_client.post(
+            SEND_MESSAGE_ENDPOINT,
+            data=dict(title='sent title',
+                      body='sent body',
+                      to=self.testUser.id))
+        self.assertEqual(response.status_code, 302)
+
+        with self.app.app_context():
+            self.assertIsNotNone(
+                Message.query.filter_by(title='sent title').first())
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertIn('sent title', str(response.data))
+        self.assertIn('primary title', str(response.data))
+
+    def test_token_requests_use_primary(self):
+        with self.app.app_context():
+            headers = {'Authorization':
+                       f'Bearer {generate_token(self.testUser.id)}'}
+
+        response = self.test_client.get(API_MESSAGES_ENDPOINT,
+                                        headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('primary title', str(response.data))
+
+        response = self.test_client.post(API_MESSAGES_ENDPOINT, json={
+            'to': self.testUser.id, 'title': 'api title',
+            'body': 'api body'}, headers=headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Set-Cookie', response.headers)
+
+    @patch('flask_login.utils._get_user')
+    def test_without_replicas(self, current_user):
+        current_user.return_value = self.testUser
+        self.app.config['SQLALCHEMY_REPLICA_BINDS'] = []
+
+        response = self.test_client.get(INBOX_ENDPOINT)
+        self.assertIn('primary title', str(response.data))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Test Slow Queries module.
+
+This module contains the unit tests for the Slow Queries module.
+"""
+
+import unittest
+from unittest.mock import patch
+from sqlalchemy.exc import OperationalError
+from werkzeug.security import generate_password_hash
+from AOOPMessages import create_app, db
+from AOOPMessages.config import config
+from AOOPMessages.models import User
+from AOOPMessages.slow_queries import logger
+
+
+LOGIN_ENDPOINT = '/login'
+LOGGER = 'AOOPMessages.slow_queries'
+
+
+class SlowQueriesTests(unittest.TestCase):
+    """Slow queries tests class.
+
+    Class defining the unit tests for the Slow Queries module.
+    """
+
+    def create_app(self, threshold, explain):
+        testing = config['testing']
+        with patch.object(testing, 'SLOW_QUERY_THRESHOLD', threshold), \
+                patch.object(testing, 'SLOW_QUERY_EXPLAIN', explain):
+            app = create_app(config_name='testing')
+
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add(User(email='test',
+                                password=generate_password_hash('test')))
+            db.session.commit()
+
+        return app
+
+    def login(self, app):
+        return app.test_client().post(LOGIN_ENDPOINT, data={
+            'email': 'test', 'password': 'test'})
+
+    def test_slow_query(self):
+        app = self.create_app(1e-9, False)
+
+        with self.assertLogs(LOGGER, 'WARNING') as logs:
+            self.login(app)
+
+        lookup = [line for line in logs.output
+                  if 'FROM users WHERE users.email = ?' in line]
+        self.assertEqual(len(lookup), 1)
+        self.assertIn('Slow query', lookup[0])
+        self.assertIn('auth.login_post', lookup[0])
+        self.assertNotIn("'test'", lookup[0])
+        self.assertFalse(any('Plan' in line for line in logs.output))
+
+    def test_explain(self):
+        app = self.create_app(1e-9, True)
+
+        with self.assertLogs(LOGGER, 'WARNING') as logs:
+            self.login(app)
+
+        # SQLite before 3.36 prints SEARCH TABLE users, so only the index
+        # is matched.
+        plans = [line for line in logs.output if 'Plan' in line]
+        self.assertTrue(any('auth.login_post' in line and
+                            'USING' in line and
+                            'sqlite_autoindex_users_1' in line
+                            for line in plans))
+
+        with self.assertLogs(LOGGER, 'WARNING') as logs:
+            self.login(app)
+
+        self.assertFalse(any('Plan' in line for line in logs.output))
+
+    def test_fast_query(self):
+        app = self.create_app(60, True)
+
+        with patch.object(logger, 'warning') as warning:
+            self.login(app)
+
+        warning.assert_not_called()
+
+    def test_failed_query(self):
+        app = self.create_app(1e-9, False)
+
+        with app.app_context():
+            connection = db.engine.connect()
+            info = dict(connection.info)
+
+            with self.assertRaises(OperationalError):
+                connection.execute('SELECT * FROM missing_table')
+
+            self.assertEqual(connection.info, info)
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()